@@ -1,10 +1,18 @@
 import jwt
+import hashlib
+import hmac
+import time
+import uuid
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
-from fastapi import HTTPException, Security, Depends
+from fastapi import HTTPException, Security, Depends, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 from typing import Optional
+from services.hashing import hashing_executor
+from services.cache import LRUCache
+from services.metrics import AUTH_OPERATION_LATENCY
+from services.revocation import revocation_list
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -15,14 +23,40 @@ JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_TIME_MINUTES = 60 * 24 * 7  # 7 days
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Admin access: comma-separated list of emails allowed to call admin endpoints
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()}
+
+# Shared secret that ad-platform webhooks send in X-Webhook-Secret instead of an admin token (disabled when empty)
+LEADS_WEBHOOK_SECRET = os.environ.get('LEADS_WEBHOOK_SECRET', '')
+
+# Verified-token cache: decoded payloads keyed by token digest, kept until the token's exp
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '10000'))
+token_cache = LRUCache(max_size=TOKEN_CACHE_SIZE)
+
+# Per-user profile cache behind /auth/profile (disabled when the TTL is 0)
+PROFILE_CACHE_TTL_SECONDS = float(os.environ.get('PROFILE_CACHE_TTL_SECONDS', '0'))
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', '10000'))
+profile_cache = LRUCache(max_size=PROFILE_CACHE_SIZE, default_ttl=PROFILE_CACHE_TTL_SECONDS)
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
-    return pwd_context.hash(password)
+    with AUTH_OPERATION_LATENCY.labels("bcrypt_hash").time():
+        return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    with AUTH_OPERATION_LATENCY.labels("bcrypt_verify").time():
+        return pwd_context.verify(plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password in the hashing executor without blocking the event loop"""
+    return await hashing_executor.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the hashing executor without blocking the event loop"""
+    return await hashing_executor.run(verify_password, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
@@ -32,20 +66,44 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=JWT_EXPIRATION_TIME_MINUTES)
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    # jti identifies the token for revocation; iat lets a per-user cut-off revoke older tokens
+    to_encode.update({"exp": expire, "iat": int(time.time()), "jti": uuid.uuid4().hex})
+    with AUTH_OPERATION_LATENCY.labels("jwt_encode").time():
+        encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
+def decode_token(token: str) -> dict:
+    """Decode a JWT, serving tokens seen before from the verified-token cache"""
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return payload
+
+    with AUTH_OPERATION_LATENCY.labels("jwt_decode").time():
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    exp = payload.get("exp")
+    if exp is not None:
+        token_cache.set(digest, payload, expires_at=float(exp))
+    return payload
+
+def token_key(token: str, payload: dict) -> str:
+    """Revocation key of a token: its jti, or a digest for tokens issued before jti existed"""
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
     """Verify JWT token and return payload"""
     token = credentials.credentials
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
+        payload = decode_token(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    
+    # Checked on every request, including cache hits, against the in-memory revocation list
+    if revocation_list.is_revoked(token_key(token, payload), payload):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return payload
 
 def get_current_user(token_payload: dict = Depends(verify_token)) -> dict:
     """Get current user from token payload"""
@@ -54,6 +112,13 @@ def get_current_user(token_payload: dict = Depends(verify_token)) -> dict:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     return {"user_id": user_id, "email": token_payload.get("email")}
 
+def get_current_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """Get current user and require it to be listed in ADMIN_EMAILS"""
+    email = (current_user.get("email") or "").lower()
+    if email not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
 # Optional auth dependency (for endpoints that work with or without auth)
 def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(lambda: None)) -> Optional[dict]:
     """Get current user from token payload, return None if no token"""
@@ -62,12 +127,45 @@ def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials
     
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = decode_token(token)
         user_id = payload.get("sub")
-        if user_id:
+        if user_id and not revocation_list.is_revoked(token_key(token, payload), payload):
             return {"user_id": user_id, "email": payload.get("email")}
-    except (jwt.ExpiredSignatureError, jwt.JWTError):
+    except jwt.InvalidTokenError:
         pass
     
     return None
 
+def invalidate_user_profile(user_id: str):
+    """Drop a user's cached profile; call whenever the user document changes"""
+    profile_cache.delete(user_id)
+
+async def revoke_token(token: str, payload: dict):
+    """Revoke a single token (logout, admin kill) until its expiry"""
+    expires_at = datetime.utcfromtimestamp(payload["exp"]) if "exp" in payload else (
+        datetime.utcnow() + timedelta(minutes=JWT_EXPIRATION_TIME_MINUTES)
+    )
+    await revocation_list.revoke_token(token_key(token, payload), payload.get("sub"), expires_at)
+
+async def revoke_user_tokens(user_id: str):
+    """Revoke every token issued to a user up to now (password change, admin kill)
+
+    Tokens are compared by their whole-second iat, so a token issued later in the
+    same second as the revocation stays valid; this is what lets the caller hand
+    out a fresh token right after revoking.
+    """
+    await revocation_list.revoke_user(user_id, int(time.time()), timedelta(minutes=JWT_EXPIRATION_TIME_MINUTES))
+    invalidate_user_profile(user_id)
+
+def get_webhook_or_admin(
+    x_webhook_secret: Optional[str] = Header(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Security(optional_security),
+) -> dict:
+    """Accept a request carrying LEADS_WEBHOOK_SECRET, otherwise require an admin token"""
+    if LEADS_WEBHOOK_SECRET and x_webhook_secret is not None and hmac.compare_digest(
+        x_webhook_secret.encode(), LEADS_WEBHOOK_SECRET.encode()
+    ):
+        return {"webhook": True}
+    if credentials is None:
+        raise HTTPException(status_code=403, detail="Not authenticated")
+    return get_current_admin(get_current_user(verify_token(credentials)))
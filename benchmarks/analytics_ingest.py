@@ -0,0 +1,65 @@
+"""Analytics ingestion throughput benchmark.
+
+Drives the in-process AnalyticsIngestor against the Mongo at MONGO_URL with a
+sustained stream of events and reports accepted and written events per second,
+plus how many were rejected or dropped by backpressure.
+
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=lexi_bench python benchmarks/analytics_ingest.py --events 500000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import connect_to_mongo, close_mongo_connection, get_database, COLLECTIONS  # noqa: E402
+from models.analytics import AnalyticsEventCreate  # noqa: E402
+from services.analytics_service import AnalyticsIngestor, AnalyticsQueueFullError, build_event_document  # noqa: E402
+
+
+async def main(args):
+    await connect_to_mongo()
+    if args.drop:
+        await get_database()[COLLECTIONS['analytics']].delete_many({})
+
+    ingestor = AnalyticsIngestor(batch_size=args.batch_size, overflow_policy="reject")
+    ingestor.start()
+
+    template = AnalyticsEventCreate(event="page_view", source="bench", properties={"path": "/pricing"})
+    started = time.perf_counter()
+    for i in range(args.events):
+        try:
+            ingestor.submit(build_event_document(template))
+        except AnalyticsQueueFullError:
+            pass
+        if i % args.yield_every == 0:
+            # Give the writer task a turn, as a real request handler would
+            await asyncio.sleep(0)
+    submitted = time.perf_counter() - started
+
+    await ingestor.stop(timeout=600)
+    total = time.perf_counter() - started
+    await close_mongo_connection()
+
+    stats = ingestor.stats()
+    print(json.dumps({
+        "events": args.events,
+        "batch_size": args.batch_size,
+        "submit_seconds": round(submitted, 3),
+        "total_seconds": round(total, 3),
+        "accepted_per_second": round(stats["accepted"] / submitted),
+        "written_per_second": round(stats["written"] / total),
+        **stats,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--yield-every", type=int, default=100)
+    parser.add_argument("--drop", action="store_true", help="clear the analytics collection first")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+"""Helpers shared by the benchmark scripts: latency summaries and synthetic documents."""
+import statistics
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+LEAD_SOURCES = ["hero", "pricing", "stats"]
+UTM_SOURCES = ["facebook", "google"]
+CONTACT_TYPES = ["support", "sales", "general"]
+CONTACT_WORDS = [
+    "pricing", "invoice", "campaign", "integration", "refund", "demo", "account", "report",
+    "facebook", "google", "budget", "audience", "conversion", "dashboard", "export", "password",
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "requests": len(samples),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2) if samples else 0.0,
+    }
+
+
+def synthetic_lead(i: int, now: datetime) -> dict:
+    created_at = now - timedelta(seconds=i)
+    return {
+        "id": str(uuid.uuid4()),
+        "email": f"lead{i}@example.com",
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "company": f"Company {i % 5000}",
+        "email_lower": f"lead{i}@example.com",
+        "company_lower": f"company {i % 5000}",
+        "phone": None,
+        "website": None,
+        "source": LEAD_SOURCES[i % len(LEAD_SOURCES)],
+        "utm": {"utm_source": UTM_SOURCES[i % len(UTM_SOURCES)], "utm_campaign": f"campaign-{i % 40}"},
+        "status": "new",
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def synthetic_contact(i: int, now: datetime) -> dict:
+    created_at = now - timedelta(seconds=i)
+    words = [CONTACT_WORDS[(i * k) % len(CONTACT_WORDS)] for k in (1, 3, 7, 11)]
+    return {
+        "id": str(uuid.uuid4()),
+        "name": f"Contact {i}",
+        "email": f"contact{i}@example.com",
+        "email_lower": f"contact{i}@example.com",
+        "subject": f"Question about {words[0]}",
+        "message": f"Hello, I have a question about {' and '.join(words)} for account {i}.",
+        "type": CONTACT_TYPES[i % len(CONTACT_TYPES)],
+        "status": "new",
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
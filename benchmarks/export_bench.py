@@ -0,0 +1,63 @@
+"""Lead export benchmark.
+
+Seeds the leads collection of the database at MONGO_URL/DB_NAME with synthetic
+documents (skipped when it already holds enough) and streams it out as CSV and
+Parquet, reporting rows per second, output size and peak RSS. Use a throwaway
+DB_NAME: --seed inserts into it.
+
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=lexi_bench python benchmarks/export_bench.py --seed 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import connect_to_mongo, close_mongo_connection, get_database, COLLECTIONS  # noqa: E402
+from services.export_service import ExportService  # noqa: E402
+from benchmarks.common import synthetic_lead  # noqa: E402
+
+SEED_BATCH = 10000
+
+
+async def seed(target: int):
+    leads = get_database()[COLLECTIONS['leads']]
+    existing = await leads.estimated_document_count()
+    now = datetime.utcnow()
+    for start in range(existing, target, SEED_BATCH):
+        batch = [synthetic_lead(i, now) for i in range(start, min(start + SEED_BATCH, target))]
+        await leads.insert_many(batch, ordered=False)
+    return max(existing, target)
+
+
+async def main(args):
+    await connect_to_mongo()
+    rows = await seed(args.seed)
+
+    results = {"rows": rows, "chunk_size": args.chunk_size}
+    for fmt in ("csv", "parquet"):
+        started = time.perf_counter()
+        size = 0
+        async for chunk in ExportService.stream('leads', fmt, chunk_size=args.chunk_size):
+            size += len(chunk)
+        elapsed = time.perf_counter() - started
+        results[fmt] = {
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(rows / elapsed) if elapsed else None,
+            "bytes": size,
+        }
+    results["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    await close_mongo_connection()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=1000000, help="leads to have in the collection")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+"""Lead CSV import benchmark.
+
+Generates a CSV of synthetic leads (--domains distinct email domains) in memory
+and imports it into the database at MONGO_URL/DB_NAME with LeadImportService,
+the code behind POST /api/leads/import and `cli.py import`, reporting rows per
+second for the first import (all inserts) and a second one (all updates). Use a
+throwaway DB_NAME: it writes leads.
+
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=lexi_bench python benchmarks/import_bench.py --rows 200000
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import connect_to_mongo, close_mongo_connection  # noqa: E402
+from services.import_service import LeadImportService, LEAD_IMPORT_BATCH_SIZE  # noqa: E402
+
+def build_csv(rows: int, domains: int) -> bytes:
+    lines = ["email,first_name,last_name,company,source,utm_source,utm_campaign\n"]
+    for i in range(rows):
+        lines.append(f"import{i}@company{i % domains}.com,First{i},Last{i},Company {i % 5000},crm,newsletter,campaign-{i % 40}\n")
+    return "".join(lines).encode()
+
+
+async def main(args):
+    await connect_to_mongo()
+    data = build_csv(args.rows, args.domains)
+
+    results = {"rows": args.rows, "bytes": len(data), "batch_size": args.batch_size}
+    for run in ("insert", "update"):
+        started = time.perf_counter()
+        report = await LeadImportService.import_csv(io.BytesIO(data), batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        results[run] = {
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(args.rows / elapsed) if elapsed else None,
+            "summary": report["summary"],
+        }
+        print(f"{run}: {json.dumps(results[run])}", file=sys.stderr)
+
+    await close_mongo_connection()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--domains", type=int, default=1000, help="distinct email domains")
+    parser.add_argument("--batch-size", type=int, default=LEAD_IMPORT_BATCH_SIZE)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""Login storm load test.
+
+Measures latency of the public, non-auth endpoints on a running server first on
+their own and then while a burst of concurrent logins is hammering bcrypt. With
+hashing off the event loop the p99 of both phases should stay close.
+
+    python benchmarks/login_storm.py --base-url http://localhost:8000 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize  # noqa: E402
+
+PROBE_PATHS = ["/api/content/faq", "/api/content/testimonials", "/api/analytics/stats"]
+
+
+async def probe(client: httpx.AsyncClient, deadline: float, samples: List[float]):
+    while time.perf_counter() < deadline:
+        for path in PROBE_PATHS:
+            started = time.perf_counter()
+            await client.get(path)
+            samples.append(time.perf_counter() - started)
+
+
+async def login_worker(client: httpx.AsyncClient, deadline: float, credentials: dict, counts: Dict[str, int]):
+    while time.perf_counter() < deadline:
+        response = await client.post("/api/auth/login", json=credentials)
+        counts[str(response.status_code)] = counts.get(str(response.status_code), 0) + 1
+
+
+async def run_phase(client: httpx.AsyncClient, duration: float, probes: int, logins: int, credentials: dict):
+    deadline = time.perf_counter() + duration
+    samples: List[float] = []
+    counts: Dict[str, int] = {}
+    tasks = [probe(client, deadline, samples) for _ in range(probes)]
+    tasks += [login_worker(client, deadline, credentials, counts) for _ in range(logins)]
+    await asyncio.gather(*tasks)
+    return summarize(samples), counts
+
+
+async def main(args):
+    credentials = {"email": f"storm-{uuid.uuid4().hex[:8]}@example.com", "password": "storm-password"}
+    limits = httpx.Limits(max_connections=args.probes + args.logins + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        response = await client.post("/api/auth/register", json=credentials)
+        response.raise_for_status()
+
+        baseline, _ = await run_phase(client, args.duration, args.probes, 0, credentials)
+        storm, login_counts = await run_phase(client, args.duration, args.probes, args.logins, credentials)
+
+    report = {
+        "baseline": baseline,
+        "login_storm": storm,
+        "login_status_counts": login_counts,
+        "p99_ratio": round(storm["p99_ms"] / baseline["p99_ms"], 2) if baseline["p99_ms"] else None,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    parser.add_argument("--probes", type=int, default=8, help="concurrent non-auth clients")
+    parser.add_argument("--logins", type=int, default=64, help="concurrent login clients")
+    asyncio.run(main(parser.parse_args()))
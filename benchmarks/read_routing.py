@@ -0,0 +1,190 @@
+"""Read routing check against a three-node replica set.
+
+Starts three mongod processes as a throwaway replica set (mongod must be on the
+PATH), runs the app in-process against it, and records the server every read
+command of each request was sent to. The admin listings, search, reports and
+analytics counters must be read from secondaries; login and profile reads must
+stay on the primary. Exits non-zero when a read went elsewhere.
+
+    python benchmarks/read_routing.py --base-port 27117
+
+Pass --mongo-url to check an existing replica set instead (set DB_NAME to a
+throwaway database: the check registers a user and creates leads).
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+from pymongo import MongoClient, monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPLICA_SET = "rs0"
+READ_COMMANDS = {"find", "aggregate", "count", "distinct", "getMore"}
+ADMIN_EMAIL = f"routing-{uuid.uuid4().hex[:8]}@example.com"
+PASSWORD = "routing-password"
+
+# (label, method, path, role the reads must go to, read commands checked)
+CHECKS = [
+    ("leads.list", "GET", "/api/leads/?limit=10", "secondary", READ_COMMANDS),
+    ("leads.ndjson", "GET", "/api/leads/?format=ndjson", "secondary", READ_COMMANDS),
+    ("contacts.list", "GET", "/api/contact/?limit=10", "secondary", READ_COMMANDS),
+    ("search.leads", "GET", "/api/search/leads?q=routing", "secondary", READ_COMMANDS),
+    ("leads.attribution", "GET", "/api/leads/attribution", "secondary", READ_COMMANDS),
+    ("leads.funnel", "GET", "/api/leads/funnel", "secondary", READ_COMMANDS),
+    ("export.leads", "GET", "/api/export/leads?format=csv", "secondary", READ_COMMANDS),
+    # The counters are materialized at startup; the primary is read only if a secondary lags behind that
+    ("analytics.stats", "GET", "/api/analytics/stats", "secondary", {"find"}),
+    ("analytics.series", "GET", "/api/analytics/series?event=page_view", "secondary", READ_COMMANDS),
+    ("auth.login", "POST", "/api/auth/login", "primary", READ_COMMANDS),
+    ("auth.profile", "GET", "/api/auth/profile", "primary", READ_COMMANDS),
+]
+
+current_check: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_check", default=None)
+
+
+class ReadRecorder(monitoring.CommandListener):
+    """Server address of every read command, keyed by the check that was running"""
+
+    def __init__(self):
+        self.reads: Dict[str, List[Tuple[str, Tuple[str, int]]]] = {}
+
+    def started(self, event):
+        label = current_check.get()
+        if label is not None and event.command_name in READ_COMMANDS:
+            self.reads.setdefault(label, []).append((event.command_name, event.connection_id))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def start_replica_set(base_port: int, workdir: str) -> Tuple[List[subprocess.Popen], str]:
+    ports = [base_port + i for i in range(3)]
+    processes = []
+    for port in ports:
+        dbpath = os.path.join(workdir, str(port))
+        os.makedirs(dbpath)
+        processes.append(subprocess.Popen(
+            ["mongod", "--replSet", REPLICA_SET, "--port", str(port), "--dbpath", dbpath,
+             "--bind_ip", "127.0.0.1", "--logpath", os.path.join(workdir, f"{port}.log")],
+            stdout=subprocess.DEVNULL,
+        ))
+
+    # The first member is given the highest priority so the primary is known in advance
+    seed = MongoClient(f"mongodb://127.0.0.1:{ports[0]}", directConnection=True, serverSelectionTimeoutMS=30000)
+    seed.admin.command("replSetInitiate", {
+        "_id": REPLICA_SET,
+        "members": [
+            {"_id": i, "host": f"127.0.0.1:{port}", "priority": 2 if i == 0 else 1}
+            for i, port in enumerate(ports)
+        ],
+    })
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        states = [member["stateStr"] for member in seed.admin.command("replSetGetStatus")["members"]]
+        if states.count("PRIMARY") == 1 and states.count("SECONDARY") == 2:
+            break
+        time.sleep(0.5)
+    else:
+        raise RuntimeError(f"Replica set did not come up: {states}")
+    seed.close()
+
+    hosts = ",".join(f"127.0.0.1:{port}" for port in ports)
+    return processes, f"mongodb://{hosts}/?replicaSet={REPLICA_SET}"
+
+
+def topology(mongo_url: str) -> Tuple[Tuple[str, int], Set[Tuple[str, int]]]:
+    client = MongoClient(mongo_url, serverSelectionTimeoutMS=30000)
+    client.admin.command("ping")
+    # Secondaries are discovered by the heartbeats that follow the first ping
+    deadline = time.monotonic() + 30
+    while not client.secondaries and time.monotonic() < deadline:
+        time.sleep(0.5)
+    primary, secondaries = client.primary, set(client.secondaries)
+    client.close()
+    if not secondaries:
+        raise RuntimeError("The deployment at MONGO_URL has no secondaries")
+    return primary, secondaries
+
+
+async def run_checks(recorder: ReadRecorder) -> Dict[str, List[Tuple[str, Tuple[str, int]]]]:
+    # Imported here: the app reads MONGO_URL and ADMIN_EMAILS when it is imported
+    import server
+
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=30) as client:
+            credentials = {"email": ADMIN_EMAIL, "password": PASSWORD}
+            response = await client.post("/api/auth/register", json=credentials)
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            response = await client.post("/api/leads/", json={"email": f"lead-{ADMIN_EMAIL}", "source": "routing"})
+            response.raise_for_status()
+
+            for label, method, path, _, _ in CHECKS:
+                token = current_check.set(label)
+                try:
+                    body = credentials if path == "/api/auth/login" else None
+                    response = await client.request(method, path, json=body, headers=headers)
+                    response.raise_for_status()
+                finally:
+                    current_check.reset(token)
+    return recorder.reads
+
+
+def main(args):
+    workdir = None
+    processes: List[subprocess.Popen] = []
+    mongo_url = args.mongo_url
+    try:
+        if mongo_url is None:
+            workdir = tempfile.mkdtemp(prefix="read-routing-")
+            processes, mongo_url = start_replica_set(args.base_port, workdir)
+        primary, secondaries = topology(mongo_url)
+
+        os.environ["MONGO_URL"] = mongo_url
+        os.environ.setdefault("DB_NAME", "read_routing")
+        os.environ["ADMIN_EMAILS"] = ADMIN_EMAIL
+        recorder = ReadRecorder()
+        monitoring.register(recorder)
+        reads = asyncio.run(run_checks(recorder))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    expected = {"primary": {primary}, "secondary": secondaries}
+    results = {}
+    failed = False
+    for label, _, _, role, names in CHECKS:
+        commands = [(name, address) for name, address in reads.get(label, []) if name in names]
+        wrong = [f"{name}@{host}:{port}" for name, (host, port) in commands if (host, port) not in expected[role]]
+        ok = bool(commands) and not wrong
+        failed = failed or not ok
+        results[label] = {"expected": role, "reads": len(commands), "ok": ok, "misrouted": wrong}
+
+    print(json.dumps({"primary": "%s:%d" % primary, "results": results}, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-port", type=int, default=27117, help="port of the first of the three mongod processes")
+    parser.add_argument("--mongo-url", help="check this existing replica set instead of starting one")
+    main(parser.parse_args())
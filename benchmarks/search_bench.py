@@ -0,0 +1,111 @@
+"""Admin search benchmark.
+
+Seeds the leads and contacts collections of the database at MONGO_URL/DB_NAME
+with synthetic documents (skipped when they already hold enough), then times
+each search the /api/search routes run, one query at a time, reporting
+p50/p95/p99 per scenario. The regex.* scenarios time the case-insensitive
+regex on the raw field that the normalized fields replace. Use a throwaway
+DB_NAME: --seed inserts into it.
+
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=lexi_bench python benchmarks/search_bench.py --seed 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import connect_to_mongo, close_mongo_connection, get_database, COLLECTIONS  # noqa: E402
+from models.lead import LeadResponse  # noqa: E402
+from models.contact import ContactResponse  # noqa: E402
+from services.search_service import SearchService  # noqa: E402
+from benchmarks.common import CONTACT_WORDS, summarize, synthetic_contact, synthetic_lead  # noqa: E402
+
+SEED_BATCH = 10000
+PAGE_SIZE = 20
+
+
+async def seed(key: str, make, target: int) -> int:
+    collection = get_database()[COLLECTIONS[key]]
+    existing = await collection.estimated_document_count()
+    now = datetime.utcnow()
+    for start in range(existing, target, SEED_BATCH):
+        batch = [make(i, now) for i in range(start, min(start + SEED_BATCH, target))]
+        await collection.insert_many(batch, ordered=False)
+    return max(existing, target)
+
+
+async def second_page(key, field, prefix, model):
+    _, cursor = await SearchService.prefix_search(key, field, prefix, model, PAGE_SIZE)
+    if cursor:
+        await SearchService.prefix_search(key, field, prefix, model, PAGE_SIZE, cursor)
+
+
+async def regex(key, field, prefix):
+    query = {field: {"$regex": f"^{prefix}", "$options": "i"}}
+    await get_database()[COLLECTIONS[key]].find(query).limit(PAGE_SIZE).to_list(length=PAGE_SIZE)
+
+
+def scenarios(leads: int, contacts: int):
+    rng = random.Random(42)
+    return {
+        "leads.email_exact": lambda: SearchService.prefix_search(
+            'leads', 'email', f"LEAD{rng.randrange(leads)}@example.com", LeadResponse, PAGE_SIZE
+        ),
+        "leads.email_prefix": lambda: SearchService.prefix_search(
+            'leads', 'email', f"lead{rng.randrange(1000)}", LeadResponse, PAGE_SIZE
+        ),
+        "leads.company_prefix": lambda: SearchService.prefix_search(
+            'leads', 'company', f"Company {rng.randrange(500)}", LeadResponse, PAGE_SIZE
+        ),
+        "leads.company_prefix_page2": lambda: second_page(
+            'leads', 'company', f"company {rng.randrange(500)}", LeadResponse
+        ),
+        "contacts.email_prefix": lambda: SearchService.prefix_search(
+            'contacts', 'email', f"contact{rng.randrange(contacts)}", ContactResponse, PAGE_SIZE
+        ),
+        "contacts.text_one_word": lambda: SearchService.text_search(
+            'contacts', rng.choice(CONTACT_WORDS), ContactResponse, PAGE_SIZE
+        ),
+        "contacts.text_two_words": lambda: SearchService.text_search(
+            'contacts', " ".join(rng.sample(CONTACT_WORDS, 2)), ContactResponse, PAGE_SIZE
+        ),
+        "regex.leads_company_prefix": lambda: regex('leads', 'company', f"company {rng.randrange(500)}"),
+        "regex.leads_email_prefix": lambda: regex('leads', 'email', f"LEAD{rng.randrange(1000)}"),
+    }
+
+
+async def main(args):
+    await connect_to_mongo()
+    leads = await seed('leads', synthetic_lead, args.seed)
+    contacts = await seed('contacts', synthetic_contact, args.seed)
+
+    results = {"leads": leads, "contacts": contacts, "iterations": args.iterations, "scenarios": {}}
+    for name, query in scenarios(leads, contacts).items():
+        if args.only and not name.startswith(args.only):
+            continue
+        samples = []
+        for i in range(args.warmup + args.iterations):
+            started = time.perf_counter()
+            await query()
+            if i >= args.warmup:
+                samples.append(time.perf_counter() - started)
+        results["scenarios"][name] = summarize(samples)
+        print(f"{name}: {json.dumps(results['scenarios'][name])}", file=sys.stderr)
+
+    await close_mongo_connection()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=1000000, help="leads and contacts to have in each collection")
+    parser.add_argument("--iterations", type=int, default=200, help="measured queries per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured queries per scenario")
+    parser.add_argument("--only", help="run only the scenarios whose name starts with this")
+    asyncio.run(main(parser.parse_args()))
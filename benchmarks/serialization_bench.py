@@ -0,0 +1,109 @@
+"""Response serialization microbenchmark.
+
+For each list/profile endpoint, compares the CPU cost of the previous response
+path (build model instances, let FastAPI re-validate them through
+response_model and encode with jsonable_encoder + the stdlib JSON encoder)
+with the single-pass path used by the routes now (TypeAdapter validation
+straight from the Mongo documents, encoded by pydantic-core).
+
+    python benchmarks/serialization_bench.py --rows 100
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from models.contact import ContactResponse  # noqa: E402
+from models.faq import FAQResponse  # noqa: E402
+from models.lead import LeadResponse  # noqa: E402
+from models.testimonial import TestimonialResponse  # noqa: E402
+from models.user import UserResponse  # noqa: E402
+from services.serialization import encode_list, encode_model  # noqa: E402
+
+
+def lead_doc(i):
+    return {"id": str(uuid.uuid4()), "email": f"lead{i}@example.com", "first_name": "Ana", "last_name": "Diaz",
+            "company": "Acme", "source": "hero", "status": "new", "created_at": datetime.utcnow()}
+
+
+def contact_doc(i):
+    return {"id": str(uuid.uuid4()), "name": "Ana", "email": f"c{i}@example.com", "subject": "Hola",
+            "message": "Quiero saber mas sobre Lexi " * 4, "type": "sales", "status": "new", "created_at": datetime.utcnow()}
+
+
+def testimonial_doc(i):
+    return {"id": str(i), "text": "Lexi consiguio los primeros pedidos en 48 horas " * 2, "author": "Daniel",
+            "role": "Propietario", "company": None, "avatar": None, "rating": 5}
+
+
+def faq_doc(i):
+    return {"id": str(i), "question": "Que productos puedo promocionar?", "answer": "Lexi funciona con muchos " * 6,
+            "category": "general"}
+
+
+def user_doc(_):
+    return {"id": str(uuid.uuid4()), "email": "u@example.com", "first_name": "Ana", "last_name": None, "company": None,
+            "phone": None, "plan": "trial", "status": "trial", "created_at": datetime.utcnow()}
+
+
+ENDPOINTS = [
+    ("GET /api/leads/", LeadResponse, lead_doc, True),
+    ("GET /api/contact/", ContactResponse, contact_doc, True),
+    ("GET /api/content/testimonials", TestimonialResponse, testimonial_doc, True),
+    ("GET /api/content/faq", FAQResponse, faq_doc, True),
+    ("GET /api/auth/profile", UserResponse, user_doc, False),
+]
+
+
+def run_sync(coroutine):
+    # serialize_response never suspends for async endpoints, so drive it without an event loop
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def old_path(field, model, docs, many):
+    content = [model(**doc) for doc in docs] if many else model(**docs[0])
+    serialized = run_sync(serialize_response(field=field, response_content=content, is_coroutine=True))
+    return JSONResponse(serialized).body
+
+
+def new_path(model, docs, many):
+    return encode_list(model, docs) if many else encode_model(model, docs[0])
+
+
+def main(args):
+    report = {}
+    for name, model, make_doc, many in ENDPOINTS:
+        docs = [make_doc(i) for i in range(args.rows if many else 1)]
+        field = create_response_field(name="Response_" + model.__name__, type_=List[model] if many else model)
+        assert json.loads(old_path(field, model, docs, many)) == json.loads(new_path(model, docs, many))
+
+        old = min(timeit.repeat(lambda: old_path(field, model, docs, many), number=args.number, repeat=5)) / args.number
+        new = min(timeit.repeat(lambda: new_path(model, docs, many), number=args.number, repeat=5)) / args.number
+        report[name] = {
+            "rows": len(docs),
+            "previous_us": round(old * 1e6, 1),
+            "single_pass_us": round(new * 1e6, 1),
+            "speedup": round(old / new, 1),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="documents per list response")
+    parser.add_argument("--number", type=int, default=50, help="iterations per timing")
+    main(parser.parse_args())
@@ -0,0 +1,248 @@
+"""API benchmark suite.
+
+Boots server.app in-process (lifespan included) against the database at
+MONGO_URL/DB_NAME, seeds it to the requested volumes (skipped for collections
+that already hold enough), then drives every API route at a fixed concurrency
+and reports throughput and p50/p95/p99 latency per scenario as JSON.
+
+Requests go through httpx's ASGI transport, so the numbers cover the app, the
+driver and MongoDB but not the HTTP server or network. Use a throwaway DB_NAME:
+seeding and the write scenarios insert into it.
+
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=lexi_bench ADMIN_EMAILS=bench-admin@example.com \\
+        python benchmarks/suite.py --leads 1000000 --users 100000 --output bench.json
+
+Compare against a stored baseline (exits 1 when a scenario regressed by more
+than --tolerance), or record a new one:
+
+    python benchmarks/suite.py --baseline benchmarks/baseline.json
+    python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# auth reads ADMIN_EMAILS at import time; the listing and export scenarios need an admin token
+os.environ.setdefault("ADMIN_EMAILS", "bench-admin@example.com")
+# Every request comes from one client address; the login/register rate limits would shed most of them
+os.environ.setdefault("AUTH_IP_RATE_PER_MINUTE", "0")
+os.environ.setdefault("AUTH_EMAIL_RATE_PER_MINUTE", "0")
+
+import server  # noqa: E402
+from auth import create_access_token, hash_password  # noqa: E402
+from database import get_database, COLLECTIONS  # noqa: E402
+from services.stats_service import StatsService  # noqa: E402
+from benchmarks.common import summarize, synthetic_contact, synthetic_lead  # noqa: E402
+
+SEED_BATCH = 10000
+BENCH_PASSWORD = "bench-password"
+BENCH_ADMIN_EMAIL = os.environ["ADMIN_EMAILS"].split(",")[0].strip()
+USER_ID_NAMESPACE = uuid.UUID("6f1c2a7e-3b1d-4c55-9a57-3f0b6d6f2b10")
+
+
+def bench_user_id(i: int) -> str:
+    return str(uuid.uuid5(USER_ID_NAMESPACE, f"user{i}"))
+
+
+def synthetic_user(i: int, now: datetime, password_hash: str) -> dict:
+    created_at = now - timedelta(seconds=i)
+    return {
+        "id": bench_user_id(i),
+        "email": f"user{i}@example.com",
+        "password": password_hash,
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "company": f"Company {i % 5000}",
+        "phone": None,
+        "plan": "trial",
+        "status": "trial",
+        "trial_ends_at": None,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+async def seed_collection(name: str, target: int, factory: Callable[[int, datetime], dict]) -> int:
+    collection = get_database()[COLLECTIONS[name]]
+    existing = await collection.count_documents({})
+    now = datetime.utcnow()
+    for start in range(existing, target, SEED_BATCH):
+        batch = [factory(i, now) for i in range(start, min(start + SEED_BATCH, target))]
+        await collection.insert_many(batch, ordered=False)
+    return max(existing, target)
+
+
+async def seed(args) -> Dict[str, int]:
+    # One bcrypt hash for every seeded user; hashing 100k passwords would dominate the run
+    password_hash = hash_password(BENCH_PASSWORD)
+    seeded = {
+        "users": await seed_collection("users", args.users, lambda i, now: synthetic_user(i, now, password_hash)),
+        "leads": await seed_collection("leads", args.leads, synthetic_lead),
+        "contacts": await seed_collection("contacts", args.contacts, synthetic_contact),
+    }
+    await StatsService.reconcile()
+    return seeded
+
+
+def build_scenarios(args) -> Dict[str, Callable[[httpx.AsyncClient, int], Any]]:
+    """Scenario name -> coroutine function issuing one request; n is a unique sequence number"""
+    user_token = create_access_token({"sub": bench_user_id(0), "email": "user0@example.com"})
+    admin_token = create_access_token({"sub": "bench-admin", "email": BENCH_ADMIN_EMAIL})
+    user_headers = {"Authorization": f"Bearer {user_token}"}
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    run_id = uuid.uuid4().hex[:8]
+    login_users = max(1, min(args.users, 1000))
+
+    return {
+        "auth.login": lambda c, n: c.post(
+            "/api/auth/login", json={"email": f"user{n % login_users}@example.com", "password": BENCH_PASSWORD}
+        ),
+        "auth.register": lambda c, n: c.post(
+            "/api/auth/register", json={"email": f"bench-{run_id}-{n}@example.com", "password": BENCH_PASSWORD}
+        ),
+        "auth.profile": lambda c, n: c.get("/api/auth/profile", headers=user_headers),
+        "leads.create": lambda c, n: c.post(
+            "/api/leads/?utm_source=google&utm_campaign=bench",
+            json={"email": f"bench-{run_id}-{n}@example.com", "first_name": "Bench", "source": "hero"},
+        ),
+        "leads.batch": lambda c, n: c.post(
+            "/api/leads/batch",
+            json=[{"email": f"bench-{run_id}-{n}-{i}@example.com", "source": "pricing"} for i in range(50)],
+            headers=admin_headers,
+        ),
+        "leads.list": lambda c, n: c.get("/api/leads/", params={"limit": 100}, headers=admin_headers),
+        "leads.list_by_source": lambda c, n: c.get(
+            "/api/leads/", params={"limit": 100, "source": "pricing"}, headers=admin_headers
+        ),
+        "contact.create": lambda c, n: c.post(
+            "/api/contact/",
+            json={"name": "Bench", "email": f"bench-{run_id}-{n}@example.com", "message": "Benchmark message"},
+        ),
+        "contact.list": lambda c, n: c.get("/api/contact/", params={"limit": 100}, headers=admin_headers),
+        "content.testimonials": lambda c, n: c.get("/api/content/testimonials"),
+        "content.faq": lambda c, n: c.get("/api/content/faq"),
+        "analytics.stats": lambda c, n: c.get("/api/analytics/stats"),
+        "analytics.track": lambda c, n: c.post(
+            "/api/analytics/track", json={"event": "page_view", "source": "bench", "session_id": run_id}
+        ),
+        "export.leads_csv": lambda c, n: c.get(
+            "/api/export/leads",
+            params={"format": "csv", "created_from": (datetime.utcnow() - timedelta(hours=1)).isoformat()},
+            headers=admin_headers,
+        ),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, request: Callable, requests: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    sequence = itertools.count()
+    for _ in range(warmup):
+        await request(client, next(sequence))
+
+    samples: List[float] = []
+    statuses: Dict[str, int] = {}
+    remaining = itertools.count()
+
+    async def worker():
+        while next(remaining) < requests:
+            started = time.perf_counter()
+            response = await request(client, next(sequence))
+            samples.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    result = summarize(samples)
+    result["throughput_rps"] = round(len(samples) / elapsed, 1) if elapsed else 0.0
+    result["errors"] = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    result["statuses"] = statuses
+    return result
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Scenarios whose p95 grew or throughput shrank by more than tolerance relative to the baseline"""
+    regressions = []
+    for name, base in baseline.get("scenarios", {}).items():
+        current = results["scenarios"].get(name)
+        if current is None:
+            continue
+        if base["p95_ms"] and current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']} ms -> {current['p95_ms']} ms")
+        if base["throughput_rps"] and current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: errors {base.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+async def main(args) -> int:
+    # One INFO line per request from httpx would dwarf the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    async with server.app.router.lifespan_context(server.app):
+        seeded = await seed(args)
+        scenarios = build_scenarios(args)
+        selected = [name for name in scenarios if not args.scenarios or any(name.startswith(s) for s in args.scenarios)]
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        transport = httpx.ASGITransport(app=server.app)
+        results: Dict[str, Any] = {
+            "started_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "seeded": seeded,
+            "scenarios": {},
+        }
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=60) as client:
+            for name in selected:
+                requests = max(1, args.requests // 10) if name.startswith(("auth.login", "auth.register", "export.")) else args.requests
+                results["scenarios"][name] = await run_scenario(client, scenarios[name], requests, args.concurrency, args.warmup)
+                print(f"{name}: {json.dumps(results['scenarios'][name])}", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000, help="users to seed")
+    parser.add_argument("--leads", type=int, default=1000000, help="leads to seed")
+    parser.add_argument("--contacts", type=int, default=100000, help="contacts to seed")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients per scenario")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario (a tenth for bcrypt and export scenarios)")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests before each scenario")
+    parser.add_argument("--scenarios", nargs="*", help="only run scenarios whose name starts with one of these")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against this report and exit 1 on regressions")
+    parser.add_argument("--save-baseline", help="write the report as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative p95/throughput change")
+    sys.exit(asyncio.run(main(parser.parse_args())))
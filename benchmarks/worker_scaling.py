@@ -0,0 +1,111 @@
+"""Worker scaling benchmark.
+
+Starts run.py with 1, 2, ... --max-workers uvicorn workers in turn against the
+database at MONGO_URL/DB_NAME and drives a fixed mix of read routes over HTTP
+at the same concurrency, reporting requests per second and p50/p95/p99 for
+each worker count. Run the load generator on a different machine (or pinned to
+other cores) than the server, or it competes with the workers for CPU.
+
+    MONGO_URL=mongodb://localhost:27017 DB_NAME=lexi_bench python benchmarks/worker_scaling.py --max-workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# auth reads ADMIN_EMAILS at import time, and the workers inherit it; the lead listing needs an admin token
+os.environ.setdefault("ADMIN_EMAILS", "bench-admin@example.com")
+
+from auth import create_access_token  # noqa: E402
+from benchmarks.common import summarize  # noqa: E402
+
+ROUTE_MIX = [
+    "/api/content/faq",
+    "/api/content/testimonials",
+    "/api/analytics/stats",
+    "/api/leads/?limit=20",
+]
+
+
+async def wait_until_ready(base_url: str, timeout: float):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2) as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get("/api/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not start within {timeout} seconds")
+
+
+async def drive(base_url: str, duration: float, concurrency: int) -> Dict[str, float]:
+    samples: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    admin_email = os.environ["ADMIN_EMAILS"].split(",")[0].strip()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench-admin', 'email': admin_email})}"}
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30, headers=headers) as client:
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(ROUTE_MIX[i % len(ROUTE_MIX)])
+                samples.append(time.perf_counter() - started)
+                errors += response.status_code >= 400
+                i += 1
+
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    result = summarize(samples)
+    result["throughput_rps"] = round(len(samples) / elapsed, 1)
+    result["errors"] = errors
+    return result
+
+
+async def main(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    for workers in range(1, args.max_workers + 1):
+        env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(args.port), HOST="127.0.0.1")
+        server = subprocess.Popen([sys.executable, "run.py"], cwd=ROOT_DIR, env=env)
+        try:
+            await wait_until_ready(base_url, args.startup_timeout)
+            await drive(base_url, args.warmup, args.concurrency)
+            results[str(workers)] = await drive(base_url, args.duration, args.concurrency)
+            print(f"{workers} workers: {json.dumps(results[str(workers)])}", file=sys.stderr)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    single = results["1"]["throughput_rps"]
+    for result in results.values():
+        result["speedup"] = round(result["throughput_rps"] / single, 2) if single else None
+    print(json.dumps({"concurrency": args.concurrency, "duration": args.duration, "workers": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8055)
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per worker count")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds per worker count")
+    parser.add_argument("--concurrency", type=int, default=128, help="concurrent HTTP clients")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    asyncio.run(main(parser.parse_args()))
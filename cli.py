@@ -0,0 +1,144 @@
+"""Lexi backend command line tools.
+
+    python cli.py export leads --format parquet --output leads.parquet
+    python cli.py backfill-rollups --created-from 2024-01-01
+    python cli.py backfill-search-fields
+    python cli.py backfill-created-at
+    python cli.py import leads.csv --source crm --report import-report.json
+"""
+import asyncio
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import typer
+from dotenv import load_dotenv
+
+from database import connect_to_mongo, close_mongo_connection, get_database, COLLECTIONS
+from services.export_service import ExportService, EXPORT_FIELDS, EXPORT_CHUNK_SIZE, build_export_query
+from services.rollup_service import RollupService
+from services.search_service import SearchService, NORMALIZED_FIELDS
+from services.import_service import LeadImportService, LeadImportError, LEAD_IMPORT_BATCH_SIZE
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+app = typer.Typer(help="Lexi backend command line tools")
+
+@app.callback()
+def main():
+    """Lexi backend command line tools"""
+
+@app.command()
+def export(
+    collection: str = typer.Argument(..., help="leads or contacts"),
+    format: str = typer.Option("csv", "--format", "-f", help="csv or parquet"),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="defaults to <collection>.<format>"),
+    chunk_size: int = typer.Option(EXPORT_CHUNK_SIZE, help="documents per batch"),
+    created_from: Optional[datetime] = typer.Option(None, help="only documents created at or after this time"),
+    created_to: Optional[datetime] = typer.Option(None, help="only documents created before this time"),
+):
+    """Stream a collection to a CSV or Parquet file"""
+    if collection not in EXPORT_FIELDS:
+        raise typer.BadParameter(f"collection must be one of: {', '.join(EXPORT_FIELDS)}")
+    if format not in ("csv", "parquet"):
+        raise typer.BadParameter("format must be csv or parquet")
+    output = output or Path(f"{collection}.{format}")
+
+    async def run():
+        await connect_to_mongo()
+        try:
+            with open(output, "wb") as f:
+                async for chunk in ExportService.stream(
+                    collection, format, build_export_query(created_from, created_to), chunk_size
+                ):
+                    f.write(chunk)
+        finally:
+            await close_mongo_connection()
+
+    asyncio.run(run())
+    typer.echo(f"Exported {collection} to {output}")
+
+@app.command("backfill-rollups")
+def backfill_rollups(
+    created_from: Optional[datetime] = typer.Option(None, help="rebuild buckets from this day on (UTC midnight)"),
+    created_to: Optional[datetime] = typer.Option(None, help="rebuild buckets before this day (UTC midnight)"),
+):
+    """Rebuild the hourly and daily lead rollups from the leads collection (MongoDB 5.0+)"""
+    for bound in (created_from, created_to):
+        if bound is not None and bound != bound.replace(hour=0, minute=0, second=0, microsecond=0):
+            raise typer.BadParameter("range bounds must be whole days so no bucket is rebuilt from part of its leads")
+
+    async def run():
+        await connect_to_mongo()
+        try:
+            await RollupService.backfill(created_from, created_to)
+        finally:
+            await close_mongo_connection()
+
+    asyncio.run(run())
+    typer.echo("Lead rollups rebuilt")
+
+@app.command("backfill-search-fields")
+def backfill_search_fields():
+    """Add the normalized search fields to leads and contacts stored before they existed"""
+
+    async def run():
+        await connect_to_mongo()
+        try:
+            for key in NORMALIZED_FIELDS:
+                updated = await SearchService.backfill(key)
+                typer.echo(f"Backfilled search fields on {updated} {key}")
+        finally:
+            await close_mongo_connection()
+
+    asyncio.run(run())
+
+@app.command("backfill-created-at")
+def backfill_created_at():
+    """Set created_at on leads and contacts stored without it, from the time in their ObjectId"""
+
+    async def run():
+        await connect_to_mongo()
+        try:
+            for key in ('leads', 'contacts'):
+                result = await get_database()[COLLECTIONS[key]].update_many(
+                    {"created_at": None},
+                    [{"$set": {"created_at": {"$toDate": "$_id"}}}]
+                )
+                typer.echo(f"Backfilled created_at on {result.modified_count} {key}")
+        finally:
+            await close_mongo_connection()
+
+    asyncio.run(run())
+
+@app.command("import")
+def import_leads(
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, help="CSV file with a header row"),
+    source: str = typer.Option("import", help="source of rows that have none"),
+    batch_size: int = typer.Option(LEAD_IMPORT_BATCH_SIZE, help="rows per bulk write"),
+    report: Optional[Path] = typer.Option(None, help="write the full JSON report here"),
+):
+    """Create or update leads from a CSV file, upserting on email"""
+
+    async def run():
+        await connect_to_mongo()
+        try:
+            with open(path, "rb") as f:
+                return await LeadImportService.import_csv(f, default_source=source, batch_size=batch_size)
+        finally:
+            await close_mongo_connection()
+
+    try:
+        result = asyncio.run(run())
+    except LeadImportError as e:
+        raise typer.BadParameter(str(e))
+    if report:
+        report.write_text(json.dumps(result, indent=2, default=str))
+    typer.echo(f"Imported {result['rows']} rows from {path}: {result['summary']}")
+    for error in result["errors"][:20]:
+        typer.echo(f"  line {error['line']} ({error['email']}): {error['status']}", err=True)
+
+if __name__ == "__main__":
+    app()
@@ -1,13 +1,66 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import DuplicateKeyError
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from services.mongo_monitoring import pool_metrics
+from services.metrics import command_metrics, METRICS_ENABLED
+from services.slow_query import slow_query_listener
+import asyncio
+import hashlib
+import importlib.util
+import json
 import os
-from typing import Optional
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Connection pool configuration
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGO_POOL_WARMUP_TIMEOUT_SECONDS = float(os.environ.get('MONGO_POOL_WARMUP_TIMEOUT_SECONDS', '5'))
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', '')  # e.g. "zstd,snappy,zlib"
+
+# Read preference per workload (see get_database); reads outside these workloads go to the primary
+MONGO_READ_PREFERENCE_ADMIN = os.environ.get('MONGO_READ_PREFERENCE_ADMIN', 'secondaryPreferred')
+MONGO_READ_PREFERENCE_ANALYTICS = os.environ.get('MONGO_READ_PREFERENCE_ANALYTICS', 'secondaryPreferred')
+# Skip secondaries lagging further behind the primary; the driver requires at least 90
+MONGO_MAX_STALENESS_SECONDS = int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', '90'))
+
+# Python packages the driver needs for each wire compressor (zlib ships with Python)
+COMPRESSOR_MODULES = {'zstd': 'zstandard', 'snappy': 'snappy', 'zlib': 'zlib'}
+
+READ_PREFERENCE_MODES = {
+    'primary': Primary,
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+def read_preference(mode: str, max_staleness: int = MONGO_MAX_STALENESS_SECONDS) -> Any:
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"Unsupported read preference: {mode}")
+    if mode == 'primary':
+        return Primary()
+    return READ_PREFERENCE_MODES[mode](max_staleness=max_staleness)
+
+# Workloads that tolerate slightly stale reads, so they can be kept off the primary that serves
+# logins and lead writes: admin listings, search, exports and reports, and the analytics counters
+READ_WORKLOADS: Dict[str, Any] = {
+    'admin': read_preference(MONGO_READ_PREFERENCE_ADMIN),
+    'analytics': read_preference(MONGO_READ_PREFERENCE_ANALYTICS),
+}
+
 class MongoDB:
     client: Optional[AsyncIOMotorClient] = None
     database: Optional[AsyncIOMotorDatabase] = None
+    workloads: Dict[str, AsyncIOMotorDatabase] = {}
 
 db = MongoDB()
 
@@ -20,13 +73,21 @@ async def connect_to_mongo():
         raise Exception("MONGO_URL environment variable is not set")
     
     try:
-        db.client = AsyncIOMotorClient(mongo_url)
+        db.client = AsyncIOMotorClient(mongo_url, **client_options())
         db.database = db.client[db_name]
+        db.workloads = {
+            workload: db.client.get_database(db_name, read_preference=preference)
+            for workload, preference in READ_WORKLOADS.items()
+        }
+        slow_query_listener.attach(db.client, asyncio.get_running_loop())
         
         # Test the connection
         await db.client.admin.command('ping')
         logger.info(f"Connected to MongoDB database: {db_name}")
         
+        # Pool warm-up is left to the caller (server.py runs it in the background behind /readyz)
+        await ensure_schema(db.database)
+        
     except Exception as e:
         logger.error(f"Error connecting to MongoDB: {e}")
         raise
@@ -37,11 +98,64 @@ async def close_mongo_connection():
         db.client.close()
         logger.info("Disconnected from MongoDB")
 
-def get_database() -> AsyncIOMotorDatabase:
-    """Get database instance"""
+def client_options() -> Dict[str, Any]:
+    """Motor client keyword arguments built from the pool environment settings"""
+    compressors = []
+    for name in [c.strip() for c in MONGO_COMPRESSORS.split(',') if c.strip()]:
+        module = COMPRESSOR_MODULES.get(name)
+        if module is None or importlib.util.find_spec(module) is None:
+            logger.warning(f"MongoDB compressor '{name}' is unavailable and will not be used")
+            continue
+        compressors.append(name)
+    
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [pool_metrics, slow_query_listener],
+    }
+    if METRICS_ENABLED:
+        options["event_listeners"].append(command_metrics)
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+async def warm_up_pool():
+    """Open minPoolSize connections before serving so the first requests skip connection setup"""
+    if MONGO_MIN_POOL_SIZE <= 0:
+        return
+    # Concurrent commands each check out their own connection; the driver's background
+    # pool maintenance tops up the rest (once per second) until minPoolSize is reached
+    await asyncio.gather(*[db.client.admin.command('ping') for _ in range(MONGO_MIN_POOL_SIZE)])
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + MONGO_POOL_WARMUP_TIMEOUT_SECONDS
+    while pool_metrics.open_connections < MONGO_MIN_POOL_SIZE and loop.time() < deadline:
+        await asyncio.sleep(0.1)
+    logger.info(
+        f"MongoDB connection pool warmed: {pool_metrics.open_connections} open "
+        f"(min {MONGO_MIN_POOL_SIZE}, max {MONGO_MAX_POOL_SIZE})"
+    )
+
+def writable_addresses() -> Set[Tuple[str, int]]:
+    """Servers that take writes (the primary, or each mongos) as last seen by the driver's monitoring"""
+    if db.client is None:
+        return set()
+    servers = db.client.topology_description.server_descriptions()
+    return {address for address, server in servers.items() if server.is_writable}
+
+def get_database(workload: Optional[str] = None) -> AsyncIOMotorDatabase:
+    """Get database instance, with the read preference of a workload in READ_WORKLOADS if given
+
+    Without a workload reads go to the primary: use that for anything that must see
+    the caller's own writes. Writes always go to the primary.
+    """
     if db.database is None:
         raise Exception("Database not initialized")
-    return db.database
+    if workload is None:
+        return db.database
+    return db.workloads[workload]
 
 # Collection names
 COLLECTIONS = {
@@ -51,7 +165,246 @@ COLLECTIONS = {
     'faqs': 'faqs',
     'contacts': 'contacts',
     'analytics': 'analytics',
+    'stats': 'stats',
+    'meta': 'meta',
+    'revoked_tokens': 'revoked_tokens',
+    'lead_rollups': 'lead_rollups',
+    'analytics_rollups': 'analytics_rollups',
+}
+
+# Raw analytics events are kept this long; dashboards read the analytics_rollups counters
+ANALYTICS_RAW_RETENTION_DAYS = int(os.environ.get('ANALYTICS_RAW_RETENTION_DAYS', '7'))
+# Matches the typical gap between events of one (event, source) series; "seconds", "minutes" or "hours"
+ANALYTICS_TIMESERIES_GRANULARITY = os.environ.get('ANALYTICS_TIMESERIES_GRANULARITY', 'seconds')
+
+# Collections created as time-series collections (MongoDB 5.0+), per collection key in COLLECTIONS
+TIMESERIES_COLLECTIONS: Dict[str, Dict[str, Any]] = {
+    'analytics': {
+        "timeseries": {"timeField": "timestamp", "metaField": "meta", "granularity": ANALYTICS_TIMESERIES_GRANULARITY},
+        "expireAfterSeconds": ANALYTICS_RAW_RETENTION_DAYS * 86400,
+    },
 }
 
+# Index coverage check at startup: "warn" logs uncovered queries, "strict" refuses to start, "off" skips it
+INDEX_COVERAGE_CHECK = os.environ.get('INDEX_COVERAGE_CHECK', 'warn')
 
+# Indexes the app relies on, per collection key in COLLECTIONS
+INDEXES: Dict[str, List[IndexModel]] = {
+    'users': [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    ],
+    'leads': [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id_desc"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_at_id_desc"),
+        IndexModel([("source", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="source_created_at_id_desc"),
+        # Case-insensitive prefix search, in keyset order
+        IndexModel([("email_lower", ASCENDING), ("id", ASCENDING)], name="email_lower_id"),
+        IndexModel([("company_lower", ASCENDING), ("id", ASCENDING)], name="company_lower_id"),
+    ],
+    'contacts': [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id_desc"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_at_id_desc"),
+        IndexModel([("email_lower", ASCENDING), ("id", ASCENDING)], name="email_lower_id"),
+        # Full-text search; a subject match counts more than a match in the message body. Messages
+        # come in several languages, so words are matched as written (no stemming or stop words)
+        IndexModel(
+            [("subject", TEXT), ("message", TEXT)],
+            weights={"subject": 3, "message": 1}, default_language="none", name="subject_message_text"
+        ),
+    ],
+    'testimonials': [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("is_active", ASCENDING), ("order", ASCENDING)], name="is_active_order"),
+    ],
+    'faqs': [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("is_active", ASCENDING), ("order", ASCENDING)], name="is_active_order"),
+    ],
+    'revoked_tokens': [
+        # Revocations disappear once the tokens they cover would have expired anyway
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+        IndexModel([("revoked_at", ASCENDING)], name="revoked_at"),
+    ],
+    'analytics_rollups': [
+        # Also the $merge key of the rollup job
+        IndexModel(
+            [("granularity", ASCENDING), ("event", ASCENDING), ("bucket", ASCENDING), ("source", ASCENDING)],
+            unique=True, name="granularity_event_bucket_source_unique"
+        ),
+        # Minute and hour counters expire; day counters have no expires_at and are kept
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+    'lead_rollups': [
+        # One document per bucket and attribution key; also the $merge key of the backfill
+        IndexModel(
+            [("granularity", ASCENDING), ("bucket", ASCENDING), ("source", ASCENDING),
+             ("utm_source", ASCENDING), ("utm_medium", ASCENDING), ("utm_campaign", ASCENDING)],
+            unique=True, name="granularity_bucket_attribution_unique"
+        ),
+    ],
+}
+
+# Query shapes issued by the routes: (description, collection key, filter, sort)
+QUERY_SHAPES: List[tuple] = [
+    ("auth login/register: users by email", 'users', {"email": "user@example.com"}, None),
+    ("auth profile: users by id", 'users', {"id": "id"}, None),
+    ("leads create: leads by email", 'leads', {"email": "lead@example.com"}, None),
+    ("leads list: newest first", 'leads', {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("leads list: by status", 'leads', {"status": "new"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("leads list: by source", 'leads', {"source": "hero"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("contacts list: newest first", 'contacts', {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("search: leads by email prefix", 'leads', {"email_lower": {"$gte": "lead", "$lt": "leae"}}, [("email_lower", ASCENDING), ("id", ASCENDING)]),
+    ("search: leads by company prefix", 'leads', {"company_lower": {"$gte": "acme", "$lt": "acmf"}}, [("company_lower", ASCENDING), ("id", ASCENDING)]),
+    ("search: contacts by email prefix", 'contacts', {"email_lower": {"$gte": "jo", "$lt": "jp"}}, [("email_lower", ASCENDING), ("id", ASCENDING)]),
+    ("contacts list: by status", 'contacts', {"status": "new"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("content testimonials: active by order", 'testimonials', {"is_active": True}, [("order", ASCENDING)]),
+    ("content faq: active by order", 'faqs', {"is_active": True}, [("order", ASCENDING)]),
+    ("leads attribution/funnel: rollups by bucket range", 'lead_rollups', {"granularity": "day", "bucket": {"$gte": datetime(2024, 1, 1)}}, None),
+    ("analytics series: rollups by event and bucket range", 'analytics_rollups', {"granularity": "hour", "event": "page_view", "bucket": {"$gte": datetime(2024, 1, 1)}}, None),
+    ("token revocation refresh: newest revocations", 'revoked_tokens', {"revoked_at": {"$gte": datetime(2024, 1, 1)}}, [("revoked_at", ASCENDING)]),
+]
+
+def schema_fingerprint() -> str:
+    """Digest of INDEXES and TIMESERIES_COLLECTIONS; a change to any definition changes it"""
+    spec = {key: [index.document for index in indexes] for key, indexes in INDEXES.items()}
+    spec["timeseries"] = TIMESERIES_COLLECTIONS
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+async def ensure_schema(database: AsyncIOMotorDatabase):
+    """Build indexes and check coverage, unless a previous start already did it for these INDEXES"""
+    fingerprint = schema_fingerprint()
+    if await get_marker('schema') == fingerprint:
+        logger.info(f"MongoDB indexes up to date (schema {fingerprint})")
+        return
+    
+    complete = await ensure_collections(database)
+    complete = await ensure_indexes(database) and complete
+    if INDEX_COVERAGE_CHECK != 'off':
+        problems = await check_index_coverage(database, strict=INDEX_COVERAGE_CHECK == 'strict')
+        complete = complete and not problems
+    # Anything that failed is tried again on the next start
+    if complete:
+        await set_marker('schema', fingerprint)
+    else:
+        logger.warning(f"MongoDB schema {fingerprint} incomplete; it will be ensured again on the next start")
+
+async def ensure_collections(database: AsyncIOMotorDatabase) -> bool:
+    """Create the time-series collections in TIMESERIES_COLLECTIONS, or update their expiry; False if any failed"""
+    complete = True
+    for key, options in TIMESERIES_COLLECTIONS.items():
+        name = COLLECTIONS[key]
+        try:
+            existing = await database.list_collections(filter={"name": name}).to_list(length=1)
+            if not existing:
+                await database.create_collection(name, **options)
+                logger.info(f"Created time-series collection {name}")
+            elif existing[0].get("type") != "timeseries":
+                # A collection cannot be converted in place; it has to be migrated by hand
+                logger.warning(f"Collection {name} exists but is not a time-series collection")
+                complete = False
+            else:
+                await database.command("collMod", name, expireAfterSeconds=options["expireAfterSeconds"])
+        except Exception as e:
+            logger.error(f"Error creating time-series collection {name}: {e}")
+            complete = False
+    return complete
+
+async def ensure_indexes(database: AsyncIOMotorDatabase) -> bool:
+    """Create every index declared in INDEXES (no-op for indexes that already exist); False if any failed"""
+    complete = True
+    for key, indexes in INDEXES.items():
+        try:
+            await database[COLLECTIONS[key]].create_indexes(indexes)
+        except Exception as e:
+            # Typically a unique index over existing duplicates; the app still runs without it
+            logger.error(f"Error creating indexes on {COLLECTIONS[key]}: {e}")
+            complete = False
+    if complete:
+        logger.info("MongoDB indexes ensured")
+    return complete
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Flatten the stage names of an explain() query plan"""
+    stages = [plan.get("stage", "")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    for shard in plan.get("shards", []):
+        stages += _plan_stages(shard.get("winningPlan", {}))
+    return stages
+
+async def check_index_coverage(database: AsyncIOMotorDatabase, strict: bool = False) -> List[str]:
+    """Explain each query shape in QUERY_SHAPES; returns the ones that would be a COLLSCAN or could not be explained"""
+    uncovered = []
+    for description, key, query, sort in QUERY_SHAPES:
+        cursor = database[COLLECTIONS[key]].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            explain = await cursor.explain()
+        except Exception as e:
+            if strict:
+                raise
+            logger.warning(f"Could not explain query shape '{description}': {e}")
+            uncovered.append(description)
+            continue
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        # Plans from the slot-based engine nest the classic tree under queryPlan
+        stages = _plan_stages(winning_plan.get("queryPlan", winning_plan))
+        if "COLLSCAN" in stages:
+            uncovered.append(description)
+            logger.error(f"Query not covered by an index (COLLSCAN): {description}")
+
+    if uncovered and strict:
+        raise Exception(f"Queries not covered by an index: {', '.join(uncovered)}")
+    if not uncovered:
+        logger.info("All route query shapes are covered by indexes")
+    return uncovered
+
+# Deployment state shared by every worker and instance: version markers and short-lived locks,
+# kept as {_id: name} documents in the meta collection
+
+async def get_marker(name: str) -> Any:
+    """Version recorded for a one-off task such as seeding or index builds, None if it never ran"""
+    doc = await get_database()[COLLECTIONS['meta']].find_one({"_id": f"marker:{name}"}, {"version": 1})
+    return doc.get("version") if doc else None
+
+async def set_marker(name: str, version: Any):
+    await get_database()[COLLECTIONS['meta']].update_one(
+        {"_id": f"marker:{name}"},
+        {"$set": {"version": version, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+async def wait_for_marker(name: str, version: int, timeout: float) -> bool:
+    """Poll until the marker reaches version or timeout seconds pass"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if (await get_marker(name) or 0) >= version:
+            return True
+        await asyncio.sleep(0.25)
+    return False
+
+async def acquire_lock(name: str, ttl_seconds: float) -> Optional[str]:
+    """Take a named lock for ttl_seconds; returns an owner token, or None if someone else holds it"""
+    owner = uuid.uuid4().hex
+    now = datetime.utcnow()
+    try:
+        # Matches only a missing or expired lock; otherwise the upsert collides on _id
+        await get_database()[COLLECTIONS['meta']].update_one(
+            {"_id": f"lock:{name}", "expires_at": {"$lt": now}},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True
+        )
+        return owner
+    except DuplicateKeyError:
+        return None
 
+async def release_lock(name: str, owner: str):
+    await get_database()[COLLECTIONS['meta']].delete_one({"_id": f"lock:{name}", "owner": owner})
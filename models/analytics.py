@@ -0,0 +1,25 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+import uuid
+
+class AnalyticsEventCreate(BaseModel):
+    # Unknown top-level keys sent by the frontend are kept and folded into properties
+    model_config = ConfigDict(extra="allow")
+
+    event: str = Field(min_length=1, max_length=100)
+    source: Optional[str] = Field(default=None, max_length=100)
+    session_id: Optional[str] = None
+    user_id: Optional[str] = None
+    properties: Dict[str, Any] = {}
+    timestamp: Optional[datetime] = None
+
+class AnalyticsEvent(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    event: str
+    source: Optional[str] = None
+    session_id: Optional[str] = None
+    user_id: Optional[str] = None
+    properties: Dict[str, Any] = {}
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    received_at: datetime = Field(default_factory=datetime.utcnow)
@@ -41,3 +41,6 @@ class ContactResponse(BaseModel):
     type: ContactType
     status: ContactStatus
     created_at: datetime
+
+class ContactSearchResult(ContactResponse):
+    score: Optional[float] = None
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 from datetime import datetime
 import uuid
@@ -19,6 +19,21 @@ class FAQCreate(BaseModel):
     category: Optional[str] = "general"
     order: Optional[int] = 0
 
+class FAQUpdate(BaseModel):
+    question: Optional[str] = None
+    answer: Optional[str] = None
+    category: Optional[str] = None
+    order: Optional[int] = None
+    is_active: Optional[bool] = None
+
+    @field_validator("question", "answer", "order", "is_active")
+    @classmethod
+    def not_null(cls, value):
+        # Omit a field to leave it unchanged; only category can be cleared with null
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 class FAQResponse(BaseModel):
     id: str
     question: str
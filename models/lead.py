@@ -43,3 +43,6 @@ class LeadResponse(BaseModel):
     source: str
     status: LeadStatus
     created_at: datetime
+
+class LeadStatusUpdate(BaseModel):
+    status: LeadStatus
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 from datetime import datetime
 import uuid
@@ -25,6 +25,24 @@ class TestimonialCreate(BaseModel):
     rating: Optional[int] = Field(default=5, ge=1, le=5)
     order: Optional[int] = 0
 
+class TestimonialUpdate(BaseModel):
+    text: Optional[str] = None
+    author: Optional[str] = None
+    role: Optional[str] = None
+    company: Optional[str] = None
+    avatar: Optional[str] = None
+    rating: Optional[int] = Field(default=None, ge=1, le=5)
+    order: Optional[int] = None
+    is_active: Optional[bool] = None
+
+    @field_validator("text", "author", "role", "rating", "order", "is_active")
+    @classmethod
+    def not_null(cls, value):
+        # Omit a field to leave it unchanged; only company and avatar can be cleared with null
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 class TestimonialResponse(BaseModel):
     id: str
     text: str
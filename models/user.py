@@ -42,6 +42,14 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
+class TokenRevoke(BaseModel):
+    user_id: Optional[str] = None
+    token: Optional[str] = None
+
 class UserResponse(BaseModel):
     id: str
     email: str
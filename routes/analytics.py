@@ -1,22 +1,29 @@
-from fastapi import APIRouter, HTTPException
-from database import get_database, COLLECTIONS
+from fastapi import APIRouter, HTTPException, Depends, Query
+from auth import get_current_admin
+from models.analytics import AnalyticsEventCreate
+from services.stats_service import StatsService
+from services.analytics_service import analytics_ingestor, build_event_document, AnalyticsQueueFullError
+from services.analytics_rollup import (
+    analytics_rollups, LEVELS, LEVEL_SECONDS, ROLLUP_RETENTION_DAYS, ANALYTICS_SERIES_MAX_POINTS, floor_time, ceil_time, naive_utc
+)
+from typing import List, Optional
 import logging
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 logger = logging.getLogger(__name__)
 
+ANALYTICS_TRACK_BATCH_MAX_ITEMS = int(os.environ.get('ANALYTICS_TRACK_BATCH_MAX_ITEMS', '500'))
+
 @router.get("/stats")
 async def get_stats():
     """Get public analytics stats"""
     try:
-        db = get_database()
-        
-        # Count users
-        users_count = await db[COLLECTIONS['users']].count_documents({})
-        
-        # Count leads
-        leads_count = await db[COLLECTIONS['leads']].count_documents({})
+        # Materialized counters, maintained on insert instead of counted per request
+        counts = await StatsService.get_counts()
+        users_count = counts['users']
+        leads_count = counts['leads']
         
         # For demo purposes, we'll use some dynamic calculations
         # In a real app, these would be calculated from actual data
@@ -38,15 +45,95 @@ async def get_stats():
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/track")
-async def track_event(event_data: dict):
+async def track_event(event_data: AnalyticsEventCreate):
     """Track analytics events"""
     try:
-        # For now, just log the event
-        # In production, you'd store this in a proper analytics system
-        logger.info(f"Analytics event: {event_data}")
+        analytics_ingestor.submit(build_event_document(event_data))
         
         return {"message": "Event tracked successfully"}
         
+    except AnalyticsQueueFullError:
+        raise HTTPException(status_code=429, detail="Too many events, please retry", headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error tracking event: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.post("/track/batch")
+async def track_events(events: List[AnalyticsEventCreate]):
+    """Track several analytics events in one request
+    
+    The batch is accepted whole or, with a 429, not at all. `count` is the number
+    of events queued, which is lower than the batch only when the overflow policy
+    drops events.
+    """
+    if len(events) > ANALYTICS_TRACK_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {ANALYTICS_TRACK_BATCH_MAX_ITEMS} events")
+    
+    try:
+        count = analytics_ingestor.submit_many([build_event_document(event_data) for event_data in events])
+        
+        return {"message": "Events tracked successfully", "count": count}
+        
+    except AnalyticsQueueFullError:
+        raise HTTPException(status_code=429, detail="Too many events, please retry", headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Error tracking events: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/series")
+async def get_series(
+    event: str,
+    source: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    unit: Optional[str] = Query(None, pattern="^(minute|hour|day)$"),
+    bin_size: int = Query(1, ge=1, le=1000),
+    admin: dict = Depends(get_current_admin),
+):
+    """Event counts over time, per bin of bin_size units (admin endpoint)
+    
+    Defaults to the last 24 hours. Without `unit`, the finest unit giving at most
+    ANALYTICS_SERIES_MAX_POINTS bins is used. The range is widened to whole bins.
+    Counts come from the coarsest rollup level the bins allow, and finer levels or
+    raw events only for the most recent part not yet compacted.
+    """
+    # Offsets such as Z or +02:00 are converted; the bins and retention checks work in naive UTC
+    end = naive_utc(end) or datetime.utcnow()
+    start = naive_utc(start) or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    now = datetime.utcnow()
+    if unit is None:
+        # Falls through to "day" when even days are too many points; rejected below
+        unit = next(
+            (level for level in LEVELS if (end - start).total_seconds() / (LEVEL_SECONDS[level] * bin_size) <= ANALYTICS_SERIES_MAX_POINTS
+             and (level not in ROLLUP_RETENTION_DAYS or start >= now - timedelta(days=ROLLUP_RETENTION_DAYS[level]))),
+            LEVELS[-1]
+        )
+    if unit in ROLLUP_RETENTION_DAYS and start < now - timedelta(days=ROLLUP_RETENTION_DAYS[unit]):
+        raise HTTPException(status_code=400, detail=f"{unit} counts are only kept for {ROLLUP_RETENTION_DAYS[unit]} days")
+    
+    seconds = LEVEL_SECONDS[unit] * bin_size
+    start = floor_time(start, seconds)
+    end = ceil_time(end, seconds)
+    if (end - start).total_seconds() / seconds > ANALYTICS_SERIES_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Series exceeds {ANALYTICS_SERIES_MAX_POINTS} points")
+    
+    try:
+        points = await analytics_rollups.series(event, source, unit, bin_size, start, end)
+        
+        return {
+            "event": event,
+            "source": source,
+            "unit": unit,
+            "bin_size": bin_size,
+            "start": start,
+            "end": end,
+            "total": sum(point["count"] for point in points),
+            "points": points
+        }
+        
+    except Exception as e:
+        logger.error(f"Error fetching analytics series: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,41 +1,64 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Security
 from fastapi.security import HTTPAuthorizationCredentials
-from models.user import User, UserCreate, UserLogin, UserResponse
-from auth import hash_password, verify_password, create_access_token, get_current_user
+from models.user import User, UserCreate, UserLogin, UserResponse, PasswordChange, TokenRevoke
+from services.serialization import encode_model, json_response
+from auth import (
+    hash_password_async, verify_password_async, create_access_token, get_current_user, get_current_admin,
+    verify_token, revoke_token, revoke_user_tokens, security, JWT_SECRET, JWT_ALGORITHM,
+    profile_cache, PROFILE_CACHE_TTL_SECONDS,
+)
+from services.hashing import HashingOverloadedError
+from services.admission import auth_email_limiter
+from services.stats_service import StatsService
+from services.query import projection_for
 from database import get_database, COLLECTIONS
 from datetime import datetime, timedelta
+import jwt
 import logging
+import math
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 logger = logging.getLogger(__name__)
 
+def check_email_rate_limit(email: str):
+    """Per-email token bucket for login/register; the per-IP bucket runs in AdmissionControlMiddleware"""
+    retry_after = auth_email_limiter.consume(email.lower())
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429, detail="Too many attempts, please retry later",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
 @router.post("/register", response_model=dict)
 async def register(user_data: UserCreate):
     """Register a new user"""
     try:
+        check_email_rate_limit(user_data.email)
+        
         db = get_database()
         users_collection = db[COLLECTIONS['users']]
         
         # Check if user already exists
-        existing_user = await users_collection.find_one({"email": user_data.email})
+        existing_user = await users_collection.find_one({"email": user_data.email}, {"_id": 1})
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Hash password and create user
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await hash_password_async(user_data.password)
         
         # Set trial end date (7 days from now)
         trial_ends_at = datetime.utcnow() + timedelta(days=7)
         
         user = User(
-            **user_data.dict(exclude={"password"}),
+            **user_data.model_dump(exclude={"password"}),
             password=hashed_password,
             trial_ends_at=trial_ends_at
         )
         
         # Insert user to database
-        user_dict = user.dict()
+        user_dict = user.model_dump()
         await users_collection.insert_one(user_dict)
+        await StatsService.increment('users')
         
         # Create access token
         access_token = create_access_token(data={"sub": user.id, "email": user.email})
@@ -43,11 +66,14 @@ async def register(user_data: UserCreate):
         return {
             "access_token": access_token,
             "token_type": "bearer",
-            "user": UserResponse(**user.dict())
+            "user": UserResponse.model_validate(user_dict).model_dump(mode="json")
         }
         
     except HTTPException:
         raise
+    except HashingOverloadedError as e:
+        logger.warning(f"Hashing executor overloaded: {e}")
+        raise HTTPException(status_code=503, detail="Service busy, please retry", headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error registering user: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -56,19 +82,23 @@ async def register(user_data: UserCreate):
 async def login(credentials: UserLogin):
     """Login user"""
     try:
+        check_email_rate_limit(credentials.email)
+        
         db = get_database()
         users_collection = db[COLLECTIONS['users']]
         
         # Find user by email
-        user_doc = await users_collection.find_one({"email": credentials.email})
+        user_doc = await users_collection.find_one(
+            {"email": credentials.email}, projection_for(UserResponse, "password")
+        )
         if not user_doc:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
         # Verify password
-        if not verify_password(credentials.password, user_doc['password']):
+        if not await verify_password_async(credentials.password, user_doc.pop('password')):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        user = User(**user_doc)
+        user = UserResponse(**user_doc)
         
         # Create access token
         access_token = create_access_token(data={"sub": user.id, "email": user.email})
@@ -76,11 +106,14 @@ async def login(credentials: UserLogin):
         return {
             "access_token": access_token,
             "token_type": "bearer",
-            "user": UserResponse(**user.dict())
+            "user": user.model_dump(mode="json")
         }
         
     except HTTPException:
         raise
+    except HashingOverloadedError as e:
+        logger.warning(f"Hashing executor overloaded: {e}")
+        raise HTTPException(status_code=503, detail="Service busy, please retry", headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error logging in user: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -89,15 +122,22 @@ async def login(credentials: UserLogin):
 async def get_profile(current_user: dict = Depends(get_current_user)):
     """Get current user profile"""
     try:
+        if PROFILE_CACHE_TTL_SECONDS > 0:
+            cached_profile = profile_cache.get(current_user["user_id"])
+            if cached_profile is not None:
+                return json_response(cached_profile)
+        
         db = get_database()
         users_collection = db[COLLECTIONS['users']]
         
-        user_doc = await users_collection.find_one({"id": current_user["user_id"]})
+        user_doc = await users_collection.find_one({"id": current_user["user_id"]}, projection_for(UserResponse))
         if not user_doc:
             raise HTTPException(status_code=404, detail="User not found")
         
-        user = User(**user_doc)
-        return UserResponse(**user.dict())
+        profile = encode_model(UserResponse, user_doc)
+        if PROFILE_CACHE_TTL_SECONDS > 0:
+            profile_cache.set(current_user["user_id"], profile)
+        return json_response(profile)
         
     except HTTPException:
         raise
@@ -106,6 +146,86 @@ async def get_profile(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/logout")
-async def logout():
-    """Logout user (client-side token removal)"""
-    return {"message": "Successfully logged out"}
+async def logout(
+    token_payload: dict = Depends(verify_token),
+    credentials: HTTPAuthorizationCredentials = Security(security),
+):
+    """Logout user by revoking the presented token"""
+    try:
+        await revoke_token(credentials.credentials, token_payload)
+        return {"message": "Successfully logged out"}
+        
+    except Exception as e:
+        logger.error(f"Error logging out user: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.post("/password", response_model=dict)
+async def change_password(passwords: PasswordChange, current_user: dict = Depends(get_current_user)):
+    """Change the current user's password and revoke every other session"""
+    try:
+        db = get_database()
+        users_collection = db[COLLECTIONS['users']]
+        
+        user_doc = await users_collection.find_one(
+            {"id": current_user["user_id"]}, projection_for(UserResponse, "password")
+        )
+        if not user_doc:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        if not await verify_password_async(passwords.current_password, user_doc.pop('password')):
+            raise HTTPException(status_code=401, detail="Invalid current password")
+        
+        hashed_password = await hash_password_async(passwords.new_password)
+        await users_collection.update_one(
+            {"id": current_user["user_id"]},
+            {"$set": {"password": hashed_password, "updated_at": datetime.utcnow()}}
+        )
+        
+        # Every existing token, including the one used for this request, stops working
+        await revoke_user_tokens(current_user["user_id"])
+        user = UserResponse(**user_doc)
+        access_token = create_access_token(data={"sub": user.id, "email": user.email})
+        
+        return {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "user": user.model_dump(mode="json")
+        }
+        
+    except HTTPException:
+        raise
+    except HashingOverloadedError as e:
+        logger.warning(f"Hashing executor overloaded: {e}")
+        raise HTTPException(status_code=503, detail="Service busy, please retry", headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Error changing password: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.post("/revoke", response_model=dict)
+async def revoke(revocation: TokenRevoke, admin: dict = Depends(get_current_admin)):
+    """Revoke a single token or every session of a user (admin endpoint)"""
+    try:
+        if not revocation.user_id and not revocation.token:
+            raise HTTPException(status_code=400, detail="Provide user_id or token")
+        
+        if revocation.token:
+            try:
+                # Expired tokens are rejected anyway, so only the signature matters here
+                payload = jwt.decode(
+                    revocation.token, JWT_SECRET, algorithms=[JWT_ALGORITHM], options={"verify_exp": False}
+                )
+            except jwt.InvalidTokenError:
+                raise HTTPException(status_code=400, detail="Invalid token")
+            await revoke_token(revocation.token, payload)
+        
+        if revocation.user_id:
+            await revoke_user_tokens(revocation.user_id)
+        
+        logger.info(f"Tokens revoked by {admin['email']}: user_id={revocation.user_id}, token={'yes' if revocation.token else 'no'}")
+        return {"message": "Revoked"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error revoking tokens: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,7 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from models.contact import Contact, ContactCreate, ContactResponse
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from auth import get_current_admin
+from models.contact import Contact, ContactCreate, ContactResponse, ContactStatus, ContactType
 from database import get_database, COLLECTIONS
-from typing import List
+from services.query import projection_for
+from services.search_service import normalized_fields
+from services.serialization import encode_list, json_response
+from services.pagination import KEYSET_SORT, STREAM_BATCH_SIZE, build_keyset_query, encode_cursor, stream_ndjson
+from typing import List, Optional
+from datetime import datetime
 import logging
 
 router = APIRouter(prefix="/contact", tags=["Contact"])
@@ -15,10 +22,11 @@ async def create_contact(contact_data: ContactCreate):
         contacts_collection = db[COLLECTIONS['contacts']]
         
         # Create new contact
-        contact = Contact(**contact_data.dict())
+        contact = Contact(**contact_data.model_dump())
         
         # Insert to database
-        contact_dict = contact.dict()
+        contact_dict = contact.model_dump()
+        contact_dict.update(normalized_fields('contacts', contact_dict))
         await contacts_collection.insert_one(contact_dict)
         
         logger.info(f"New contact message from: {contact.email}")
@@ -33,19 +41,44 @@ async def create_contact(contact_data: ContactCreate):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/", response_model=List[ContactResponse])
-async def get_contacts():
-    """Get all contact messages (admin endpoint)"""
+async def get_contacts(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    status: Optional[ContactStatus] = None,
+    type: Optional[ContactType] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    admin: dict = Depends(get_current_admin),
+):
+    """Get contact messages, newest first (admin endpoint)
+    
+    Pages are keyed on (created_at, id): pass the X-Next-Cursor header of a page as
+    `cursor` to get the next one. With format=ndjson every matching document is
+    streamed from the cursor, one per line, and `limit` is ignored.
+    """
     try:
-        db = get_database()
+        query = build_keyset_query({"status": status, "type": type}, cursor, created_from, created_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        db = get_database('admin')
         contacts_collection = db[COLLECTIONS['contacts']]
         
-        cursor = contacts_collection.find({}).sort("created_at", -1).limit(100)
+        if format == "ndjson":
+            db_cursor = contacts_collection.find(query, projection_for(ContactResponse)).sort(KEYSET_SORT).batch_size(STREAM_BATCH_SIZE)
+            return StreamingResponse(stream_ndjson(db_cursor, ContactResponse), media_type="application/x-ndjson")
+        
+        db_cursor = contacts_collection.find(query, projection_for(ContactResponse)).sort(KEYSET_SORT).limit(limit)
+        
+        docs = await db_cursor.to_list(length=limit)
         
-        contacts = []
-        async for doc in cursor:
-            contacts.append(ContactResponse(**doc))
+        headers = {}
+        if len(docs) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(docs[-1])
         
-        return contacts
+        return json_response(encode_list(ContactResponse, docs), headers)
         
     except Exception as e:
         logger.error(f"Error fetching contacts: {e}")
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import ValidationError
 from services.data_service import DataService
-from models.testimonial import TestimonialResponse
-from models.faq import FAQResponse
+from services.serialization import json_response
+from models.testimonial import TestimonialCreate, TestimonialUpdate, TestimonialResponse
+from models.faq import FAQCreate, FAQUpdate, FAQResponse
+from auth import get_current_admin
 from typing import List
 import logging
 
@@ -12,27 +15,8 @@ logger = logging.getLogger(__name__)
 async def get_testimonials():
     """Get all active testimonials"""
     try:
-        from database import get_database, COLLECTIONS
-        db = get_database()
-        
-        # Direct database query for testing
-        cursor = db[COLLECTIONS['testimonials']].find({"is_active": True}).sort("order", 1)
-        testimonials = []
-        
-        async for doc in cursor:
-            # Clean the document for the response model
-            clean_doc = {
-                "id": doc.get("id", str(doc.get("_id", ""))),
-                "text": doc.get("text", ""),
-                "author": doc.get("author", ""),
-                "role": doc.get("role", ""),
-                "company": doc.get("company"),
-                "avatar": doc.get("avatar"),
-                "rating": doc.get("rating", 5)
-            }
-            testimonials.append(TestimonialResponse(**clean_doc))
-        
-        return testimonials
+        body = await DataService.get_testimonials_json()
+        return json_response(body)
     except Exception as e:
         logger.error(f"Error fetching testimonials: {e}")
         # Return fallback data
@@ -42,6 +26,8 @@ async def get_testimonials():
                 text="Lexi consiguió los primeros 2 pedidos para mi nueva tienda en solo 48 horas. ¡Un comienzo absolutamente increíble para cualquier negocio nuevo!",
                 author="Daniel. y",
                 role="Nuevo Propietario de Tienda",
+                company=None,
+                avatar=None,
                 rating=5
             ),
             TestimonialResponse(
@@ -49,6 +35,8 @@ async def get_testimonials():
                 text="Con Lexi, probamos más de 50 libros electrónicos en una sola semana para encontrar nuestros bestsellers. Es la herramienta definitiva para la validación rápida de productos.",
                 author="Augon",
                 role="Propietario de Tienda de Libros Electrónicos",
+                company=None,
+                avatar=None,
                 rating=5
             )
         ]
@@ -57,24 +45,8 @@ async def get_testimonials():
 async def get_faqs():
     """Get all active FAQs"""
     try:
-        from database import get_database, COLLECTIONS
-        db = get_database()
-        
-        # Direct database query for testing
-        cursor = db[COLLECTIONS['faqs']].find({"is_active": True}).sort("order", 1)
-        faqs = []
-        
-        async for doc in cursor:
-            # Clean the document for the response model
-            clean_doc = {
-                "id": doc.get("id", str(doc.get("_id", ""))),
-                "question": doc.get("question", ""),
-                "answer": doc.get("answer", ""),
-                "category": doc.get("category", "general")
-            }
-            faqs.append(FAQResponse(**clean_doc))
-        
-        return faqs
+        body = await DataService.get_faqs_json()
+        return json_response(body)
     except Exception as e:
         logger.error(f"Error fetching FAQs: {e}")
         # Return fallback data
@@ -92,3 +64,99 @@ async def get_faqs():
                 category="general"
             )
         ]
+
+@router.post("/testimonials", response_model=dict)
+async def create_testimonial(testimonial_data: TestimonialCreate, admin: dict = Depends(get_current_admin)):
+    """Create a testimonial (admin endpoint)"""
+    try:
+        testimonial = await DataService.create_testimonial(testimonial_data)
+        logger.info(f"Testimonial {testimonial.id} created by {admin['email']}")
+        
+        return {
+            "message": "Testimonial created successfully",
+            "testimonial_id": testimonial.id
+        }
+        
+    except Exception as e:
+        logger.error(f"Error creating testimonial: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.put("/testimonials/{testimonial_id}", response_model=dict)
+async def update_testimonial(testimonial_id: str, testimonial_data: TestimonialUpdate, admin: dict = Depends(get_current_admin)):
+    """Update a testimonial (admin endpoint)"""
+    try:
+        if not await DataService.update_testimonial(testimonial_id, testimonial_data):
+            raise HTTPException(status_code=404, detail="Testimonial not found")
+        
+        return {"message": "Testimonial updated successfully"}
+        
+    except HTTPException:
+        raise
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+    except Exception as e:
+        logger.error(f"Error updating testimonial: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.delete("/testimonials/{testimonial_id}", response_model=dict)
+async def delete_testimonial(testimonial_id: str, admin: dict = Depends(get_current_admin)):
+    """Delete a testimonial (admin endpoint)"""
+    try:
+        if not await DataService.delete_testimonial(testimonial_id):
+            raise HTTPException(status_code=404, detail="Testimonial not found")
+        
+        return {"message": "Testimonial deleted successfully"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting testimonial: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.post("/faq", response_model=dict)
+async def create_faq(faq_data: FAQCreate, admin: dict = Depends(get_current_admin)):
+    """Create a FAQ (admin endpoint)"""
+    try:
+        faq = await DataService.create_faq(faq_data)
+        logger.info(f"FAQ {faq.id} created by {admin['email']}")
+        
+        return {
+            "message": "FAQ created successfully",
+            "faq_id": faq.id
+        }
+        
+    except Exception as e:
+        logger.error(f"Error creating FAQ: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.put("/faq/{faq_id}", response_model=dict)
+async def update_faq(faq_id: str, faq_data: FAQUpdate, admin: dict = Depends(get_current_admin)):
+    """Update a FAQ (admin endpoint)"""
+    try:
+        if not await DataService.update_faq(faq_id, faq_data):
+            raise HTTPException(status_code=404, detail="FAQ not found")
+        
+        return {"message": "FAQ updated successfully"}
+        
+    except HTTPException:
+        raise
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+    except Exception as e:
+        logger.error(f"Error updating FAQ: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.delete("/faq/{faq_id}", response_model=dict)
+async def delete_faq(faq_id: str, admin: dict = Depends(get_current_admin)):
+    """Delete a FAQ (admin endpoint)"""
+    try:
+        if not await DataService.delete_faq(faq_id):
+            raise HTTPException(status_code=404, detail="FAQ not found")
+        
+        return {"message": "FAQ deleted successfully"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting FAQ: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
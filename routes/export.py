@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from auth import get_current_admin
+from services.export_service import ExportService, EXPORT_FIELDS, EXPORT_FORMATS, build_export_query
+from typing import Optional
+from datetime import datetime
+import logging
+
+router = APIRouter(prefix="/export", tags=["Export"])
+logger = logging.getLogger(__name__)
+
+@router.get("/{collection}")
+async def export_collection(
+    collection: str,
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    admin: dict = Depends(get_current_admin),
+):
+    """Stream leads or contacts as a CSV or Parquet file (admin endpoint)"""
+    if collection not in EXPORT_FIELDS:
+        raise HTTPException(status_code=404, detail="Unknown export collection")
+    
+    logger.info(f"Export of {collection} as {format} requested by {admin['email']}")
+    filename = f"{collection}-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    
+    return StreamingResponse(
+        ExportService.stream(collection, format, build_export_query(created_from, created_to)),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
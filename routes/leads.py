@@ -1,80 +1,295 @@
-from fastapi import APIRouter, HTTPException, Request
-from models.lead import Lead, LeadCreate, LeadResponse
+from fastapi import APIRouter, HTTPException, Request, Body, Depends, Query
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import UploadFile
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from pydantic import ValidationError
+from auth import get_current_admin, get_webhook_or_admin
+from models.lead import LeadCreate, LeadResponse, LeadStatus, LeadStatusUpdate
 from database import get_database, COLLECTIONS
-from typing import List
-from datetime import datetime
+from services.lead_service import LeadService
+from services.rollup_service import RollupService, ROLLUP_DIMENSIONS, bucket_range
+from services.import_service import AsyncChunkFile, LeadImportService, LeadImportError
+from services.analytics_rollup import naive_utc
+from services.query import projection_for
+from services.serialization import encode_list, json_response
+from services.pagination import KEYSET_SORT, STREAM_BATCH_SIZE, build_keyset_query, encode_cursor, stream_ndjson
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import io
 import logging
+import os
 
 router = APIRouter(prefix="/leads", tags=["Leads"])
 logger = logging.getLogger(__name__)
 
+LEADS_BATCH_MAX_ITEMS = int(os.environ.get('LEADS_BATCH_MAX_ITEMS', '1000'))
+# Bytes read from a streamed CSV import body at a time
+LEAD_IMPORT_READ_SIZE = 256 * 1024
+# Widest report range per rollup granularity, so a report reads a bounded number of buckets
+ROLLUP_REPORT_MAX_DAYS = {'hour': 31, 'day': 731}
+
 @router.post("/", response_model=dict)
 async def create_lead(lead_data: LeadCreate, request: Request):
     """Create a new lead from trial signup"""
     try:
-        db = get_database()
-        leads_collection = db[COLLECTIONS['leads']]
+        # UTM parameters from the request are only captured when the lead is first created
+        utm_params = LeadService.utm_from_query(request.query_params)
         
-        # Check if lead already exists with same email
-        existing_lead = await leads_collection.find_one({"email": lead_data.email})
-        if existing_lead:
-            # Update existing lead with new information
-            update_data = {k: v for k, v in lead_data.dict().items() if v is not None}
-            update_data["updated_at"] = datetime.utcnow()
-            
-            await leads_collection.update_one(
-                {"email": lead_data.email},
-                {"$set": update_data}
-            )
-            
+        lead_id, created = await LeadService.upsert_lead(lead_data, utm_params)
+        
+        if not created:
             return {
                 "message": "Lead information updated successfully",
-                "lead_id": existing_lead["id"]
+                "lead_id": lead_id
             }
         
-        # Extract UTM parameters from request if available
-        utm_params = {}
-        for param in ['utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content']:
-            value = request.query_params.get(param)
-            if value:
-                utm_params[param] = value
+        logger.info(f"New lead created: {lead_data.email} from {lead_data.source}")
         
-        # Create new lead with UTM data
-        lead_data_dict = lead_data.dict()
-        lead_data_dict['utm'] = utm_params
+        return {
+            "message": "Lead created successfully",
+            "lead_id": lead_id
+        }
         
-        lead = Lead(**lead_data_dict)
+    except Exception as e:
+        logger.error(f"Error creating lead: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.post("/batch", response_model=dict)
+async def create_leads_batch(items: List[Dict[str, Any]] = Body(...), caller: dict = Depends(get_webhook_or_admin)):
+    """Create or update many leads at once (ad-platform webhook backfills)
+    
+    Requires an admin token, or the LEADS_WEBHOOK_SECRET value in the X-Webhook-Secret header.
+    """
+    if len(items) > LEADS_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {LEADS_BATCH_MAX_ITEMS} leads")
+    
+    try:
+        # Validate item by item so one bad lead does not reject the whole batch
+        valid = []
+        invalid = {}
+        for index, item in enumerate(items):
+            try:
+                lead_data = LeadCreate.model_validate(item)
+                valid.append((index, lead_data))
+            except ValidationError as e:
+                invalid[index] = {"index": index, "email": item.get("email"), "status": "invalid", "error": e.errors(include_url=False)}
+        
+        written = await LeadService.bulk_upsert_leads([(lead_data, lead_data.utm or {}) for _, lead_data in valid])
         
-        # Insert to database
-        lead_dict = lead.dict() if hasattr(lead, 'dict') else lead.model_dump()
-        await leads_collection.insert_one(lead_dict)
+        results = [None] * len(items)
+        for index, error in invalid.items():
+            results[index] = error
+        for (index, _), result in zip(valid, written):
+            result["index"] = index
+            results[index] = result
         
-        logger.info(f"New lead created: {lead.email} from {lead.source}")
+        summary = {status: sum(1 for r in results if r["status"] == status) for status in ("created", "updated", "error", "invalid")}
+        logger.info(f"Lead batch processed: {summary}")
         
         return {
-            "message": "Lead created successfully",
-            "lead_id": lead.id
+            "message": "Lead batch processed",
+            "summary": summary,
+            "results": results
         }
         
     except Exception as e:
-        logger.error(f"Error creating lead: {e}")
+        logger.error(f"Error processing lead batch: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.post("/import", response_model=dict)
+async def import_leads(
+    request: Request,
+    source: str = Query("import", min_length=1, max_length=100),
+    admin: dict = Depends(get_current_admin),
+):
+    """Create or update leads from a CSV file, upserting on email (admin endpoint)
+    
+    Send the CSV as the request body (Content-Type: text/csv), which is parsed and
+    written while it uploads, or as the `file` field of a multipart form, which is
+    spooled to a temporary file first. The first row names the columns: lead
+    fields and utm_* parameters; rows without a source get `source`. Returns counts
+    and the line and errors of every row that was not written.
+    """
+    content_type = request.headers.get("content-type", "")
+    form = None
+    upload = None
+    
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form(max_files=1, max_fields=10)
+            upload = form.get("file")
+            if not isinstance(upload, UploadFile):
+                raise HTTPException(status_code=400, detail="Multipart upload has no file field")
+        elif content_type.startswith(("text/csv", "text/plain", "application/octet-stream")):
+            # Parsed as it uploads; only the rows of the batch being read are held in memory
+            file = io.BufferedReader(AsyncChunkFile(request.stream(), asyncio.get_running_loop()), LEAD_IMPORT_READ_SIZE)
+        else:
+            raise HTTPException(status_code=415, detail="Send a text/csv body or a multipart/form-data upload")
+        
+        if upload is not None:
+            await upload.seek(0)
+            file = upload.file
+        report = await LeadImportService.import_csv(file, default_source=source)
+        logger.info(f"Lead import by {admin['email']}: {report['summary']}")
+        
+        return {
+            "message": "Lead import processed",
+            **report
+        }
+        
+    except StarletteHTTPException:
+        # Also covers the form parser's 400 for a malformed multipart body
+        raise
+    except LeadImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error importing leads: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if form is not None:
+            await form.close()
 
 @router.get("/", response_model=List[LeadResponse])
-async def get_leads():
-    """Get all leads (admin endpoint)"""
+async def get_leads(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    status: Optional[LeadStatus] = None,
+    source: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    admin: dict = Depends(get_current_admin),
+):
+    """Get leads, newest first (admin endpoint)
+    
+    Pages are keyed on (created_at, id): pass the X-Next-Cursor header of a page as
+    `cursor` to get the next one. With format=ndjson every matching document is
+    streamed from the cursor, one per line, and `limit` is ignored.
+    """
+    try:
+        query = build_keyset_query({"status": status, "source": source}, cursor, created_from, created_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        db = get_database()
+        db = get_database('admin')
         leads_collection = db[COLLECTIONS['leads']]
         
-        cursor = leads_collection.find({}).sort("created_at", -1).limit(100)
+        if format == "ndjson":
+            db_cursor = leads_collection.find(query, projection_for(LeadResponse)).sort(KEYSET_SORT).batch_size(STREAM_BATCH_SIZE)
+            return StreamingResponse(stream_ndjson(db_cursor, LeadResponse), media_type="application/x-ndjson")
+        
+        db_cursor = leads_collection.find(query, projection_for(LeadResponse)).sort(KEYSET_SORT).limit(limit)
         
-        leads = []
-        async for doc in cursor:
-            leads.append(LeadResponse(**doc))
+        docs = await db_cursor.to_list(length=limit)
         
-        return leads
+        headers = {}
+        if len(docs) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(docs[-1])
+        
+        return json_response(encode_list(LeadResponse, docs), headers)
         
     except Exception as e:
         logger.error(f"Error fetching leads: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+def report_range(granularity: str, created_from: Optional[datetime], created_to: Optional[datetime]):
+    """Default to the last 30 days, reject ranges wider than the granularity allows, widen to whole buckets"""
+    # Bounds with an offset are converted to the naive UTC the rollup buckets use
+    created_to = naive_utc(created_to) or datetime.utcnow()
+    created_from = naive_utc(created_from) or created_to - timedelta(days=30)
+    if created_from >= created_to:
+        raise HTTPException(status_code=400, detail="created_from must be before created_to")
+    if created_to - created_from > timedelta(days=ROLLUP_REPORT_MAX_DAYS[granularity]):
+        raise HTTPException(status_code=400, detail=f"Range exceeds {ROLLUP_REPORT_MAX_DAYS[granularity]} days for {granularity} granularity")
+    return bucket_range(created_from, created_to, granularity)
+
+@router.get("/attribution", response_model=dict)
+async def get_attribution(
+    group_by: List[str] = Query(["source"]),
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    series: bool = False,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    source: Optional[str] = None,
+    utm_source: Optional[str] = None,
+    utm_medium: Optional[str] = None,
+    utm_campaign: Optional[str] = None,
+    admin: dict = Depends(get_current_admin),
+):
+    """Leads and status counts per source/UTM value, from the rollups (admin endpoint)
+    
+    `group_by` takes any of source, utm_source, utm_medium and utm_campaign (repeat
+    the parameter for several); with series=true every row is also split by hour or
+    day bucket. Leads are attributed to the source and UTM values they were created
+    with; missing values are reported as "".
+    """
+    unknown = [dimension for dimension in group_by if dimension not in ROLLUP_DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"group_by must be among: {', '.join(ROLLUP_DIMENSIONS)}")
+    created_from, created_to = report_range(granularity, created_from, created_to)
+    
+    try:
+        filters = {"source": source, "utm_source": utm_source, "utm_medium": utm_medium, "utm_campaign": utm_campaign}
+        rows = await RollupService.report(granularity, group_by, created_from, created_to, filters, series)
+        
+        return {
+            "granularity": granularity,
+            "created_from": created_from,
+            "created_to": created_to,
+            "rows": rows
+        }
+        
+    except Exception as e:
+        logger.error(f"Error building lead attribution report: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/funnel", response_model=dict)
+async def get_funnel(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    source: Optional[str] = None,
+    utm_source: Optional[str] = None,
+    utm_medium: Optional[str] = None,
+    utm_campaign: Optional[str] = None,
+    admin: dict = Depends(get_current_admin),
+):
+    """Lead status funnel of the leads created in a range, from the rollups (admin endpoint)"""
+    created_from, created_to = report_range(granularity, created_from, created_to)
+    
+    try:
+        filters = {"source": source, "utm_source": utm_source, "utm_medium": utm_medium, "utm_campaign": utm_campaign}
+        rows = await RollupService.report(granularity, [], created_from, created_to, filters)
+        totals = rows[0] if rows else {
+            "leads": 0,
+            "status": {status.value: 0 for status in LeadStatus},
+            "contacted_rate": 0.0,
+            "conversion_rate": 0.0,
+        }
+        
+        return {
+            "created_from": created_from,
+            "created_to": created_to,
+            **totals
+        }
+        
+    except Exception as e:
+        logger.error(f"Error building lead funnel report: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.patch("/{lead_id}/status", response_model=dict)
+async def update_lead_status(lead_id: str, status_update: LeadStatusUpdate, admin: dict = Depends(get_current_admin)):
+    """Move a lead along the funnel (admin endpoint)"""
+    try:
+        if not await LeadService.update_status(lead_id, status_update.status):
+            raise HTTPException(status_code=404, detail="Lead not found")
+        
+        return {"message": "Lead status updated successfully"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating lead status: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from auth import get_current_admin
+from models.lead import LeadResponse
+from models.contact import ContactResponse, ContactSearchResult
+from services.search_service import SearchService
+from services.serialization import encode_list, json_response
+from typing import List, Optional
+import logging
+
+router = APIRouter(prefix="/search", tags=["Search"])
+logger = logging.getLogger(__name__)
+
+@router.get("/leads", response_model=List[LeadResponse])
+async def search_leads(
+    q: str = Query(..., min_length=1, max_length=200),
+    field: Optional[str] = Query(None, pattern="^(email|company)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(get_current_admin),
+):
+    """Leads whose email or company starts with q, ignoring case (admin endpoint)
+    
+    Searches the email when q contains "@" and the company otherwise, unless `field`
+    says which. Results are in alphabetical order, so an exact match comes first;
+    pass the X-Next-Cursor header of a page as `cursor` to get the next one.
+    """
+    field = field or ("email" if "@" in q else "company")
+    
+    try:
+        docs, next_cursor = await SearchService.prefix_search('leads', field, q, LeadResponse, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching leads: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return json_response(encode_list(LeadResponse, docs), headers)
+
+@router.get("/contacts", response_model=List[ContactSearchResult])
+async def search_contacts(
+    q: str = Query(..., min_length=1, max_length=200),
+    field: Optional[str] = Query(None, pattern="^(email|text)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    admin: dict = Depends(get_current_admin),
+):
+    """Contact messages matching q (admin endpoint)
+    
+    With field=text (the default unless q contains "@") the words of q are searched
+    in the subject and message, most relevant first, with its relevance as `score`.
+    With field=email, contacts whose email starts with q, ignoring case. Pass the
+    X-Next-Cursor header of a page as `cursor` to get the next one.
+    """
+    field = field or ("email" if "@" in q else "text")
+    
+    try:
+        if field == "email":
+            docs, next_cursor = await SearchService.prefix_search('contacts', field, q, ContactResponse, limit, cursor)
+        else:
+            docs, next_cursor = await SearchService.text_search('contacts', q, ContactResponse, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching contacts: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return json_response(encode_list(ContactSearchResult, docs), headers)
@@ -0,0 +1,80 @@
+"""Production entrypoint.
+
+Seeds the database once in the parent process, then serves server:app from
+WEB_CONCURRENCY uvicorn worker processes with uvloop and httptools.
+
+    WEB_CONCURRENCY=4 PORT=8000 python run.py
+"""
+import asyncio
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import uvicorn
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+HOST = os.environ.get('HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', '8000'))
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', str(os.cpu_count() or 1)))
+# Listen backlog; bursts beyond what the workers accept queue in the kernel instead of being refused
+UVICORN_BACKLOG = int(os.environ.get('UVICORN_BACKLOG', '2048'))
+# Longer than the load balancer's idle timeout, so it never reuses a connection we just closed
+UVICORN_KEEPALIVE_SECONDS = int(os.environ.get('UVICORN_KEEPALIVE_SECONDS', '75'))
+UVICORN_GRACEFUL_SHUTDOWN_SECONDS = int(os.environ.get('UVICORN_GRACEFUL_SHUTDOWN_SECONDS', '20'))
+UVICORN_ACCESS_LOG = os.environ.get('UVICORN_ACCESS_LOG', 'false').lower() in ('1', 'true', 'yes')
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+# Peers whose X-Forwarded-For uvicorn trusts for the client address (its own default). Never "*":
+# uvicorn then takes the leftmost entry, which the client controls. Behind Render's proxy, rate limits
+# read the header themselves (ADMISSION_TRUST_FORWARDED_FOR / ADMISSION_FORWARDED_HOPS)
+FORWARDED_ALLOW_IPS = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def reset_metrics_dir():
+    """Drop the previous run's per-process metric files; workers share the directory"""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+async def prepare_database():
+    """Create indexes and seed once, before any worker starts"""
+    from database import connect_to_mongo, close_mongo_connection
+    from services.data_service import DataService
+
+    await connect_to_mongo()
+    try:
+        await DataService.seed_initial_data()
+    finally:
+        await close_mongo_connection()
+
+def main():
+    reset_metrics_dir()
+    asyncio.run(prepare_database())
+
+    logger.info(f"Starting {WEB_CONCURRENCY} workers on {HOST}:{PORT}")
+    uvicorn.run(
+        "server:app",
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        loop="uvloop",
+        http="httptools",
+        backlog=UVICORN_BACKLOG,
+        timeout_keep_alive=UVICORN_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=UVICORN_GRACEFUL_SHUTDOWN_SECONDS,
+        access_log=UVICORN_ACCESS_LOG,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,25 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Response
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from database import connect_to_mongo, close_mongo_connection
-from services.data_service import DataService
+from database import connect_to_mongo, close_mongo_connection, warm_up_pool
+from services.data_service import DataService, read_coalescer
+from services.hashing import hashing_executor
+from services.analytics_service import analytics_ingestor
+from services.analytics_rollup import analytics_rollups
+from services.stats_service import StatsService
+from services.mongo_monitoring import pool_metrics
+from services.metrics import MetricsMiddleware, register_stats, render_metrics, CONTENT_TYPE_LATEST
+from services.request_context import RequestContextMiddleware
+from services.admission import AdmissionControlMiddleware, admission_stats
+from services.slow_query import slow_query_listener
+from services.startup import startup_report
+from services.revocation import revocation_list
+from auth import token_cache, profile_cache
 
 # Import routes
 from routes.auth import router as auth_router
@@ -14,12 +27,14 @@ from routes.leads import router as leads_router
 from routes.content import router as content_router
 from routes.contact import router as contact_router
 from routes.analytics import router as analytics_router
+from routes.export import router as export_router
+from routes.search import router as search_router
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Create the main app without a prefix
-app = FastAPI(title="Lexi API", version="1.0.0")
+app = FastAPI(title="Lexi API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -35,16 +50,52 @@ api_router.include_router(leads_router)
 api_router.include_router(content_router)
 api_router.include_router(contact_router)
 api_router.include_router(analytics_router)
+api_router.include_router(export_router)
+api_router.include_router(search_router)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Prometheus metrics endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+register_stats("hashing", hashing_executor.stats)
+register_stats("token_cache", token_cache.stats)
+register_stats("profile_cache", profile_cache.stats)
+register_stats("analytics_ingest", analytics_ingestor.stats)
+register_stats("analytics_rollups", analytics_rollups.stats)
+register_stats("mongodb_pool", pool_metrics.stats)
+register_stats("mongodb_slow_queries", slow_query_listener.stats)
+register_stats("admission", admission_stats)
+register_stats("startup", startup_report.stats)
+register_stats("token_revocation", revocation_list.stats)
+register_stats("read_coalescing", read_coalescer.stats)
+
+# Liveness: the process and its event loop respond; never touches MongoDB
+@app.get("/livez", include_in_schema=False)
+async def livez():
+    return {"status": "alive"}
+
+# Readiness: startup finished, the pool is warmed and MongoDB is reachable
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    reasons = startup_report.not_ready_reasons()
+    body = {"status": "not ready" if reasons else "ready", "reasons": reasons, "startup": startup_report.phases}
+    return ORJSONResponse(body, status_code=503 if reasons else 200)
+
+app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID"],
 )
 
 # Configure logging
@@ -58,14 +109,28 @@ logger = logging.getLogger(__name__)
 async def startup_db_client():
     """Initialize database connection and seed data"""
     try:
-        await connect_to_mongo()
-        await DataService.seed_initial_data()
-        logger.info("Database initialized and seeded successfully")
+        with startup_report.phase("connect"):
+            await connect_to_mongo()
+        with startup_report.phase("seed"):
+            await DataService.seed_initial_data()
+        with startup_report.phase("revocations"):
+            await revocation_list.start()
+        analytics_ingestor.start()
+        await analytics_rollups.start()
+        StatsService.start_reconciliation()
+        startup_report.start_background("pool_warmup", warm_up_pool())
+        logger.info(f"Database initialized and seeded successfully ({startup_report.summary()})")
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
         raise
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    """Close database connection"""
+    """Flush buffered analytics and close database connection"""
+    startup_report.shutting_down = True
+    await StatsService.stop_reconciliation()
+    await revocation_list.stop()
+    await analytics_ingestor.stop()
+    await analytics_rollups.stop()
+    hashing_executor.shutdown()
     await close_mongo_connection()
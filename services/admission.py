@@ -0,0 +1,261 @@
+from services.cache import LRUCache
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+# Behind a proxy (e.g. Render) the client address comes from X-Forwarded-For. Only the entries our
+# own proxies appended can be trusted: the client is the one ADMISSION_FORWARDED_HOPS from the right
+ADMISSION_TRUST_FORWARDED_FOR = os.environ.get('ADMISSION_TRUST_FORWARDED_FOR', 'false').lower() in ('1', 'true', 'yes')
+ADMISSION_FORWARDED_HOPS = max(1, int(os.environ.get('ADMISSION_FORWARDED_HOPS', '1')))
+
+# Per-class concurrency: requests running at once, requests allowed to wait, and how long they may wait
+ADMISSION_AUTH_CONCURRENCY = int(os.environ.get('ADMISSION_AUTH_CONCURRENCY', '16'))
+ADMISSION_AUTH_QUEUE = int(os.environ.get('ADMISSION_AUTH_QUEUE', '32'))
+ADMISSION_AUTH_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('ADMISSION_AUTH_QUEUE_TIMEOUT_SECONDS', '2'))
+ADMISSION_WRITE_CONCURRENCY = int(os.environ.get('ADMISSION_WRITE_CONCURRENCY', '64'))
+ADMISSION_WRITE_QUEUE = int(os.environ.get('ADMISSION_WRITE_QUEUE', '128'))
+ADMISSION_WRITE_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('ADMISSION_WRITE_QUEUE_TIMEOUT_SECONDS', '1'))
+ADMISSION_EXPORT_CONCURRENCY = int(os.environ.get('ADMISSION_EXPORT_CONCURRENCY', '2'))
+ADMISSION_EXPORT_QUEUE = int(os.environ.get('ADMISSION_EXPORT_QUEUE', '0'))
+ADMISSION_EXPORT_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('ADMISSION_EXPORT_QUEUE_TIMEOUT_SECONDS', '0'))
+
+# Token buckets for login/register: per client IP here, per email in routes/auth.py
+AUTH_IP_RATE_PER_MINUTE = float(os.environ.get('AUTH_IP_RATE_PER_MINUTE', '30'))
+AUTH_IP_BURST = int(os.environ.get('AUTH_IP_BURST', '10'))
+AUTH_EMAIL_RATE_PER_MINUTE = float(os.environ.get('AUTH_EMAIL_RATE_PER_MINUTE', '10'))
+AUTH_EMAIL_BURST = int(os.environ.get('AUTH_EMAIL_BURST', '5'))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+
+# (method, path prefix, route class); first match wins, anything else is admitted unconditionally
+ROUTE_CLASSES: List[Tuple[str, str, str]] = [
+    ("POST", "/api/auth/login", "auth"),
+    ("POST", "/api/auth/register", "auth"),
+    ("POST", "/api/auth/password", "auth"),
+    # Imports run as long as exports; they share the export slots rather than hold write slots
+    ("POST", "/api/leads/import", "export"),
+    ("POST", "/api/leads", "write"),
+    ("POST", "/api/contact", "write"),
+    ("GET", "/api/export/", "export"),
+]
+RATE_LIMITED_CLASSES = {"auth"}
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the status code and Retry-After seconds"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class ConcurrencyLimiter:
+    """At most `limit` holders at once, a bounded FIFO of waiters, and a per-waiter deadline"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # Metrics
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+        self.queue_wait_seconds_total = 0.0
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            raise AdmissionRejected(503, "Service busy, please retry", max(1.0, self.queue_timeout))
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as the deadline passed; pass it on rather than leak it
+                self._release_slot()
+            else:
+                waiter.cancel()
+            self.shed_deadline += 1
+            raise AdmissionRejected(503, "Service busy, please retry", max(1.0, self.queue_timeout))
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            self.queue_wait_seconds_total += time.perf_counter() - queued_at
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        self.admitted += 1
+
+    def _release_slot(self):
+        # The slot moves straight to the next live waiter, so `active` only drops when nobody waits
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def release(self):
+        self._release_slot()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            f"{self.name}_active": self.active,
+            f"{self.name}_queue_depth": len(self._waiters),
+            f"{self.name}_admitted": self.admitted,
+            f"{self.name}_queued": self.queued,
+            f"{self.name}_shed_queue_full": self.shed_queue_full,
+            f"{self.name}_shed_deadline": self.shed_deadline,
+            f"{self.name}_queue_wait_seconds_total": self.queue_wait_seconds_total,
+        }
+
+class TokenBucketLimiter:
+    """Per-key token buckets refilled at rate_per_minute up to burst; idle keys age out of an LRU"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self._buckets = LRUCache(max_keys)
+        self.limited = 0
+
+    def consume(self, key: str) -> Optional[float]:
+        """Take one token for key; returns None when allowed, else seconds until a token is available"""
+        if self.rate <= 0:
+            return None
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+        else:
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            # A full bucket is the same as no bucket, so entries expire once they would have refilled
+            self._buckets.set(key, bucket, ttl=self.burst / self.rate)
+            return None
+
+        self._buckets.set(key, bucket, ttl=self.burst / self.rate)
+        self.limited += 1
+        return (1.0 - bucket[0]) / self.rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {"keys": len(self._buckets), "limited": self.limited}
+
+limiters: Dict[str, ConcurrencyLimiter] = {
+    "auth": ConcurrencyLimiter("auth", ADMISSION_AUTH_CONCURRENCY, ADMISSION_AUTH_QUEUE, ADMISSION_AUTH_QUEUE_TIMEOUT_SECONDS),
+    "write": ConcurrencyLimiter("write", ADMISSION_WRITE_CONCURRENCY, ADMISSION_WRITE_QUEUE, ADMISSION_WRITE_QUEUE_TIMEOUT_SECONDS),
+    "export": ConcurrencyLimiter("export", ADMISSION_EXPORT_CONCURRENCY, ADMISSION_EXPORT_QUEUE, ADMISSION_EXPORT_QUEUE_TIMEOUT_SECONDS),
+}
+auth_ip_limiter = TokenBucketLimiter(AUTH_IP_RATE_PER_MINUTE, AUTH_IP_BURST)
+auth_email_limiter = TokenBucketLimiter(AUTH_EMAIL_RATE_PER_MINUTE, AUTH_EMAIL_BURST)
+
+def route_class(method: str, path: str) -> Optional[str]:
+    for class_method, prefix, name in ROUTE_CLASSES:
+        if method == class_method and path.startswith(prefix):
+            return name
+    return None
+
+def client_ip(scope) -> str:
+    if ADMISSION_TRUST_FORWARDED_FOR:
+        # Repeated headers are one list; the leftmost entries are whatever the client sent
+        entries = [
+            entry.strip()
+            for name, value in scope.get("headers", []) if name == b"x-forwarded-for"
+            for entry in value.decode("latin-1").split(",") if entry.strip()
+        ]
+        if entries:
+            return entries[max(0, len(entries) - ADMISSION_FORWARDED_HOPS)]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def admission_stats() -> Dict[str, Any]:
+    """Concurrency and rate-limit counters for every route class"""
+    stats: Dict[str, Any] = {}
+    for limiter in limiters.values():
+        stats.update(limiter.stats())
+    for prefix, bucket_limiter in (("auth_ip", auth_ip_limiter), ("auth_email", auth_email_limiter)):
+        for key, value in bucket_limiter.stats().items():
+            stats[f"{prefix}_{key}"] = value
+    return stats
+
+async def send_rejection(send, rejection: AdmissionRejected):
+    body = json.dumps({"detail": rejection.detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": rejection.status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(math.ceil(rejection.retry_after)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class AdmissionControlMiddleware:
+    """ASGI middleware shedding CPU-heavy and write requests before they pile up on the worker
+
+    Login and register are rate limited per client IP, then every classified route
+    waits for a slot in its class; a full queue or a missed deadline is answered
+    immediately with 503 and rate limiting with 429, both with Retry-After.
+    Unclassified routes (public content, stats) are never held back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_CONTROL_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        name = route_class(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        if name in RATE_LIMITED_CLASSES:
+            retry_after = auth_ip_limiter.consume(client_ip(scope))
+            if retry_after is not None:
+                await send_rejection(send, AdmissionRejected(429, "Too many requests", retry_after))
+                return
+
+        limiter = limiters[name]
+        try:
+            await limiter.acquire()
+        except AdmissionRejected as rejection:
+            logger.warning(f"Shed {scope['method']} {scope['path']}: {name} class is saturated")
+            await send_rejection(send, rejection)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
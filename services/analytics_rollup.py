@@ -0,0 +1,255 @@
+from database import get_database, COLLECTIONS, acquire_lock, release_lock, get_marker, set_marker, ANALYTICS_RAW_RETENTION_DAYS
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ROLLUP_INTERVAL_SECONDS = float(os.environ.get('ANALYTICS_ROLLUP_INTERVAL_SECONDS', '60'))
+# Minutes are only compacted once this old, so events still in the ingestor buffers make it in
+ANALYTICS_ROLLUP_LAG_SECONDS = int(os.environ.get('ANALYTICS_ROLLUP_LAG_SECONDS', '120'))
+# Every run recomputes this much before the last watermark, picking up events that arrived late
+ANALYTICS_ROLLUP_LOOKBACK_SECONDS = int(os.environ.get('ANALYTICS_ROLLUP_LOOKBACK_SECONDS', '600'))
+ANALYTICS_ROLLUP_LOCK_SECONDS = int(os.environ.get('ANALYTICS_ROLLUP_LOCK_SECONDS', '300'))
+ANALYTICS_SERIES_MAX_POINTS = int(os.environ.get('ANALYTICS_SERIES_MAX_POINTS', '1500'))
+
+# Rollup levels from finest to coarsest; each is compacted from the one before it (minutes from raw events)
+LEVELS = ['minute', 'hour', 'day']
+LEVEL_SECONDS = {'minute': 60, 'hour': 3600, 'day': 86400}
+# Days each level is kept; day counters are kept forever
+ROLLUP_RETENTION_DAYS = {
+    'minute': int(os.environ.get('ANALYTICS_MINUTE_ROLLUP_RETENTION_DAYS', '14')),
+    'hour': int(os.environ.get('ANALYTICS_HOUR_ROLLUP_RETENTION_DAYS', '400')),
+}
+
+EPOCH = datetime(1970, 1, 1)
+
+def naive_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """moment as a naive UTC datetime, like the ones stored and compared against utcnow(); naive input is assumed UTC"""
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+def floor_time(moment: datetime, seconds: int) -> datetime:
+    """Start of the epoch-aligned bin of the given width containing moment"""
+    elapsed = int((moment - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=elapsed - elapsed % seconds)
+
+def ceil_time(moment: datetime, seconds: int) -> datetime:
+    floored = floor_time(moment, seconds)
+    return floored if floored == moment else floored + timedelta(seconds=seconds)
+
+def bin_expression(field: str, seconds: int) -> Dict[str, Any]:
+    """Aggregation equivalent of floor_time (plain arithmetic, so bins line up with floor_time exactly)"""
+    return {"$subtract": [field, {"$mod": [{"$toLong": field}, seconds * 1000]}]}
+
+class AnalyticsRollups:
+    """Minute, hour and day event counters compacted from the raw analytics time series
+
+    One worker at a time (under a lock in the meta collection) compacts raw events
+    into minute counters, minutes into hours and hours into days, replacing every
+    counter it recomputes, and records for each level the time up to which it is
+    complete (its watermark). Every worker keeps a copy of the watermarks to plan
+    series queries: the coarsest usable level up to its watermark, finer levels
+    after it, and raw events for the last minutes nothing has compacted yet.
+    Events timestamped more than the lookback before the minute watermark when
+    they arrive are only visible in the raw tail, never in the rollups.
+    """
+
+    def __init__(self):
+        self.watermarks: Dict[str, Optional[datetime]] = {level: None for level in LEVELS}
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.runs = 0
+        self.failures = 0
+        self.last_run_seconds: Optional[float] = None
+        self.series_queries = 0
+        self.segments = {level: 0 for level in LEVELS + ['raw']}
+
+    async def load_watermarks(self):
+        for level in LEVELS:
+            self.watermarks[level] = await get_marker(f"analytics_rollup:{level}")
+
+    async def _compact(self, level: str, start: datetime, end: datetime):
+        """Recompute the level's counters for buckets in [start, end) from the level below"""
+        db = get_database()
+        seconds = LEVEL_SECONDS[level]
+        if level == 'minute':
+            source_collection = db[COLLECTIONS['analytics']]
+            match = {"timestamp": {"$gte": start, "$lt": end}}
+            group = {
+                "_id": {
+                    "event": "$meta.event",
+                    "source": {"$ifNull": ["$meta.source", ""]},
+                    "bucket": bin_expression("$timestamp", seconds),
+                },
+                "count": {"$sum": 1},
+            }
+        else:
+            source_collection = db[COLLECTIONS['analytics_rollups']]
+            match = {"granularity": LEVELS[LEVELS.index(level) - 1], "bucket": {"$gte": start, "$lt": end}}
+            group = {
+                "_id": {"event": "$event", "source": "$source", "bucket": bin_expression("$bucket", seconds)},
+                "count": {"$sum": "$count"},
+            }
+
+        project = {
+            "_id": 0,
+            "granularity": {"$literal": level},
+            "event": "$_id.event",
+            "source": "$_id.source",
+            "bucket": "$_id.bucket",
+            "count": 1,
+            "updated_at": "$$NOW",
+        }
+        if level in ROLLUP_RETENTION_DAYS:
+            project["expires_at"] = {"$add": ["$_id.bucket", ROLLUP_RETENTION_DAYS[level] * 86400 * 1000]}
+
+        pipeline = [
+            {"$match": match},
+            {"$group": group},
+            {"$project": project},
+            {"$merge": {
+                "into": COLLECTIONS['analytics_rollups'],
+                "on": ["granularity", "event", "bucket", "source"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }},
+        ]
+        await source_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+    async def run_once(self):
+        """Compact everything up to the lag behind now, one level after the other"""
+        await self.load_watermarks()
+        now = datetime.utcnow()
+
+        if self.watermarks['minute'] is None:
+            # First run: start at the first day whose raw events are all still there
+            start = ceil_time(now - timedelta(days=ANALYTICS_RAW_RETENTION_DAYS), LEVEL_SECONDS['day'])
+        else:
+            start = floor_time(self.watermarks['minute'] - timedelta(seconds=ANALYTICS_ROLLUP_LOOKBACK_SECONDS), LEVEL_SECONDS['minute'])
+        complete_until = floor_time(now - timedelta(seconds=ANALYTICS_ROLLUP_LAG_SECONDS), LEVEL_SECONDS['minute'])
+
+        for level in LEVELS:
+            # Recompute every bucket of this level touched by the finer level's recomputation
+            start = floor_time(start, LEVEL_SECONDS[level])
+            if self.watermarks[level] is not None:
+                start = min(start, self.watermarks[level])
+            end = floor_time(complete_until, LEVEL_SECONDS[level])
+            if end > start:
+                await self._compact(level, start, end)
+            if self.watermarks[level] is None or end > self.watermarks[level]:
+                await set_marker(f"analytics_rollup:{level}", end)
+                self.watermarks[level] = end
+            complete_until = self.watermarks[level]
+
+    async def _run_periodically(self):
+        while True:
+            await asyncio.sleep(ANALYTICS_ROLLUP_INTERVAL_SECONDS)
+            try:
+                owner = await acquire_lock('analytics_rollup', ANALYTICS_ROLLUP_LOCK_SECONDS)
+                if owner is None:
+                    # Another worker is compacting; just follow its progress
+                    await self.load_watermarks()
+                    continue
+                started = time.perf_counter()
+                try:
+                    await self.run_once()
+                finally:
+                    await release_lock('analytics_rollup', owner)
+                self.runs += 1
+                self.last_run_seconds = round(time.perf_counter() - started, 4)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Error compacting analytics rollups: {e}")
+
+    async def start(self):
+        """Load the watermarks and compact periodically on the running event loop"""
+        await self.load_watermarks()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        task = self._task
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def plan(self, unit: str, start: datetime, end: datetime) -> List[Tuple[str, datetime, datetime]]:
+        """Split [start, end) into (level, start, end) segments, coarsest level first, raw events last"""
+        segments = []
+        cursor = start
+        for level in reversed(LEVELS[:LEVELS.index(unit) + 1]):
+            watermark = self.watermarks[level]
+            if watermark is None:
+                continue
+            segment_end = min(end, watermark)
+            if segment_end > cursor:
+                segments.append((level, cursor, segment_end))
+                cursor = segment_end
+        if cursor < end:
+            segments.append(('raw', cursor, end))
+        return segments
+
+    async def series(
+        self, event: str, source: Optional[str], unit: str, bin_size: int, start: datetime, end: datetime
+    ) -> List[Dict[str, Any]]:
+        """Event counts per bin of bin_size units over [start, end), which must be aligned to the bins"""
+        db = get_database('analytics')
+        seconds = LEVEL_SECONDS[unit] * bin_size
+        counts: Dict[datetime, int] = {}
+
+        for level, segment_start, segment_end in self.plan(unit, start, end):
+            if level == 'raw':
+                collection = db[COLLECTIONS['analytics']]
+                match: Dict[str, Any] = {"meta.event": event, "timestamp": {"$gte": segment_start, "$lt": segment_end}}
+                if source is not None:
+                    match["meta.source"] = source or None
+                group = {"_id": bin_expression("$timestamp", seconds), "count": {"$sum": 1}}
+            else:
+                collection = db[COLLECTIONS['analytics_rollups']]
+                match = {"granularity": level, "event": event, "bucket": {"$gte": segment_start, "$lt": segment_end}}
+                if source is not None:
+                    match["source"] = source
+                group = {"_id": bin_expression("$bucket", seconds), "count": {"$sum": "$count"}}
+
+            # A bin can straddle two segments; add up its parts
+            async for doc in collection.aggregate([{"$match": match}, {"$group": group}]):
+                counts[doc["_id"]] = counts.get(doc["_id"], 0) + doc["count"]
+            self.segments[level] += 1
+        self.series_queries += 1
+
+        points = []
+        bucket = start
+        while bucket < end:
+            points.append({"bucket": bucket, "count": counts.get(bucket, 0)})
+            bucket += timedelta(seconds=seconds)
+        return points
+
+    def stats(self) -> Dict[str, Any]:
+        """Compaction progress and which levels series queries were served from"""
+        stats = {
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_seconds": self.last_run_seconds,
+            "series_queries": self.series_queries,
+        }
+        now = datetime.utcnow()
+        for level in LEVELS:
+            watermark = self.watermarks[level]
+            # How far behind now each level is complete
+            stats[f"{level}_lag_seconds"] = round((now - watermark).total_seconds(), 1) if watermark else None
+        for level, served in self.segments.items():
+            stats[f"{level}_segments"] = served
+        return stats
+
+# Global analytics rollups for this worker
+analytics_rollups = AnalyticsRollups()
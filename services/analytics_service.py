@@ -0,0 +1,174 @@
+from database import get_database, COLLECTIONS
+from models.analytics import AnalyticsEvent, AnalyticsEventCreate
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Ingestion pipeline configuration
+ANALYTICS_QUEUE_SIZE = int(os.environ.get('ANALYTICS_QUEUE_SIZE', '50000'))
+ANALYTICS_BATCH_SIZE = int(os.environ.get('ANALYTICS_BATCH_SIZE', '1000'))
+ANALYTICS_FLUSH_INTERVAL_SECONDS = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL_SECONDS', '1.0'))
+ANALYTICS_OVERFLOW_POLICY = os.environ.get('ANALYTICS_OVERFLOW_POLICY', 'reject')  # "reject" (429) or "drop"
+ANALYTICS_SHUTDOWN_TIMEOUT_SECONDS = float(os.environ.get('ANALYTICS_SHUTDOWN_TIMEOUT_SECONDS', '10'))
+
+
+class AnalyticsQueueFullError(Exception):
+    """Raised when the ingestion queue is full and the overflow policy is "reject" """
+
+
+def build_event_document(event_data: AnalyticsEventCreate) -> Dict[str, Any]:
+    """Turn a tracked event into the document stored in the analytics collection"""
+    properties = dict(event_data.properties)
+    if event_data.model_extra:
+        properties.update(event_data.model_extra)
+
+    event = AnalyticsEvent(
+        event=event_data.event,
+        source=event_data.source,
+        session_id=event_data.session_id,
+        user_id=event_data.user_id,
+        properties=properties,
+        timestamp=event_data.timestamp or datetime.utcnow(),
+    )
+    document = event.model_dump()
+    # The time-series metaField: raw events are bucketed (and rolled up) per event name and source
+    document["meta"] = {"event": document.pop("event"), "source": document.pop("source")}
+    return document
+
+
+class AnalyticsIngestor:
+    """Buffers tracked events in memory and writes them with insert_many by size or time window"""
+
+    def __init__(
+        self,
+        queue_size: int = ANALYTICS_QUEUE_SIZE,
+        batch_size: int = ANALYTICS_BATCH_SIZE,
+        flush_interval: float = ANALYTICS_FLUSH_INTERVAL_SECONDS,
+        overflow_policy: str = ANALYTICS_OVERFLOW_POLICY,
+    ):
+        if overflow_policy not in ("reject", "drop"):
+            raise ValueError(f"Unsupported analytics overflow policy: {overflow_policy}")
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.accepted = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        """Start the background writer on the running event loop"""
+        if self._task is not None:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info("Analytics ingestor started")
+
+    def submit(self, document: Dict[str, Any]) -> bool:
+        """Enqueue an event document; returns False if it was dropped"""
+        if self.queue is None:
+            raise RuntimeError("Analytics ingestor is not running")
+        try:
+            self.queue.put_nowait(document)
+        except asyncio.QueueFull:
+            if self.overflow_policy == "reject":
+                self.rejected += 1
+                raise AnalyticsQueueFullError("Analytics queue is full")
+            self.dropped += 1
+            return False
+        self.accepted += 1
+        return True
+
+    def submit_many(self, documents: List[Dict[str, Any]]) -> int:
+        """Enqueue several event documents; returns how many were queued
+
+        With the "reject" policy the batch is queued whole or not at all: it raises
+        AnalyticsQueueFullError, queuing nothing, unless every document fits.
+        """
+        if self.queue is None:
+            raise RuntimeError("Analytics ingestor is not running")
+        free = self.queue.maxsize - self.queue.qsize() if self.queue.maxsize > 0 else len(documents)
+        if len(documents) > free and self.overflow_policy == "reject":
+            self.rejected += len(documents)
+            raise AnalyticsQueueFullError("Analytics queue is full")
+        # Nothing awaits between the check and the puts, so the free space cannot shrink meanwhile
+        return sum(self.submit(document) for document in documents)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                # Drain what is already queued before waiting for more
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._write(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            db = get_database()
+            await db[COLLECTIONS['analytics']].insert_many(batch, ordered=False)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Error writing {len(batch)} analytics events: {e}")
+
+    async def stop(self, timeout: float = ANALYTICS_SHUTDOWN_TIMEOUT_SECONDS):
+        """Flush everything still queued, then stop the background writer"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Analytics flush timed out with {self.queue.qsize()} events still queued")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Analytics ingestor stopped ({self.written} events written)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and throughput counters"""
+        return {
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_size": self.queue_size,
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+# Global analytics ingestor
+analytics_ingestor = AnalyticsIngestor()
@@ -1,104 +1,328 @@
-from database import get_database, COLLECTIONS
-from models.testimonial import Testimonial, TestimonialResponse
-from models.faq import FAQ, FAQResponse
-from typing import List
+from database import get_database, COLLECTIONS, get_marker, set_marker, wait_for_marker, acquire_lock, release_lock
+from models.testimonial import Testimonial, TestimonialCreate, TestimonialUpdate, TestimonialResponse
+from models.faq import FAQ, FAQCreate, FAQUpdate, FAQResponse
+from pydantic import TypeAdapter
+from pymongo import UpdateOne
+from services.query import projection_for
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime
+import asyncio
 import logging
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
+# Snapshots are rebuilt on every content write in this worker; the max age bounds
+# how long other workers keep serving a list written elsewhere
+CONTENT_SNAPSHOT_MAX_AGE_SECONDS = float(os.environ.get('CONTENT_SNAPSHOT_MAX_AGE_SECONDS', '60'))
+
+# Bump to make existing deployments run seeding again on their next start (it only fills empty collections)
+SEED_VERSION = 1
+SEED_LOCK_TTL_SECONDS = 60
+SEED_WAIT_SECONDS = float(os.environ.get('SEED_WAIT_SECONDS', '15'))
+
+# Longest a coalesced read may run before it is cancelled and every caller waiting on it fails;
+# READ_COALESCE_TIMEOUTS overrides it per key, e.g. "stats=2,testimonials=10"
+READ_COALESCE_TIMEOUT_SECONDS = float(os.environ.get('READ_COALESCE_TIMEOUT_SECONDS', '5'))
+READ_COALESCE_TIMEOUTS = {
+    key.strip(): float(seconds)
+    for key, _, seconds in (item.partition('=') for item in os.environ.get('READ_COALESCE_TIMEOUTS', '').split(','))
+    if key.strip() and seconds.strip()
+}
+
+INITIAL_TESTIMONIALS = [
+    {
+        "id": "1",
+        "text": "Lexi consiguió los primeros 2 pedidos para mi nueva tienda en solo 48 horas. ¡Un comienzo absolutamente increíble para cualquier negocio nuevo!",
+        "author": "Daniel. y",
+        "role": "Nuevo Propietario de Tienda",
+        "rating": 5,
+        "order": 1,
+        "is_active": True
+    },
+    {
+        "id": "2",
+        "text": "Con Lexi, probamos más de 50 libros electrónicos en una sola semana para encontrar nuestros bestsellers. Es la herramienta definitiva para la validación rápida de productos.",
+        "author": "Augon",
+        "role": "Propietario de Tienda de Libros Electrónicos",
+        "rating": 5,
+        "order": 2,
+        "is_active": True
+    }
+]
+
+INITIAL_FAQS = [
+    {
+        "id": "1",
+        "question": "¿Qué tipos de productos o servicios puedo promocionar con Lexi?",
+        "answer": "Lexi funciona con una amplia variedad de productos y servicios, desde e-commerce hasta servicios profesionales, educación, SaaS y más. Nuestra IA se adapta automáticamente a tu industria específica.",
+        "category": "general",
+        "order": 1,
+        "is_active": True
+    }
+]
+
+def _clean_testimonial(doc: dict) -> dict:
+    return {
+        "id": doc.get("id", str(doc.get("_id", ""))),
+        "text": doc.get("text", ""),
+        "author": doc.get("author", ""),
+        "role": doc.get("role", ""),
+        "company": doc.get("company"),
+        "avatar": doc.get("avatar"),
+        "rating": doc.get("rating", 5)
+    }
+
+def _clean_faq(doc: dict) -> dict:
+    return {
+        "id": doc.get("id", str(doc.get("_id", ""))),
+        "question": doc.get("question", ""),
+        "answer": doc.get("answer", ""),
+        "category": doc.get("category", "general")
+    }
+
+class ReadCoalescer:
+    """Single-flight reads: concurrent callers of the same key share one in-flight query
+
+    The first caller of a key starts the read as a task; callers arriving before it
+    finishes await the same task instead of querying again, and get its result or
+    its exception. A caller that is cancelled stops waiting without cancelling the
+    read for the others; a read running past its key's timeout is cancelled and
+    fails every caller with asyncio.TimeoutError.
+    """
+
+    def __init__(self, timeout: float = READ_COALESCE_TIMEOUT_SECONDS, timeouts: Optional[Dict[str, float]] = None):
+        self.timeout = timeout
+        self.timeouts = dict(READ_COALESCE_TIMEOUTS if timeouts is None else timeouts)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        # Metrics
+        self.calls = 0
+        self.reads = 0
+        self.failures = 0
+        self.timeouts_hit = 0
+        self.coalesced: Dict[str, int] = {}
+
+    async def run(self, key: str, read: Callable[[], Awaitable[Any]]) -> Any:
+        """Return read()'s result, joining the read of key already in flight if there is one"""
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.reads += 1
+            task = asyncio.create_task(self._read(key, read))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda task, key=key: self._finished(key, task))
+        else:
+            # One database call saved
+            self.coalesced[key] = self.coalesced.get(key, 0) + 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        self._in_flight.pop(key, None)
+        # Retrieved here so a failure whose callers all gave up is not reported as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def _read(self, key: str, read: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await asyncio.wait_for(read(), self.timeouts.get(key, self.timeout))
+        except asyncio.TimeoutError:
+            self.timeouts_hit += 1
+            logger.warning(f"Coalesced read {key} timed out")
+            raise
+        except Exception:
+            self.failures += 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Reads started and database calls saved by joining one already in flight"""
+        stats = {
+            "calls": self.calls,
+            "reads": self.reads,
+            "coalesced": self.calls - self.reads,
+            "failures": self.failures,
+            "timeouts": self.timeouts_hit,
+            "in_flight": len(self._in_flight),
+        }
+        for key, count in self.coalesced.items():
+            stats[f"coalesced_{key}"] = count
+        return stats
+
+read_coalescer = ReadCoalescer()
+
+class ContentSnapshot:
+    """Already-encoded JSON body of a public content list, rebuilt only after writes"""
+    
+    def __init__(self, collection: str, response_model: type, clean: Callable[[dict], dict]):
+        self.collection = collection
+        self.clean = clean
+        self.adapter = TypeAdapter(List[response_model])
+        # _id stays in the projection for the id fallback of documents without an id field
+        self.projection = projection_for(response_model, "_id")
+        self.body: Optional[bytes] = None
+        self.built_at = 0.0
+        self.rebuilds = 0
+        self._lock = asyncio.Lock()
+    
+    def validate(self, doc: dict):
+        """Raise ValidationError if doc could not be part of the encoded list"""
+        self.adapter.validate_python([self.clean(doc)])
+    
+    def is_fresh(self) -> bool:
+        return self.body is not None and time.monotonic() - self.built_at < CONTENT_SNAPSHOT_MAX_AGE_SECONDS
+    
+    async def get(self) -> bytes:
+        """Return the encoded list, rebuilding it first if it was invalidated or is too old"""
+        if self.is_fresh():
+            return self.body
+        return await read_coalescer.run(self.collection, self._rebuild_if_stale)
+    
+    async def _rebuild_if_stale(self) -> bytes:
+        # The lock orders this rebuild with refresh() after writes, which must not join an older read
+        async with self._lock:
+            if not self.is_fresh():
+                await self.rebuild()
+            return self.body
+    
+    async def rebuild(self):
+        db = get_database()
+        cursor = db[COLLECTIONS[self.collection]].find({"is_active": True}, self.projection).sort("order", 1)
+        items = [self.clean(doc) async for doc in cursor]
+        self.body = self.adapter.dump_json(self.adapter.validate_python(items))
+        self.built_at = time.monotonic()
+        self.rebuilds += 1
+    
+    async def refresh(self):
+        """Rebuild after a content write; a failed rebuild is retried by the next read"""
+        self.body = None
+        try:
+            async with self._lock:
+                await self.rebuild()
+        except Exception as e:
+            logger.warning(f"Error rebuilding {self.collection} snapshot: {e}")
+
+testimonials_snapshot = ContentSnapshot('testimonials', TestimonialResponse, _clean_testimonial)
+faqs_snapshot = ContentSnapshot('faqs', FAQResponse, _clean_faq)
+
 class DataService:
     """Service for managing static content like testimonials and FAQs"""
     
     @staticmethod
-    async def get_testimonials() -> List[TestimonialResponse]:
-        """Get all active testimonials"""
-        try:
-            db = get_database()
-            cursor = db[COLLECTIONS['testimonials']].find(
-                {"is_active": True}
-            ).sort("order", 1)
-            
-            testimonials = []
-            async for doc in cursor:
-                testimonials.append(TestimonialResponse(**doc))
-            
-            return testimonials
-        except Exception as e:
-            logger.error(f"Error fetching testimonials: {e}")
-            return []
+    async def get_testimonials_json() -> bytes:
+        """Get the pre-serialized JSON list of active testimonials"""
+        return await testimonials_snapshot.get()
     
     @staticmethod
-    async def get_faqs() -> List[FAQResponse]:
-        """Get all active FAQs"""
-        try:
-            db = get_database()
-            cursor = db[COLLECTIONS['faqs']].find(
-                {"is_active": True}
-            ).sort("order", 1)
-            
-            faqs = []
-            async for doc in cursor:
-                faqs.append(FAQResponse(**doc))
-            
-            return faqs
-        except Exception as e:
-            logger.error(f"Error fetching FAQs: {e}")
-            return []
+    async def get_faqs_json() -> bytes:
+        """Get the pre-serialized JSON list of active FAQs"""
+        return await faqs_snapshot.get()
+    
+    @staticmethod
+    async def create_testimonial(testimonial_data: TestimonialCreate) -> Testimonial:
+        """Create a testimonial and refresh the public snapshot"""
+        testimonial = Testimonial(**testimonial_data.model_dump(exclude_none=True))
+        db = get_database()
+        await db[COLLECTIONS['testimonials']].insert_one(testimonial.model_dump())
+        await testimonials_snapshot.refresh()
+        return testimonial
+    
+    @staticmethod
+    async def update_testimonial(testimonial_id: str, testimonial_data: TestimonialUpdate) -> bool:
+        """Update a testimonial; returns False if it does not exist"""
+        return await DataService._update_content(
+            'testimonials', testimonial_id, testimonial_data.model_dump(exclude_unset=True), testimonials_snapshot
+        )
+    
+    @staticmethod
+    async def delete_testimonial(testimonial_id: str) -> bool:
+        """Delete a testimonial; returns False if it does not exist"""
+        return await DataService._delete_content('testimonials', testimonial_id, testimonials_snapshot)
+    
+    @staticmethod
+    async def create_faq(faq_data: FAQCreate) -> FAQ:
+        """Create a FAQ and refresh the public snapshot"""
+        faq = FAQ(**faq_data.model_dump(exclude_none=True))
+        db = get_database()
+        await db[COLLECTIONS['faqs']].insert_one(faq.model_dump())
+        await faqs_snapshot.refresh()
+        return faq
+    
+    @staticmethod
+    async def update_faq(faq_id: str, faq_data: FAQUpdate) -> bool:
+        """Update a FAQ; returns False if it does not exist"""
+        return await DataService._update_content(
+            'faqs', faq_id, faq_data.model_dump(exclude_unset=True), faqs_snapshot
+        )
+    
+    @staticmethod
+    async def delete_faq(faq_id: str) -> bool:
+        """Delete a FAQ; returns False if it does not exist"""
+        return await DataService._delete_content('faqs', faq_id, faqs_snapshot)
+    
+    @staticmethod
+    async def _update_content(collection: str, item_id: str, changes: Dict[str, Any], snapshot: ContentSnapshot) -> bool:
+        """Apply changes if the snapshot can still encode the updated document; raises ValidationError if not"""
+        db = get_database()
+        target = db[COLLECTIONS[collection]]
+        existing = await target.find_one({"id": item_id}, {"_id": 0})
+        if existing is None:
+            return False
+        
+        changes["updated_at"] = datetime.utcnow()
+        # A document the snapshot cannot encode would take the public list down
+        snapshot.validate({**existing, **changes})
+        result = await target.update_one({"id": item_id}, {"$set": changes})
+        await snapshot.refresh()
+        return result.matched_count > 0
+    
+    @staticmethod
+    async def _delete_content(collection: str, item_id: str, snapshot: ContentSnapshot) -> bool:
+        db = get_database()
+        result = await db[COLLECTIONS[collection]].delete_one({"id": item_id})
+        await snapshot.refresh()
+        return result.deleted_count > 0
 
     @staticmethod
     async def seed_initial_data():
-        """Seed database with initial testimonials and FAQs"""
+        """Seed testimonials and FAQs once per SEED_VERSION, safely from any number of workers"""
         try:
-            db = get_database()
+            if (await get_marker('seed') or 0) >= SEED_VERSION:
+                return
             
-            # Seed testimonials
-            testimonials_collection = db[COLLECTIONS['testimonials']]
-            existing_testimonials = await testimonials_collection.count_documents({})
-            
-            if existing_testimonials == 0:
-                initial_testimonials = [
-                    {
-                        "id": "1",
-                        "text": "Lexi consiguió los primeros 2 pedidos para mi nueva tienda en solo 48 horas. ¡Un comienzo absolutamente increíble para cualquier negocio nuevo!",
-                        "author": "Daniel. y",
-                        "role": "Nuevo Propietario de Tienda",
-                        "rating": 5,
-                        "order": 1,
-                        "is_active": True
-                    },
-                    {
-                        "id": "2",
-                        "text": "Con Lexi, probamos más de 50 libros electrónicos en una sola semana para encontrar nuestros bestsellers. Es la herramienta definitiva para la validación rápida de productos.",
-                        "author": "Augon",
-                        "role": "Propietario de Tienda de Libros Electrónicos",
-                        "rating": 5,
-                        "order": 2,
-                        "is_active": True
-                    }
-                ]
-                
-                await testimonials_collection.insert_many(initial_testimonials)
-                logger.info("Seeded testimonials data")
+            owner = await acquire_lock('seed', SEED_LOCK_TTL_SECONDS)
+            if owner is None:
+                # Another worker or instance is seeding; give it a moment, then start regardless
+                if not await wait_for_marker('seed', SEED_VERSION, SEED_WAIT_SECONDS):
+                    logger.warning("Timed out waiting for another worker to seed initial data")
+                return
             
-            # Seed FAQs
-            faqs_collection = db[COLLECTIONS['faqs']]
-            existing_faqs = await faqs_collection.count_documents({})
+            try:
+                await DataService._seed_collection('testimonials', INITIAL_TESTIMONIALS)
+                await DataService._seed_collection('faqs', INITIAL_FAQS)
+                await set_marker('seed', SEED_VERSION)
+            finally:
+                await release_lock('seed', owner)
             
-            if existing_faqs == 0:
-                initial_faqs = [
-                    {
-                        "id": "1",
-                        "question": "¿Qué tipos de productos o servicios puedo promocionar con Lexi?",
-                        "answer": "Lexi funciona con una amplia variedad de productos y servicios, desde e-commerce hasta servicios profesionales, educación, SaaS y más. Nuestra IA se adapta automáticamente a tu industria específica.",
-                        "category": "general",
-                        "order": 1,
-                        "is_active": True
-                    }
-                ]
-                
-                await faqs_collection.insert_many(initial_faqs)
-                logger.info("Seeded FAQs data")
+            await testimonials_snapshot.refresh()
+            await faqs_snapshot.refresh()
                 
         except Exception as e:
             logger.error(f"Error seeding initial data: {e}")
             raise
+
+    @staticmethod
+    async def _seed_collection(collection: str, documents: List[Dict[str, Any]]):
+        """Upsert seed documents by id into a collection that has no content yet"""
+        db = get_database()
+        target = db[COLLECTIONS[collection]]
+        
+        # Content edited by admins is never overwritten or topped up
+        if await target.find_one({}, {"_id": 1}) is not None:
+            return
+        
+        # Keyed upserts cannot duplicate a document even if two seeders overlap
+        await target.bulk_write(
+            [UpdateOne({"id": doc["id"]}, {"$setOnInsert": doc}, upsert=True) for doc in documents],
+            ordered=False
+        )
+        logger.info(f"Seeded {collection} data")
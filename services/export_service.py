@@ -0,0 +1,156 @@
+from database import get_database, COLLECTIONS
+from services.lead_service import UTM_PARAMS
+from typing import Any, AsyncIterator, Dict, List, Optional
+from datetime import datetime
+import logging
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '5000'))
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+# Exported columns per collection; utm is flattened into one column per UTM parameter
+EXPORT_FIELDS: Dict[str, List[str]] = {
+    'leads': [
+        'id', 'email', 'first_name', 'last_name', 'company', 'phone', 'website',
+        'source', 'status', 'created_at', 'updated_at',
+    ],
+    'contacts': [
+        'id', 'name', 'email', 'subject', 'message', 'type', 'status', 'created_at', 'updated_at',
+    ],
+}
+FLATTENED_UTM = {'leads'}
+TIMESTAMP_FIELDS = {'created_at', 'updated_at'}
+# CSV cells starting with these are formulas to spreadsheet apps; they are exported behind a quote
+FORMULA_PREFIX = r"[=+\-@\t\r]"
+
+def export_columns(collection: str) -> List[str]:
+    columns = list(EXPORT_FIELDS[collection])
+    if collection in FLATTENED_UTM:
+        columns += UTM_PARAMS
+    return columns
+
+def _escape_formulas(frame: pd.DataFrame) -> pd.DataFrame:
+    """Prefix text cells a spreadsheet would evaluate with ', so they open as text"""
+    for column in frame.columns:
+        values = frame[column]
+        if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            formulas = values.str.match(FORMULA_PREFIX, na=False)
+            if formulas.any():
+                frame[column] = values.mask(formulas, "'" + values.astype(str))
+    return frame
+
+def export_schema(collection: str) -> pa.Schema:
+    """Fixed Parquet schema so every row group of a streamed file matches"""
+    return pa.schema([
+        (column, pa.timestamp('ms') if column in TIMESTAMP_FIELDS else pa.string())
+        for column in export_columns(collection)
+    ])
+
+def _flatten(doc: Dict[str, Any], collection: str) -> Dict[str, Any]:
+    if collection in FLATTENED_UTM:
+        utm = doc.pop('utm', None) or {}
+        for param in UTM_PARAMS:
+            doc[param] = utm.get(param)
+    return doc
+
+class _ChunkSink:
+    """Write-only file object that hands Parquet bytes back to the stream as they are written"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+class ExportService:
+    """Streams a collection out as CSV or Parquet in fixed-size chunks"""
+
+    @staticmethod
+    async def iter_chunks(
+        collection: str,
+        query: Optional[Dict[str, Any]] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[pd.DataFrame]:
+        """Yield DataFrames of at most chunk_size rows, reading only the exported fields"""
+        db = get_database('admin')
+        projection = {field: 1 for field in EXPORT_FIELDS[collection]}
+        projection["_id"] = 0
+        if collection in FLATTENED_UTM:
+            projection["utm"] = 1
+
+        columns = export_columns(collection)
+        cursor = db[COLLECTIONS[collection]].find(query or {}, projection).batch_size(chunk_size)
+
+        rows = []
+        async for doc in cursor:
+            rows.append(_flatten(doc, collection))
+            if len(rows) >= chunk_size:
+                yield pd.DataFrame.from_records(rows, columns=columns)
+                rows = []
+        if rows:
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    @staticmethod
+    async def stream(
+        collection: str,
+        format: str,
+        query: Optional[Dict[str, Any]] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[bytes]:
+        """Yield the encoded export file piece by piece"""
+        if format == "csv":
+            header = True
+            async for frame in ExportService.iter_chunks(collection, query, chunk_size):
+                yield _escape_formulas(frame).to_csv(index=False, header=header, date_format="%Y-%m-%dT%H:%M:%S.%f").encode()
+                header = False
+            if header:
+                # Empty export still gets a header row
+                yield (",".join(export_columns(collection)) + "\n").encode()
+            return
+
+        if format == "parquet":
+            schema = export_schema(collection)
+            sink = _ChunkSink()
+            writer = pq.ParquetWriter(sink, schema, compression="snappy")
+            try:
+                async for frame in ExportService.iter_chunks(collection, query, chunk_size):
+                    writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+                    yield sink.drain()
+            finally:
+                writer.close()
+            yield sink.drain()
+            return
+
+        raise ValueError(f"Unsupported export format: {format}")
+
+def build_export_query(created_from: Optional[datetime] = None, created_to: Optional[datetime] = None) -> Dict[str, Any]:
+    """Restrict an export to a created_at range"""
+    created_range = {}
+    if created_from is not None:
+        created_range["$gte"] = created_from
+    if created_to is not None:
+        created_range["$lt"] = created_to
+    return {"created_at": created_range} if created_range else {}
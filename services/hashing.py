@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Hashing executor configuration
+HASHING_EXECUTOR_MODE = os.environ.get('HASHING_EXECUTOR_MODE', 'thread')  # "thread" or "process"
+HASHING_MAX_WORKERS = int(os.environ.get('HASHING_MAX_WORKERS', str(min(4, os.cpu_count() or 1))))
+HASHING_MAX_QUEUE = int(os.environ.get('HASHING_MAX_QUEUE', '64'))
+HASHING_TIMEOUT_SECONDS = float(os.environ.get('HASHING_TIMEOUT_SECONDS', '5'))
+
+
+class HashingOverloadedError(Exception):
+    """Raised when the hashing queue is full or a call exceeds its timeout"""
+
+
+class HashingExecutor:
+    """Runs CPU-heavy password hashing off the event loop in a bounded worker pool"""
+
+    def __init__(
+        self,
+        mode: str = HASHING_EXECUTOR_MODE,
+        max_workers: int = HASHING_MAX_WORKERS,
+        max_queue: int = HASHING_MAX_QUEUE,
+        timeout: float = HASHING_TIMEOUT_SECONDS,
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unsupported hashing executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+
+        # Metrics
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.latency_seconds_total = 0.0
+        self.latency_seconds_max = 0.0
+        self.queue_wait_seconds_total = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="hashing"
+                )
+            logger.info(f"Started {self.mode} hashing executor with {self.max_workers} workers")
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free worker"""
+        return max(0, self.in_flight - self.max_workers)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) in the pool, rejecting when the queue is full or the call times out"""
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise HashingOverloadedError("Hashing queue is full")
+
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+        self.in_flight += 1
+
+        if self.mode == "process":
+            # Jobs are pickled to the worker, so only the end-to-end latency is observable
+            job = self._get_executor().submit(fn, *args)
+        else:
+            def _call() -> Any:
+                self.queue_wait_seconds_total += time.perf_counter() - submitted_at
+                return fn(*args)
+
+            job = self._get_executor().submit(_call)
+
+        # A job keeps its worker after the caller times out or is cancelled, so it only
+        # leaves in_flight when the job itself finishes (or is cancelled before it starts)
+        job.add_done_callback(lambda _: self._job_done(loop))
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job, loop=loop), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HashingOverloadedError("Hashing call timed out")
+        finally:
+            latency = time.perf_counter() - submitted_at
+            self.completed += 1
+            self.latency_seconds_total += latency
+            self.latency_seconds_max = max(self.latency_seconds_max, latency)
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop):
+        # Runs in the worker's result thread; the counter is only touched on the event loop
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # The loop has already closed at shutdown
+            pass
+
+    def _release(self):
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and latency metrics"""
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "latency_seconds_total": self.latency_seconds_total,
+            "latency_seconds_max": self.latency_seconds_max,
+            "queue_wait_seconds_total": self.queue_wait_seconds_total,
+        }
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Stopped hashing executor")
+
+
+# Global hashing executor
+hashing_executor = HashingExecutor()
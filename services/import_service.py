@@ -0,0 +1,258 @@
+from models.lead import LeadCreate
+from services.lead_service import LeadService, UTM_PARAMS
+from pydantic import ValidationError
+from pydantic.networks import validate_email
+from pydantic_core import PydanticCustomError
+from functools import lru_cache
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import csv
+import io
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Rows validated and written per bulk_write
+LEAD_IMPORT_BATCH_SIZE = int(os.environ.get('LEAD_IMPORT_BATCH_SIZE', '1000'))
+# Row errors kept in the report; the counts always cover every row
+LEAD_IMPORT_MAX_REPORTED_ERRORS = int(os.environ.get('LEAD_IMPORT_MAX_REPORTED_ERRORS', '1000'))
+
+LEAD_COLUMNS = set(LeadCreate.model_fields) - {"utm"}
+
+# ASCII dot-atom local parts, which email-validator accepts and keeps as they are
+SIMPLE_LOCAL_PART = re.compile(r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*")
+
+class LeadImportRow(LeadCreate):
+    # Checked by fast_email (or by LeadCreate itself when that declines)
+    email: str
+
+@lru_cache(maxsize=65536)
+def checked_domain(domain: str) -> Optional[str]:
+    """Normalized form of domain if EmailStr's validator accepts an address there, else None"""
+    try:
+        return validate_email(f"postmaster@{domain}")[1].rpartition("@")[2]
+    except PydanticCustomError:
+        return None
+
+def fast_email(value: str) -> Optional[str]:
+    """The address EmailStr would normalize value to, for plain ASCII addresses; None means do the full check
+
+    Validating the domain is most of the cost of EmailStr, and it only depends on
+    the domain, so it is done once per domain with EmailStr's own validator.
+    """
+    local, at, domain = value.rpartition("@")
+    if not at or not domain.isascii() or len(local) > 64 or not SIMPLE_LOCAL_PART.fullmatch(local):
+        return None
+    normalized = checked_domain(domain)
+    if normalized is None or len(local) + 1 + len(normalized) > 254:
+        return None
+    return f"{local}@{normalized}"
+
+def validate_lead(data: Dict[str, Any]) -> LeadCreate:
+    """LeadCreate.model_validate(data), raising the same errors, with the email check cached per domain"""
+    email = fast_email(data["email"]) if isinstance(data.get("email"), str) else None
+    if email is None:
+        return LeadCreate.model_validate(data)
+    row = LeadImportRow.model_validate(data)
+    return LeadCreate.model_construct(**dict(row, email=email))
+
+class LeadImportError(ValueError):
+    """Raised when the file as a whole cannot be imported (not CSV, no email column...)"""
+
+def csv_rows(file: BinaryIO, encoding: str = "utf-8-sig") -> Iterator[Tuple[int, List[str]]]:
+    """Parse CSV from a binary file; yields (line number where the record starts, fields) per record"""
+    # newline="" leaves line endings to the csv module, so quoted fields may contain them
+    text = io.TextIOWrapper(file, encoding=encoding, newline="")
+    reader = csv.reader(text, strict=True)
+    record_start = 1
+    try:
+        for row in reader:
+            if row:
+                yield record_start, row
+            record_start = reader.line_num + 1
+    except UnicodeDecodeError as e:
+        raise LeadImportError(f"File is not UTF-8 text: {e.reason}")
+    except csv.Error as e:
+        raise LeadImportError(f"Malformed CSV at line {record_start}: {e}")
+    finally:
+        # Leave the file to its owner
+        if not text.closed:
+            text.detach()
+
+class AsyncChunkFile(io.RawIOBase):
+    """Blocking, read-only file over an async stream of byte chunks, read from a worker thread
+
+    Each read that needs more data waits for the next chunk, which is fetched on
+    the event loop, so the CSV module can parse a request body as it arrives.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop):
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._buffer = b""
+        self._exhausted = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer and not self._exhausted:
+            try:
+                self._buffer = asyncio.run_coroutine_threadsafe(self._chunks.__anext__(), self._loop).result()
+            except StopAsyncIteration:
+                self._exhausted = True
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+class ImportReport:
+    """Counts of a lead import and the errors of the rows that were not written"""
+
+    def __init__(self, max_errors: int = LEAD_IMPORT_MAX_REPORTED_ERRORS):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.counts = {"created": 0, "updated": 0, "invalid": 0, "error": 0}
+        self.errors: List[Dict[str, Any]] = []
+        self.ignored_columns: List[str] = []
+
+    def add_error(self, line: int, email: Optional[str], status: str, error: Any):
+        self.counts[status] += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "email": email, "status": status, "error": error})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "summary": self.counts,
+            "errors": self.errors,
+            "errors_truncated": sum(self.counts[status] for status in ("invalid", "error")) > len(self.errors),
+            "ignored_columns": self.ignored_columns,
+        }
+
+class LeadImportService:
+    """Bulk lead import from CSV: one header row, then one lead per row
+
+    Columns named like LeadCreate fields and UTM parameters are imported, others
+    are ignored and listed in the report. Rows are validated and upserted on email
+    in batches; the next batch is parsed while the previous one is written.
+    """
+
+    @staticmethod
+    def parse_header(header: List[str], report: ImportReport) -> List[Optional[str]]:
+        columns = [name.strip().lower() for name in header]
+        if "email" not in columns:
+            raise LeadImportError("CSV header has no email column")
+        known = LEAD_COLUMNS | set(UTM_PARAMS)
+        report.ignored_columns = [name for name in columns if name not in known]
+        return [name if name in known else None for name in columns]
+
+    @staticmethod
+    def build_lead(columns: List[Optional[str]], row: List[str], default_source: str) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        utm: Dict[str, str] = {}
+        for name, value in zip(columns, row):
+            value = value.strip()
+            if name is None or not value:
+                continue
+            if name in UTM_PARAMS:
+                utm[name] = value
+            else:
+                data[name] = value
+        data.setdefault("source", default_source)
+        data["utm"] = utm
+        return data
+
+    @staticmethod
+    def read_batch(
+        rows: Iterator[Tuple[int, List[str]]],
+        columns: List[Optional[str]],
+        default_source: str,
+        batch_size: int,
+        carry: Optional[Tuple[int, LeadCreate]],
+    ) -> Dict[str, Any]:
+        """Parse and validate rows until batch_size leads, a repeated email or the end of the file
+
+        Two upserts of one email in an unordered batch can both insert, so the row
+        repeating an email is returned as `carry` to start the next batch.
+        """
+        batch = [carry] if carry else []
+        emails = {carry[1].email} if carry else set()
+        invalid = []
+        read = 0
+        for line, row in rows:
+            read += 1
+            data = LeadImportService.build_lead(columns, row, default_source)
+            try:
+                lead_data = validate_lead(data)
+            except ValidationError as e:
+                invalid.append((line, data.get("email"), e.errors(include_url=False, include_input=False)))
+                continue
+            if lead_data.email in emails:
+                return {"batch": batch, "invalid": invalid, "read": read, "carry": (line, lead_data), "done": False}
+            batch.append((line, lead_data))
+            emails.add(lead_data.email)
+            if len(batch) >= batch_size:
+                break
+        else:
+            return {"batch": batch, "invalid": invalid, "read": read, "carry": None, "done": True}
+        return {"batch": batch, "invalid": invalid, "read": read, "carry": None, "done": False}
+
+    @staticmethod
+    async def write_batch(batch: List[Tuple[int, LeadCreate]], report: ImportReport):
+        results = await LeadService.bulk_upsert_leads(
+            [(lead_data, lead_data.utm or {}) for _, lead_data in batch], with_ids=False
+        )
+        for (line, lead_data), result in zip(batch, results):
+            if result["status"] == "error":
+                report.add_error(line, lead_data.email, "error", result["error"])
+            else:
+                report.counts[result["status"]] += 1
+
+    @staticmethod
+    async def import_csv(
+        file: BinaryIO,
+        default_source: str = "import",
+        batch_size: int = LEAD_IMPORT_BATCH_SIZE,
+    ) -> Dict[str, Any]:
+        """Import leads from a binary CSV file; returns the report
+
+        Rows are parsed and validated in a worker thread, so the event loop is free
+        and the next batch is read while the previous one is written. The file may
+        block on reads (see AsyncChunkFile).
+        """
+        report = ImportReport()
+        rows = csv_rows(file)
+        writing: Optional[asyncio.Task] = None
+        carry: Optional[Tuple[int, LeadCreate]] = None
+        try:
+            header = await asyncio.to_thread(next, rows, None)
+            if header is None:
+                raise LeadImportError("CSV file is empty")
+            columns = LeadImportService.parse_header(header[1], report)
+
+            while True:
+                result = await asyncio.to_thread(
+                    LeadImportService.read_batch, rows, columns, default_source, batch_size, carry
+                )
+                report.rows += result["read"]
+                for line, email, errors in result["invalid"]:
+                    report.add_error(line, email, "invalid", errors)
+                carry = result["carry"]
+
+                if writing is not None:
+                    await writing
+                    writing = None
+                if result["batch"]:
+                    writing = asyncio.create_task(LeadImportService.write_batch(result["batch"], report))
+                if result["done"]:
+                    break
+        finally:
+            rows.close()
+            if writing is not None:
+                await writing
+
+        logger.info(f"Lead import processed {report.rows} rows: {report.counts}")
+        return report.to_dict()
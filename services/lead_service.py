@@ -0,0 +1,156 @@
+from database import get_database, COLLECTIONS
+from models.lead import LeadCreate, LeadStatus
+from services.stats_service import StatsService
+from services.rollup_service import RollupService
+from services.search_service import normalized_fields
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from typing import Any, Dict, List, Tuple
+from datetime import datetime
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+UTM_PARAMS = ['utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content']
+
+class LeadService:
+    """Service for writing leads with single round-trip upserts keyed on email"""
+
+    @staticmethod
+    def build_upsert(lead_data: LeadCreate, utm: Dict[str, Any]) -> Tuple[str, dict, dict]:
+        """Build (new lead id, filter, update) for an upsert that only sets id, utm and created_at on insert"""
+        now = datetime.utcnow()
+        lead_id = str(uuid.uuid4())
+
+        # Provided fields overwrite (as the old update path did); missing ones are only
+        # written as None on insert so new documents keep the full Lead shape
+        fields = lead_data.model_dump(exclude={"utm"})
+        update_data = {k: v for k, v in fields.items() if v is not None}
+        update_data["updated_at"] = now
+
+        insert_only = {k: None for k, v in fields.items() if v is None}
+        for k, v in normalized_fields('leads', fields).items():
+            if v is not None:
+                update_data[k] = v
+            else:
+                insert_only[k] = None
+        insert_only.update({
+            "id": lead_id,
+            "utm": utm,
+            "status": LeadStatus.NEW.value,
+            # source is overwritten by later submits; rollups attribute the lead to the first one
+            "first_source": lead_data.source,
+            "created_at": now,
+        })
+
+        update = {"$set": update_data, "$setOnInsert": insert_only}
+        return lead_id, {"email": lead_data.email}, update
+
+    @staticmethod
+    async def upsert_lead(lead_data: LeadCreate, utm: Dict[str, Any]) -> Tuple[str, bool]:
+        """Create or update a lead in one atomic write; returns (lead id, created)"""
+        db = get_database()
+        leads_collection = db[COLLECTIONS['leads']]
+        lead_id, query, update = LeadService.build_upsert(lead_data, utm)
+
+        try:
+            previous = await leads_collection.find_one_and_update(
+                query, update, upsert=True,
+                projection={"_id": 0, "id": 1},
+                return_document=ReturnDocument.BEFORE,
+            )
+        except DuplicateKeyError:
+            # A concurrent submit inserted the same email first; this write is now an update
+            previous = await leads_collection.find_one_and_update(
+                query, update, upsert=True,
+                projection={"_id": 0, "id": 1},
+                return_document=ReturnDocument.BEFORE,
+            )
+
+        if previous is None:
+            await StatsService.increment('leads')
+            await RollupService.record_leads([(lead_data.source, utm, update["$setOnInsert"]["created_at"])])
+            return lead_id, True
+        return previous["id"], False
+
+    @staticmethod
+    async def bulk_upsert_leads(items: List[Tuple[LeadCreate, Dict[str, Any]]], with_ids: bool = True) -> List[Dict[str, Any]]:
+        """Upsert (lead, utm) pairs with one unordered bulk_write; returns a result per item
+
+        Without with_ids, updated leads are reported without their lead_id, saving a query.
+        """
+        if not items:
+            return []
+
+        db = get_database()
+        leads_collection = db[COLLECTIONS['leads']]
+
+        new_ids = []
+        created_at = []
+        operations = []
+        for lead_data, utm in items:
+            lead_id, query, update = LeadService.build_upsert(lead_data, utm)
+            new_ids.append(lead_id)
+            created_at.append(update["$setOnInsert"]["created_at"])
+            operations.append(UpdateOne(query, update, upsert=True))
+
+        try:
+            result = await leads_collection.bulk_write(operations, ordered=False)
+            upserted = set(result.upserted_ids.keys())
+            errors: Dict[int, str] = {}
+        except BulkWriteError as e:
+            upserted = {entry["index"] for entry in e.details.get("upserted", [])}
+            errors = {entry["index"]: entry.get("errmsg", "Write error") for entry in e.details.get("writeErrors", [])}
+
+        await StatsService.increment('leads', len(upserted))
+        await RollupService.record_leads(
+            (items[index][0].source, items[index][1], created_at[index]) for index in sorted(upserted)
+        )
+
+        # Updated leads keep their original id; fetch those in one extra query
+        updated_emails = [
+            lead_data.email for index, (lead_data, _) in enumerate(items)
+            if index not in upserted and index not in errors
+        ]
+        existing_ids: Dict[str, str] = {}
+        if updated_emails and with_ids:
+            cursor = leads_collection.find({"email": {"$in": updated_emails}}, {"_id": 0, "email": 1, "id": 1})
+            async for doc in cursor:
+                existing_ids[doc["email"]] = doc["id"]
+
+        results = []
+        for index, (lead_data, _) in enumerate(items):
+            if index in errors:
+                results.append({"index": index, "email": lead_data.email, "status": "error", "error": errors[index]})
+            elif index in upserted:
+                results.append({"index": index, "email": lead_data.email, "status": "created", "lead_id": new_ids[index]})
+            else:
+                results.append({"index": index, "email": lead_data.email, "status": "updated", "lead_id": existing_ids.get(lead_data.email)})
+        return results
+
+    @staticmethod
+    async def update_status(lead_id: str, status: LeadStatus) -> bool:
+        """Set a lead's status and move it between funnel counters; False if the lead does not exist"""
+        db = get_database()
+        previous = await db[COLLECTIONS['leads']].find_one_and_update(
+            {"id": lead_id},
+            {"$set": {"status": status.value, "updated_at": datetime.utcnow()}},
+            projection={"_id": 0, "status": 1, "source": 1, "first_source": 1, "utm": 1, "created_at": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if previous is None:
+            return False
+
+        await RollupService.record_status_change(previous, previous.get("status") or LeadStatus.NEW.value, status.value)
+        return True
+
+    @staticmethod
+    def utm_from_query(query_params: Any) -> Dict[str, Any]:
+        """Extract UTM parameters from request query params"""
+        utm_params = {}
+        for param in UTM_PARAMS:
+            value = query_params.get(param)
+            if value:
+                utm_params[param] = value
+        return utm_params
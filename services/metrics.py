@@ -0,0 +1,147 @@
+from prometheus_client import CollectorRegistry, Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from pymongo import monitoring
+from typing import Any, Callable, Dict
+import os
+import re
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+# Set when running several workers (see run.py) so /metrics aggregates all of them
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+registry = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_COUNT = Counter(
+    'lexi_http_requests_total', 'HTTP requests by route template and status',
+    ['method', 'route', 'status'], registry=registry
+)
+REQUEST_LATENCY = Histogram(
+    'lexi_http_request_duration_seconds', 'HTTP request latency by route template',
+    ['method', 'route'], buckets=LATENCY_BUCKETS, registry=registry
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    'lexi_mongodb_command_duration_seconds', 'MongoDB command latency by collection and command',
+    ['collection', 'command'], buckets=LATENCY_BUCKETS, registry=registry
+)
+MONGO_COMMAND_FAILURES = Counter(
+    'lexi_mongodb_command_failures_total', 'Failed MongoDB commands by collection and command',
+    ['collection', 'command'], registry=registry
+)
+AUTH_OPERATION_LATENCY = Histogram(
+    'lexi_auth_operation_duration_seconds', 'bcrypt and JWT operation latency',
+    ['operation'], buckets=LATENCY_BUCKETS, registry=registry
+)
+
+class StatsCollector:
+    """Exposes the stats() dicts of in-process subsystems (caches, executors, queues) as gauges"""
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def register(self, name: str, stats: Callable[[], Dict[str, Any]]):
+        self._sources[name] = stats
+
+    def collect(self):
+        for name, stats in self._sources.items():
+            for key, value in stats().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                gauge = GaugeMetricFamily(f'lexi_{name}_{key}', f'{name} {key.replace("_", " ")}')
+                gauge.add_metric([], value)
+                yield gauge
+
+stats_collector = StatsCollector()
+registry.register(stats_collector)
+
+def register_stats(name: str, stats: Callable[[], Dict[str, Any]]):
+    """Export a subsystem's stats() callable on /metrics as lexi_<name>_<key> gauges"""
+    stats_collector.register(re.sub(r'[^a-zA-Z0-9_]', '_', name), stats)
+
+def render_metrics() -> bytes:
+    """Current metrics in Prometheus text format"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Counters and histograms summed over every worker; the stats gauges are this worker's own
+        combined = CollectorRegistry()
+        multiprocess.MultiProcessCollector(combined)
+        combined.register(stats_collector)
+        return generate_latest(combined)
+    return generate_latest(registry)
+
+class MetricsMiddleware:
+    """ASGI middleware recording request count and latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+        # Labelled children cached per label tuple, skipping prometheus_client's locked lookup
+        self._latency = {}
+        self._count = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            latency = self._latency.get((method, template))
+            if latency is None:
+                latency = self._latency[(method, template)] = REQUEST_LATENCY.labels(method, template)
+            latency.observe(time.perf_counter() - started_at)
+            count_key = (method, template, status["code"])
+            count = self._count.get(count_key)
+            if count is None:
+                count = self._count[count_key] = REQUEST_COUNT.labels(method, template, str(status["code"]))
+            count.inc()
+
+def command_collection(command_name: str, command: Dict[str, Any]) -> str:
+    """Collection a MongoDB command targets, or "" for database-level commands"""
+    if command_name == "getMore":
+        return command.get("collection", "")
+    target = command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Per-collection, per-command MongoDB latency from pymongo command monitoring"""
+
+    def __init__(self):
+        self._collections: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = command_collection(
+                event.command_name, event.command
+            )
+
+    def _pop_collection(self, event) -> str:
+        with self._lock:
+            return self._collections.pop((event.connection_id, event.request_id), "")
+
+    def succeeded(self, event):
+        collection = self._pop_collection(event)
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._pop_collection(event)
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+# Global command listener, registered on the Motor client in connect_to_mongo
+command_metrics = CommandMetricsListener()
@@ -0,0 +1,106 @@
+from pymongo import monitoring
+from typing import Any, Dict
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Connection pool counters and checkout wait times collected from pymongo pool events
+
+    Checkouts happen synchronously on the driver thread that runs the operation, so
+    the start time of a checkout is kept in a thread-local until it completes.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.pools_ready = 0
+        self.pools_cleared = 0
+        # A cleared pool stays paused until the next successful server check marks it ready
+        self.paused_addresses = set()
+        self.created = 0
+        self.closed = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        with self._lock:
+            self.pools_ready += 1
+            self.paused_addresses.discard(event.address)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+            self.paused_addresses.add(event.address)
+        logger.warning(f"MongoDB connection pool cleared for {event.address}")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started_at = time.perf_counter()
+
+    def _checkout_wait(self) -> float:
+        started_at = getattr(self._local, "started_at", None)
+        self._local.started_at = None
+        return time.perf_counter() - started_at if started_at is not None else 0.0
+
+    def connection_check_out_failed(self, event):
+        wait = self._checkout_wait()
+        with self._lock:
+            self.checkout_failures += 1
+        logger.warning(f"MongoDB connection checkout failed after {wait * 1000:.1f} ms: {event.reason}")
+
+    def connection_checked_out(self, event):
+        wait = self._checkout_wait()
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.checkout_wait_seconds_total += wait
+            self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    @property
+    def open_connections(self) -> int:
+        return self.created - self.closed
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool counters and checkout wait times"""
+        return {
+            "pools_ready": self.pools_ready,
+            "pools_cleared": self.pools_cleared,
+            "pools_paused": len(self.paused_addresses),
+            "connections_created": self.created,
+            "connections_closed": self.closed,
+            "connections_open": self.open_connections,
+            "connections_in_use": self.in_use,
+            "checkouts": self.checkouts,
+            "checkout_failures": self.checkout_failures,
+            "checkout_wait_seconds_total": self.checkout_wait_seconds_total,
+            "checkout_wait_seconds_max": self.checkout_wait_seconds_max,
+        }
+
+# Global pool metrics, registered on the Motor client in connect_to_mongo
+pool_metrics = PoolMetricsListener()
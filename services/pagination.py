@@ -0,0 +1,71 @@
+from pymongo import DESCENDING
+from pydantic import BaseModel
+from services.serialization import encode_model
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Type
+from datetime import datetime
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Newest first; id breaks ties between documents created in the same millisecond
+KEYSET_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+STREAM_BATCH_SIZE = 1000
+STREAM_CHUNK_LINES = 200
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Encode the (created_at, id) position of a document as an opaque cursor"""
+    # Legacy documents without created_at sort after every dated one; their position is (null, id)
+    created_at = doc.get("created_at")
+    raw = json.dumps([created_at.isoformat() if created_at is not None else None, doc["id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], str]:
+    """Decode a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+    try:
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at) if created_at is not None else None, str(doc_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def build_keyset_query(
+    filters: Dict[str, Any],
+    cursor: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Combine equality filters, a created_at range and the keyset position into one query"""
+    query = {key: value for key, value in filters.items() if value is not None}
+
+    created_range = {}
+    if created_from is not None:
+        created_range["$gte"] = created_from
+    if created_to is not None:
+        created_range["$lt"] = created_to
+    if created_range:
+        query["created_at"] = created_range
+
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        # {"created_at": None} also matches documents without the field, which sort last
+        query["$or"] = [{"created_at": created_at, "id": {"$lt": doc_id}}]
+        if created_at is not None:
+            query["$or"] += [{"created_at": {"$lt": created_at}}, {"created_at": None}]
+    return query
+
+async def stream_ndjson(cursor: Any, response_model: Type[BaseModel]) -> AsyncIterator[bytes]:
+    """Yield each document of a Motor cursor as one JSON line, without buffering the result set"""
+    lines = []
+    try:
+        async for doc in cursor:
+            lines.append(encode_model(response_model, doc))
+            if len(lines) >= STREAM_CHUNK_LINES:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    except Exception as e:
+        # Headers are already sent, so the client only sees a truncated stream
+        logger.error(f"Error streaming {response_model.__name__} documents: {e}")
+        raise
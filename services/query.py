@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from functools import lru_cache
+from typing import Dict, Type
+
+@lru_cache(maxsize=None)
+def projection_for(model: Type[BaseModel], *extra_fields: str) -> Dict[str, int]:
+    """Mongo projection fetching only the fields a response model needs, plus extra_fields
+
+    _id is excluded unless it is listed in extra_fields. The result is cached per
+    model, so treat it as read-only.
+    """
+    projection = {name: 1 for name in model.model_fields}
+    projection["_id"] = 0
+    for field in extra_fields:
+        projection[field] = 1
+    return projection
@@ -0,0 +1,43 @@
+from contextvars import ContextVar
+from typing import Optional
+import uuid
+
+# Set per request by RequestContextMiddleware; Motor copies the context into its
+# driver threads, so pymongo monitoring listeners can read these too
+request_id_var: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+request_path_var: ContextVar[Optional[str]] = ContextVar('request_path', default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+class RequestContextMiddleware:
+    """ASGI middleware tagging each request with an id (X-Request-ID, generated if absent) and its path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        id_token = request_id_var.set(request_id)
+        path_token = request_path_var.set(f"{scope['method']} {scope['path']}")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(id_token)
+            request_path_var.reset(path_token)
@@ -0,0 +1,205 @@
+from database import get_database, COLLECTIONS
+from pymongo import ASCENDING
+from typing import Any, Dict, Optional
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_BLOOM_CAPACITY = int(os.environ.get('REVOCATION_BLOOM_CAPACITY', '100000'))
+REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get('REVOCATION_BLOOM_ERROR_RATE', '0.001'))
+# How quickly a revocation made on another worker takes effect here
+REVOCATION_REFRESH_INTERVAL_SECONDS = float(os.environ.get('REVOCATION_REFRESH_INTERVAL_SECONDS', '2'))
+# Bloom filters cannot forget, so they are rebuilt from the (TTL-pruned) collection now and then
+REVOCATION_REBUILD_INTERVAL_SECONDS = float(os.environ.get('REVOCATION_REBUILD_INTERVAL_SECONDS', '3600'))
+# Re-read revocations slightly older than the newest one seen, in case writes became visible out of order
+REVOCATION_REFRESH_OVERLAP_SECONDS = 5
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing of one blake2b digest"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class RevocationList:
+    """Per-worker mirror of the revoked_tokens collection
+
+    Two kinds of revocation are stored, both expiring with the tokens they cover:
+    single tokens (logout, admin kill) keyed by jti, and per-user cut-offs
+    (password change, admin kill of every session) that reject tokens issued
+    before a timestamp. Lookups are in memory only: a Bloom filter answers the
+    common not-revoked case and the exact set confirms its positives.
+    """
+
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._tokens: Dict[str, datetime] = {}
+        self._users: Dict[str, int] = {}
+        self._last_revoked_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.checks = 0
+        self.bloom_positives = 0
+        self.false_positives = 0
+        self.rejected = 0
+        self.refreshes = 0
+        self.rebuilds = 0
+
+    def _apply(self, doc: Dict[str, Any]):
+        if doc.get("kind") == "user":
+            user_id = doc["user_id"]
+            self._users[user_id] = max(self._users.get(user_id, 0), doc["revoked_before"])
+        elif doc["_id"] not in self._tokens:
+            if self._bloom.count >= self._bloom.capacity:
+                # Keep the false-positive rate bounded as revocations pile up between rebuilds
+                self._rebuild_bloom(self._bloom.capacity * 2)
+            self._tokens[doc["_id"]] = doc["expires_at"]
+            self._bloom.add(doc["_id"])
+        revoked_at = doc.get("revoked_at")
+        if revoked_at is not None and (self._last_revoked_at is None or revoked_at > self._last_revoked_at):
+            self._last_revoked_at = revoked_at
+
+    def _rebuild_bloom(self, capacity: int):
+        bloom = BloomFilter(max(capacity, self.capacity), self.error_rate)
+        for key in self._tokens:
+            bloom.add(key)
+        self._bloom = bloom
+
+    def is_revoked(self, key: str, payload: Dict[str, Any]) -> bool:
+        """Whether the token identified by key (its jti) with this payload has been revoked"""
+        self.checks += 1
+        if self._users:
+            revoked_before = self._users.get(payload.get("sub"))
+            if revoked_before is not None and payload.get("iat", 0) < revoked_before:
+                self.rejected += 1
+                return True
+        if key in self._bloom:
+            self.bloom_positives += 1
+            if key in self._tokens:
+                self.rejected += 1
+                return True
+            self.false_positives += 1
+        return False
+
+    async def revoke_token(self, key: str, user_id: Optional[str], expires_at: datetime):
+        """Revoke one token until it would have expired anyway"""
+        doc = {
+            "_id": key,
+            "kind": "token",
+            "user_id": user_id,
+            "revoked_at": datetime.utcnow(),
+            "expires_at": expires_at,
+        }
+        await get_database()[COLLECTIONS['revoked_tokens']].update_one(
+            {"_id": key}, {"$setOnInsert": doc}, upsert=True
+        )
+        self._apply(doc)
+
+    async def revoke_user(self, user_id: str, revoked_before: int, token_lifetime: timedelta):
+        """Revoke every token of a user issued before the revoked_before epoch second"""
+        now = datetime.utcnow()
+        await get_database()[COLLECTIONS['revoked_tokens']].update_one(
+            {"_id": f"user:{user_id}"},
+            {
+                "$max": {"revoked_before": revoked_before},
+                "$set": {"kind": "user", "user_id": user_id, "revoked_at": now, "expires_at": now + token_lifetime},
+            },
+            upsert=True
+        )
+        self._apply({"_id": f"user:{user_id}", "kind": "user", "user_id": user_id,
+                     "revoked_before": revoked_before, "revoked_at": now})
+
+    async def refresh(self):
+        """Pull revocations written since the last refresh, by any worker"""
+        query = {}
+        if self._last_revoked_at is not None:
+            query = {"revoked_at": {"$gte": self._last_revoked_at - timedelta(seconds=REVOCATION_REFRESH_OVERLAP_SECONDS)}}
+        cursor = get_database()[COLLECTIONS['revoked_tokens']].find(query).sort("revoked_at", ASCENDING)
+        async for doc in cursor:
+            self._apply(doc)
+        self.refreshes += 1
+
+    async def rebuild(self):
+        """Reload everything, dropping revocations whose tokens have expired"""
+        docs = await get_database()[COLLECTIONS['revoked_tokens']].find({}).sort("revoked_at", ASCENDING).to_list(length=None)
+        # Swap in the new state without awaiting, so no check ever sees a half-loaded list
+        self._tokens = {}
+        self._users = {}
+        self._last_revoked_at = None
+        self._bloom = BloomFilter(max(self.capacity, len(docs)), self.error_rate)
+        for doc in docs:
+            self._apply(doc)
+        self.rebuilds += 1
+
+    async def _refresh_periodically(self):
+        loop = asyncio.get_running_loop()
+        rebuild_at = loop.time() + REVOCATION_REBUILD_INTERVAL_SECONDS
+        while True:
+            await asyncio.sleep(REVOCATION_REFRESH_INTERVAL_SECONDS)
+            try:
+                if loop.time() >= rebuild_at:
+                    await self.rebuild()
+                    rebuild_at = loop.time() + REVOCATION_REBUILD_INTERVAL_SECONDS
+                else:
+                    await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing token revocations: {e}")
+
+    async def start(self):
+        """Load current revocations and keep them in sync on the running event loop"""
+        await self.rebuild()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_periodically())
+        logger.info(f"Token revocation list loaded ({len(self._tokens)} tokens, {len(self._users)} users)")
+
+    async def stop(self):
+        task = self._task
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Sizes and hit counters of the in-memory revocation list"""
+        return {
+            "tokens": len(self._tokens),
+            "users": len(self._users),
+            "bloom_size_bits": self._bloom.size,
+            "checks": self.checks,
+            "bloom_positives": self.bloom_positives,
+            "false_positives": self.false_positives,
+            "rejected": self.rejected,
+            "refreshes": self.refreshes,
+            "rebuilds": self.rebuilds,
+        }
+
+# Global revocation list for this worker
+revocation_list = RevocationList()
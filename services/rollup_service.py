@@ -0,0 +1,194 @@
+from database import get_database, COLLECTIONS
+from models.lead import LeadStatus
+from pymongo import UpdateOne
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rollups are keyed on these; utm_term and utm_content are too high-cardinality to roll up
+ROLLUP_DIMENSIONS = ['source', 'utm_source', 'utm_medium', 'utm_campaign']
+ROLLUP_GRANULARITIES = ['hour', 'day']
+LEAD_STATUSES = [status.value for status in LeadStatus]
+
+def truncate(moment: datetime, granularity: str) -> datetime:
+    """Start of the hour or day containing moment"""
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def bucket_range(created_from: datetime, created_to: datetime, granularity: str) -> Tuple[datetime, datetime]:
+    """[created_from, created_to) widened to whole buckets: a bucket counts if the range overlaps it"""
+    end = truncate(created_to, granularity)
+    if end < created_to:
+        end += timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+    return truncate(created_from, granularity), end
+
+def rollup_key(source: Optional[str], utm: Optional[Dict[str, Any]], created_at: datetime, granularity: str) -> Dict[str, Any]:
+    """Identity of the rollup document a lead counts towards; missing dimensions are "" (never null)"""
+    utm = utm or {}
+    key = {"granularity": granularity, "bucket": truncate(created_at, granularity), "source": source or ""}
+    for dimension in ROLLUP_DIMENSIONS[1:]:
+        key[dimension] = str(utm.get(dimension) or "")
+    return key
+
+class RollupService:
+    """Hourly and daily lead counts per source and UTM campaign, with per-status funnel counts
+
+    Leads are counted in the bucket of their created_at, under the source and UTM
+    values they were created with (first touch), and each rollup tracks how many
+    of those leads are currently in each status.
+    """
+
+    @staticmethod
+    async def record_leads(leads: Iterable[Tuple[Optional[str], Optional[Dict[str, Any]], datetime]]):
+        """Count newly created (source, utm, created_at) leads; best effort like the stats counters"""
+        increments: Dict[tuple, int] = {}
+        for source, utm, created_at in leads:
+            for granularity in ROLLUP_GRANULARITIES:
+                key = rollup_key(source, utm, created_at, granularity)
+                increments[tuple(key.items())] = increments.get(tuple(key.items()), 0) + 1
+        if not increments:
+            return
+
+        operations = [
+            UpdateOne(
+                dict(key),
+                {"$inc": {"leads": count, f"status.{LeadStatus.NEW.value}": count}, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            for key, count in increments.items()
+        ]
+        try:
+            await get_database()[COLLECTIONS['lead_rollups']].bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Rollups can be rebuilt with backfill(); never fail the lead write over them
+            logger.error(f"Error updating lead rollups: {e}")
+
+    @staticmethod
+    async def record_status_change(lead: Dict[str, Any], old_status: str, new_status: str):
+        """Move one lead between status counters of the rollups it was counted in
+
+        A rollup with no lead left in old_status did not count this lead (it was
+        created before the rollups were backfilled), so it is left alone rather
+        than driven negative; backfill() counts the lead in its current status.
+        """
+        if old_status == new_status:
+            return
+        operations = [
+            UpdateOne(
+                {
+                    **rollup_key(lead.get("first_source") or lead.get("source"), lead.get("utm"), lead["created_at"], granularity),
+                    f"status.{old_status}": {"$gt": 0},
+                },
+                {"$inc": {f"status.{old_status}": -1, f"status.{new_status}": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            )
+            for granularity in ROLLUP_GRANULARITIES
+        ]
+        try:
+            await get_database()[COLLECTIONS['lead_rollups']].bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Error updating lead rollups: {e}")
+
+    @staticmethod
+    def backfill_pipeline(granularity: str, match: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Aggregation rebuilding the rollups of one granularity from the leads collection (MongoDB 5.0+)"""
+        group_id = {
+            "granularity": granularity,
+            "bucket": {"$dateTrunc": {"date": "$created_at", "unit": granularity}},
+            "source": {"$ifNull": ["$first_source", "$source", ""]},
+        }
+        for dimension in ROLLUP_DIMENSIONS[1:]:
+            group_id[dimension] = {"$ifNull": [f"$utm.{dimension}", ""]}
+
+        group = {"_id": group_id, "leads": {"$sum": 1}}
+        for status in LEAD_STATUSES:
+            group[status] = {"$sum": {"$cond": [{"$eq": ["$status", status]}, 1, 0]}}
+
+        project = {"_id": 0, "leads": 1, "updated_at": "$$NOW"}
+        for field in group_id:
+            project[field] = f"$_id.{field}"
+        project["status"] = {status: f"${status}" for status in LEAD_STATUSES}
+
+        return [
+            {"$match": match},
+            {"$group": group},
+            {"$project": project},
+            {"$merge": {
+                "into": COLLECTIONS['lead_rollups'],
+                "on": ["granularity", "bucket"] + ROLLUP_DIMENSIONS,
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }},
+        ]
+
+    @staticmethod
+    async def backfill(created_from: Optional[datetime] = None, created_to: Optional[datetime] = None):
+        """Recompute rollups from leads, replacing the affected buckets
+
+        Ranges should start and end on day boundaries so no bucket is rebuilt from
+        part of its leads. Leads created while the backfill runs may be counted
+        twice or not at all in the buckets being rebuilt.
+        """
+        db = get_database()
+        match: Dict[str, Any] = {}
+        created_range = {}
+        if created_from is not None:
+            created_range["$gte"] = created_from
+        if created_to is not None:
+            created_range["$lt"] = created_to
+        if created_range:
+            match["created_at"] = created_range
+
+        for granularity in ROLLUP_GRANULARITIES:
+            pipeline = RollupService.backfill_pipeline(granularity, match)
+            await db[COLLECTIONS['leads']].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+            logger.info(f"Lead rollups backfilled ({granularity})")
+
+    @staticmethod
+    async def report(
+        granularity: str,
+        group_by: List[str],
+        created_from: datetime,
+        created_to: datetime,
+        filters: Dict[str, str],
+        series: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Sum rollups grouped by some dimensions (and by bucket if series)
+
+        Rollups only know the hour or day of a lead, so the range is widened to
+        whole buckets (see bucket_range): every bucket overlapping
+        [created_from, created_to) is counted in full.
+        """
+        bucket_from, bucket_to = bucket_range(created_from, created_to, granularity)
+        match: Dict[str, Any] = {
+            "granularity": granularity,
+            "bucket": {"$gte": bucket_from, "$lt": bucket_to},
+        }
+        match.update({dimension: value for dimension, value in filters.items() if value is not None})
+
+        group_id = {dimension: f"${dimension}" for dimension in group_by}
+        if series:
+            group_id["bucket"] = "$bucket"
+        group = {"_id": group_id or None, "leads": {"$sum": "$leads"}}
+        for status in LEAD_STATUSES:
+            group[status] = {"$sum": {"$ifNull": [f"$status.{status}", 0]}}
+
+        pipeline = [
+            {"$match": match},
+            {"$group": group},
+            {"$sort": {"leads": -1}} if not series else {"$sort": {"_id.bucket": 1, "leads": -1}},
+        ]
+        rows = []
+        async for doc in get_database('admin')[COLLECTIONS['lead_rollups']].aggregate(pipeline):
+            statuses = {status: doc[status] for status in LEAD_STATUSES}
+            leads = doc["leads"]
+            rows.append({
+                **(doc["_id"] or {}),
+                "leads": leads,
+                "status": statuses,
+                "contacted_rate": round((statuses["contacted"] + statuses["converted"]) / leads, 4) if leads else 0.0,
+                "conversion_rate": round(statuses["converted"] / leads, 4) if leads else 0.0,
+            })
+        return rows
@@ -0,0 +1,126 @@
+from database import get_database, COLLECTIONS
+from pydantic import BaseModel
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from services.query import projection_for
+from typing import Any, Dict, List, Optional, Tuple, Type
+import base64
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Deepest result a text search pages to; textScore order cannot be resumed from a keyset
+SEARCH_MAX_OFFSET = int(os.environ.get('SEARCH_MAX_OFFSET', '1000'))
+SEARCH_BACKFILL_BATCH_SIZE = 1000
+
+# Lowercased copies of the fields searched by prefix, per collection: {normalized field: source field}
+NORMALIZED_FIELDS = {
+    'leads': {'email_lower': 'email', 'company_lower': 'company'},
+    'contacts': {'email_lower': 'email'},
+}
+
+def normalize(value: Optional[str]) -> Optional[str]:
+    """Case- and whitespace-insensitive form of a searchable value"""
+    if value is None:
+        return None
+    return value.strip().lower()
+
+def normalized_fields(key: str, doc: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Normalized fields to store alongside a document of the collection key in COLLECTIONS"""
+    return {field: normalize(doc.get(source)) for field, source in NORMALIZED_FIELDS[key].items()}
+
+def prefix_range(prefix: str) -> Dict[str, str]:
+    """Index range holding every string that starts with prefix"""
+    return {"$gte": prefix, "$lt": prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+
+def encode_search_cursor(position: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_search_cursor(cursor: str, length: int) -> List[Any]:
+    """Decode a cursor produced by encode_search_cursor; raises ValueError if it is malformed"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, list) or len(position) != length:
+        raise ValueError("Invalid cursor")
+    return position
+
+class SearchService:
+    """Admin search over leads and contacts
+
+    Prefix searches run on the normalized fields, so the match is one index range
+    scan, ordered by the normalized value (an exact match comes first) and paged
+    by keyset. Full-text searches use the contacts text index, ordered by
+    relevance and paged by offset up to SEARCH_MAX_OFFSET.
+    """
+
+    @staticmethod
+    async def prefix_search(
+        key: str, field: str, prefix: str, model: Type[BaseModel], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Documents whose field starts with prefix, ignoring case; returns (documents, next cursor)"""
+        normalized = f"{field}_lower"
+        prefix = normalize(prefix)
+        if not prefix:
+            raise ValueError("Search text is empty")
+
+        query: Dict[str, Any] = {normalized: prefix_range(prefix)}
+        if cursor:
+            value, doc_id = decode_search_cursor(cursor, 2)
+            query["$or"] = [
+                {normalized: {"$gt": value}},
+                {normalized: value, "id": {"$gt": doc_id}},
+            ]
+
+        db_cursor = get_database('admin')[COLLECTIONS[key]].find(query, projection_for(model, normalized))
+        docs = await db_cursor.sort([(normalized, ASCENDING), ("id", ASCENDING)]).limit(limit).to_list(length=limit)
+
+        next_cursor = None
+        if len(docs) == limit:
+            next_cursor = encode_search_cursor([docs[-1][normalized], docs[-1]["id"]])
+        return docs, next_cursor
+
+    @staticmethod
+    async def text_search(
+        key: str, text: str, model: Type[BaseModel], limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Documents matching the words of text, most relevant first; returns (documents, next cursor)"""
+        offset = 0
+        if cursor:
+            offset, = decode_search_cursor(cursor, 1)
+            if not isinstance(offset, int) or offset < 0:
+                raise ValueError("Invalid cursor")
+        if offset >= SEARCH_MAX_OFFSET:
+            return [], None
+        limit = min(limit, SEARCH_MAX_OFFSET - offset)
+
+        projection = dict(projection_for(model), score={"$meta": "textScore"})
+        db_cursor = get_database('admin')[COLLECTIONS[key]].find({"$text": {"$search": text}}, projection)
+        db_cursor = db_cursor.sort([("score", {"$meta": "textScore"}), ("created_at", DESCENDING)])
+        docs = await db_cursor.skip(offset).limit(limit).to_list(length=limit)
+
+        next_cursor = None
+        if len(docs) == limit and offset + limit < SEARCH_MAX_OFFSET:
+            next_cursor = encode_search_cursor([offset + limit])
+        return docs, next_cursor
+
+    @staticmethod
+    async def backfill(key: str) -> int:
+        """Write the normalized fields of documents stored without them; returns how many were updated"""
+        collection = get_database()[COLLECTIONS[key]]
+        sources = NORMALIZED_FIELDS[key]
+        # Documents written since the normalized fields were introduced have all of them
+        missing = {"$or": [{field: {"$exists": False}} for field in sources]}
+        projection = {"_id": 1, **{source: 1 for source in sources.values()}}
+
+        updated = 0
+        while True:
+            docs = await collection.find(missing, projection).limit(SEARCH_BACKFILL_BATCH_SIZE).to_list(length=None)
+            if not docs:
+                return updated
+            operations = [UpdateOne({"_id": doc["_id"]}, {"$set": normalized_fields(key, doc)}) for doc in docs]
+            await collection.bulk_write(operations, ordered=False)
+            updated += len(docs)
+            logger.info(f"Search fields backfilled on {updated} {COLLECTIONS[key]}")
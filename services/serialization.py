@@ -0,0 +1,26 @@
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+@lru_cache(maxsize=None)
+def model_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(model)
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def encode_model(model: Type[BaseModel], doc: Dict[str, Any]) -> bytes:
+    """Validate a Mongo document against a response model and encode it to JSON in one pass"""
+    adapter = model_adapter(model)
+    return adapter.dump_json(adapter.validate_python(doc))
+
+def encode_list(model: Type[BaseModel], docs: Iterable[Dict[str, Any]]) -> bytes:
+    """Validate a list of Mongo documents against a response model and encode it to JSON in one pass"""
+    adapter = list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(docs))
+
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Wrap already-encoded JSON so FastAPI sends it without validating it against response_model again"""
+    return Response(content=body, media_type="application/json", headers=headers)
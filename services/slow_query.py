@@ -0,0 +1,201 @@
+from pymongo import monitoring
+from services.request_context import request_id_var, request_path_var
+from services.metrics import command_collection
+from typing import Any, Dict, Optional
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Slow query log configuration
+MONGO_SLOW_QUERY_MS = float(os.environ.get('MONGO_SLOW_QUERY_MS', '100'))
+MONGO_SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get('MONGO_SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0'))
+MONGO_SLOW_QUERY_EXPLAIN_VERBOSITY = os.environ.get('MONGO_SLOW_QUERY_EXPLAIN_VERBOSITY', 'queryPlanner')
+
+# Parts of each command that describe the query, as opposed to the data being written
+SHAPE_FIELDS = {
+    'find': ('filter', 'sort', 'projection', 'limit'),
+    'aggregate': ('pipeline',),
+    'count': ('query',),
+    'distinct': ('key', 'query'),
+    'findAndModify': ('query', 'sort', 'update', 'upsert'),
+    'update': ('updates',),
+    'delete': ('deletes',),
+}
+EXPLAINABLE_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'findAndModify', 'update', 'delete'}
+
+# Driver-added fields that must not be forwarded inside an explain command
+DRIVER_FIELDS = {'lsid', '$db', '$clusterTime', '$readPreference', 'txnNumber', 'autocommit', 'startTransaction', 'readConcern', 'writeConcern'}
+
+# Keys whose values are structural (field names, sort directions) rather than user data
+STRUCTURAL_KEYS = {'sort', 'projection', '$project', '$sort', '$group', 'key', 'limit', 'upsert', 'multi'}
+
+def redact(value: Any, structural: bool = False) -> Any:
+    """Replace the values in a query with "?" while keeping field names and operators"""
+    if isinstance(value, dict):
+        return {key: redact(item, structural or key in STRUCTURAL_KEYS) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # One element is enough to show the shape of a list
+        return [redact(value[0], structural)] if value else []
+    if structural and isinstance(value, (int, float, str, bool)):
+        return value
+    return "?"
+
+# Plan stage fields that name the stage and index; everything else (indexBounds, filter...) can hold query values
+PLAN_FIELDS = ('stage', 'indexName', 'keyPattern', 'direction', 'isMultiKey')
+PLAN_CHILDREN = ('queryPlan', 'inputStage', 'inputStages')
+
+def plan_shape(plan: Any) -> Any:
+    """Stages and indexes of an explain plan tree, without bounds, filters or any other value"""
+    if isinstance(plan, list):
+        return [plan_shape(stage) for stage in plan]
+    if not isinstance(plan, dict):
+        return None
+    shape = {field: plan[field] for field in PLAN_FIELDS if field in plan}
+    for child in PLAN_CHILDREN:
+        if child in plan:
+            shape[child] = plan_shape(plan[child])
+    return shape
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    """Redacted, log-friendly shape of a MongoDB command"""
+    fields = SHAPE_FIELDS.get(command_name, ())
+    shape = {field: redact(command[field], field in STRUCTURAL_KEYS) for field in fields if field in command}
+    if command_name == 'update' and 'updates' in command:
+        shape['updates'] = [{'q': redact(u.get('q')), 'u': redact(u.get('u'))} for u in command['updates'][:1]]
+    if command_name == 'delete' and 'deletes' in command:
+        shape['deletes'] = [{'q': redact(d.get('q'))} for d in command['deletes'][:1]]
+    return shape
+
+def docs_returned(command_name: str, reply: Dict[str, Any]) -> Optional[int]:
+    """Number of documents a command returned or affected, when the reply says"""
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        batch = cursor.get('firstBatch', cursor.get('nextBatch'))
+        if batch is not None:
+            return len(batch)
+    if 'n' in reply:
+        return reply['n']
+    return None
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Logs MongoDB commands slower than MONGO_SLOW_QUERY_MS together with the request that issued them
+
+    Optionally captures explain() for a sample of the slowest command shapes; the
+    explain runs on the app's event loop so driver threads never wait on it.
+    """
+
+    def __init__(self, threshold_ms: float = MONGO_SLOW_QUERY_MS, explain_sample_rate: float = MONGO_SLOW_QUERY_EXPLAIN_SAMPLE_RATE):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self._started: Dict[tuple, tuple] = {}
+        self._worst: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._explain_in_flight = False
+        self.slow_queries = 0
+        self.explains = 0
+
+    def attach(self, client, loop: asyncio.AbstractEventLoop):
+        """Give the listener the Motor client and event loop used for sampled explains"""
+        self._client = client
+        self._loop = loop
+
+    def started(self, event):
+        # Keep a reference only; the shape is computed when a command turns out to be slow
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (
+                event.command, event.database_name, request_id_var.get(), request_path_var.get()
+            )
+
+    def _pop(self, event) -> Optional[tuple]:
+        with self._lock:
+            return self._started.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event):
+        started = self._pop(event)
+        duration_ms = event.duration_micros / 1000
+        if started is not None and duration_ms >= self.threshold_ms:
+            self._log(event.command_name, started, duration_ms, docs_returned(event.command_name, event.reply), None)
+
+    def failed(self, event):
+        started = self._pop(event)
+        duration_ms = event.duration_micros / 1000
+        if started is not None and duration_ms >= self.threshold_ms:
+            self._log(event.command_name, started, duration_ms, None, str(event.failure.get('errmsg', event.failure)))
+
+    def _log(self, command_name: str, started: tuple, duration_ms: float, docs: Optional[int], error: Optional[str]):
+        command, database_name, request_id, request_path = started
+        collection = command_collection(command_name, command)
+        shape = query_shape(command_name, command)
+        entry = {
+            "collection": collection,
+            "command": command_name,
+            "shape": shape,
+            "duration_ms": round(duration_ms, 1),
+            "docs_returned": docs,
+            "request_path": request_path,
+            "request_id": request_id,
+        }
+        if error:
+            entry["error"] = error
+        self.slow_queries += 1
+        logger.warning(f"Slow MongoDB query: {json.dumps(entry, default=str)}")
+
+        if command_name in EXPLAINABLE_COMMANDS and self.explain_sample_rate > 0:
+            self._maybe_explain(command_name, command, database_name, entry, duration_ms)
+
+    def _maybe_explain(self, command_name: str, command: Dict[str, Any], database_name: str, entry: Dict[str, Any], duration_ms: float):
+        shape_key = json.dumps([entry["collection"], command_name, entry["shape"]], sort_keys=True, default=str)
+        with self._lock:
+            # Only the worst occurrence seen so far of each shape is a candidate
+            if duration_ms <= self._worst.get(shape_key, 0.0):
+                return
+            self._worst[shape_key] = duration_ms
+            if self._explain_in_flight or self._loop is None or random.random() >= self.explain_sample_rate:
+                return
+            self._explain_in_flight = True
+
+        explained = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+        self._loop.call_soon_threadsafe(
+            lambda: self._loop.create_task(self._explain(database_name, explained, entry))
+        )
+
+    async def _explain(self, database_name: str, command: Dict[str, Any], entry: Dict[str, Any]):
+        try:
+            result = await self._client[database_name].command(
+                {"explain": command, "verbosity": MONGO_SLOW_QUERY_EXPLAIN_VERBOSITY}
+            )
+            planner = result.get("queryPlanner", {})
+            stats = result.get("executionStats", {})
+            summary = {
+                "collection": entry["collection"],
+                "command": entry["command"],
+                "request_path": entry["request_path"],
+                "request_id": entry["request_id"],
+                "winning_plan": plan_shape(planner.get("winningPlan", {})),
+                "docs_examined": stats.get("totalDocsExamined"),
+                "keys_examined": stats.get("totalKeysExamined"),
+            }
+            self.explains += 1
+            logger.warning(f"Slow MongoDB query explain: {json.dumps(summary, default=str)}")
+        except Exception as e:
+            logger.warning(f"Error explaining slow MongoDB query: {e}")
+        finally:
+            self._explain_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Slow query and explain counters"""
+        return {
+            "threshold_ms": self.threshold_ms,
+            "slow_queries": self.slow_queries,
+            "explains": self.explains,
+        }
+
+# Global slow query listener, registered on the Motor client in connect_to_mongo
+slow_query_listener = SlowQueryListener()
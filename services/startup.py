@@ -0,0 +1,72 @@
+from services.mongo_monitoring import pool_metrics
+from database import writable_addresses
+from contextlib import contextmanager
+from typing import Any, Awaitable, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class StartupReport:
+    """Timing of each startup phase and the readiness state reported by /readyz"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.ready_after_seconds: Optional[float] = None
+        self.shutting_down = False
+        self._background: Dict[str, asyncio.Task] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - started, 4)
+
+    def start_background(self, name: str, coroutine: Awaitable):
+        """Run a startup phase after the worker starts serving; /readyz fails until it completes"""
+        async def timed():
+            with self.phase(name):
+                try:
+                    await coroutine
+                except Exception as e:
+                    # Not fatal: readiness still waits for the driver to report a ready pool
+                    logger.warning(f"Startup phase {name} failed: {e}")
+
+        self._background[name] = asyncio.create_task(timed())
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases.items())
+
+    def not_ready_reasons(self) -> List[str]:
+        """Why this worker should not receive traffic yet; empty when it is ready"""
+        reasons = []
+        if self.shutting_down:
+            reasons.append("shutting down")
+        for name, task in self._background.items():
+            if not task.done():
+                reasons.append(f"{name} in progress")
+        if pool_metrics.pools_ready == 0:
+            reasons.append("mongodb pool not ready")
+        # A paused secondary pool only affects reads that can go elsewhere; every worker
+        # would fail the probe at once, so only the pool of the writable server counts
+        if pool_metrics.paused_addresses & writable_addresses():
+            reasons.append("mongodb primary pool paused")
+
+        if not reasons and self.ready_after_seconds is None:
+            self.ready_after_seconds = round(time.perf_counter() - self.started_at, 4)
+            logger.info(f"Worker ready {self.ready_after_seconds * 1000:.0f} ms after start ({self.summary()})")
+        return reasons
+
+    def stats(self) -> Dict[str, Any]:
+        """Phase durations and time to first ready probe, in seconds"""
+        stats = {f"{name}_seconds": seconds for name, seconds in self.phases.items()}
+        if self.ready_after_seconds is not None:
+            stats["ready_after_seconds"] = self.ready_after_seconds
+        return stats
+
+# Global startup report for this worker
+startup_report = StartupReport()
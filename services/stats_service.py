@@ -0,0 +1,119 @@
+from database import get_database, COLLECTIONS
+from services.data_service import read_coalescer
+from typing import Dict, Optional
+from datetime import datetime
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Materialized counters configuration
+STATS_CACHE_TTL_SECONDS = float(os.environ.get('STATS_CACHE_TTL_SECONDS', '5'))
+STATS_RECONCILE_INTERVAL_SECONDS = float(os.environ.get('STATS_RECONCILE_INTERVAL_SECONDS', '3600'))
+
+STATS_DOCUMENT_ID = "global"
+COUNTED_COLLECTIONS = ['users', 'leads']
+
+class StatsService:
+    """Maintains a materialized document of collection counts, updated with $inc on writes"""
+    
+    _cached_counts: Optional[Dict[str, int]] = None
+    _cached_at = 0.0
+    _reconcile_task: Optional[asyncio.Task] = None
+    
+    @staticmethod
+    async def increment(field: str, amount: int = 1):
+        """Increment a counter after documents were inserted (best effort, reconciliation corrects drift)"""
+        if amount == 0:
+            return
+        try:
+            db = get_database()
+            await db[COLLECTIONS['stats']].update_one(
+                {"_id": STATS_DOCUMENT_ID},
+                {"$inc": {field: amount}, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Error incrementing stats counter {field}: {e}")
+            return
+        if StatsService._cached_counts is not None:
+            StatsService._cached_counts[field] = StatsService._cached_counts.get(field, 0) + amount
+    
+    @staticmethod
+    async def get_counts() -> Dict[str, int]:
+        """Get the counters from memory, or with one point read when the cached copy is stale"""
+        if StatsService._cached_counts is not None and time.monotonic() - StatsService._cached_at < STATS_CACHE_TTL_SECONDS:
+            return StatsService._cached_counts
+        
+        # Requests arriving while the cached copy is being reloaded share that read
+        return await read_coalescer.run('stats', StatsService._load_counts)
+    
+    @staticmethod
+    def _complete(doc: Optional[dict]) -> bool:
+        return doc is not None and all(key in doc for key in COUNTED_COLLECTIONS)
+    
+    @staticmethod
+    async def _load_counts() -> Dict[str, int]:
+        doc = await get_database('analytics')[COLLECTIONS['stats']].find_one({"_id": STATS_DOCUMENT_ID})
+        if not StatsService._complete(doc):
+            # A secondary may not have replicated the first reconciliation yet
+            doc = await get_database()[COLLECTIONS['stats']].find_one({"_id": STATS_DOCUMENT_ID})
+        
+        counts = {key: (doc or {}).get(key, 0) for key in COUNTED_COLLECTIONS}
+        if StatsService._complete(doc):
+            StatsService._cached_counts = counts
+            StatsService._cached_at = time.monotonic()
+        # Otherwise the startup reconciliation has not finished: report what is counted so far, uncached
+        return counts
+    
+    @staticmethod
+    async def reconcile() -> dict:
+        """Recompute the true counts and overwrite the materialized document"""
+        db = get_database()
+        counts = {key: await db[COLLECTIONS[key]].count_documents({}) for key in COUNTED_COLLECTIONS}
+        doc = {**counts, "updated_at": datetime.utcnow(), "reconciled_at": datetime.utcnow()}
+        await db[COLLECTIONS['stats']].update_one({"_id": STATS_DOCUMENT_ID}, {"$set": doc}, upsert=True)
+        StatsService._cached_counts = None
+        logger.info(f"Stats counters reconciled: {counts}")
+        return doc
+    
+    @staticmethod
+    async def _reconcile_periodically():
+        try:
+            # First run against this database: materialize the counters now rather than in a request
+            doc = await get_database()[COLLECTIONS['stats']].find_one({"_id": STATS_DOCUMENT_ID})
+            if not StatsService._complete(doc):
+                await StatsService.reconcile()
+        except Exception as e:
+            logger.error(f"Error materializing stats counters: {e}")
+        
+        while True:
+            await asyncio.sleep(STATS_RECONCILE_INTERVAL_SECONDS)
+            try:
+                await StatsService.reconcile()
+            except Exception as e:
+                logger.error(f"Error reconciling stats counters: {e}")
+    
+    @staticmethod
+    def start_reconciliation():
+        """Start the reconciliation job on the running event loop
+
+        It reconciles at once when the counters were never materialized, then
+        every STATS_RECONCILE_INTERVAL_SECONDS.
+        """
+        if StatsService._reconcile_task is None:
+            StatsService._reconcile_task = asyncio.create_task(StatsService._reconcile_periodically())
+    
+    @staticmethod
+    async def stop_reconciliation():
+        """Stop the periodic reconciliation job"""
+        task = StatsService._reconcile_task
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            StatsService._reconcile_task = None
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+import services.admission
+from services.admission import AdmissionRejected, ConcurrencyLimiter, TokenBucketLimiter, client_ip
+
+
+def test_slots_are_handed_to_waiters_in_order():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=2, queue_timeout=1)
+        order = []
+
+        async def request(name):
+            await limiter.acquire()
+            order.append(name)
+            await asyncio.sleep(0)
+            limiter.release()
+
+        await limiter.acquire()
+        waiters = [asyncio.create_task(request(name)) for name in ("first", "second")]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*waiters)
+        return limiter, order
+
+    limiter, order = asyncio.run(scenario())
+    assert order == ["first", "second"]
+    assert limiter.active == 0 and not limiter._waiters
+
+
+def test_full_queue_is_shed():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=0, queue_timeout=1)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        return limiter, rejected.value
+
+    limiter, rejection = asyncio.run(scenario())
+    assert rejection.status_code == 503
+    assert limiter.shed_queue_full == 1 and limiter.active == 1
+
+
+def test_waiter_past_its_deadline_gives_up_without_taking_a_slot():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=1, queue_timeout=0.01)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected):
+            await limiter.acquire()
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.shed_deadline == 1
+    assert limiter.active == 0 and not limiter._waiters
+
+
+def test_slot_handed_over_as_the_deadline_passes_is_passed_on():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=2, queue_timeout=0.05)
+        await limiter.acquire()
+        late = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        behind = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # The slot reaches the first waiter in the same loop iteration as its timeout
+        loop = asyncio.get_running_loop()
+        loop.call_at(loop.time() + 0.05, limiter.release)
+        results = await asyncio.gather(late, behind, return_exceptions=True)
+        return limiter, results
+
+    limiter, results = asyncio.run(scenario())
+    # Whoever ends up with the slot holds it; it is neither lost nor handed out twice
+    admitted = [result for result in results if result is None]
+    assert limiter.active == len(admitted)
+    assert not limiter._waiters
+
+
+def test_cancelled_waiter_releases_a_slot_it_was_handed():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=2, queue_timeout=1)
+        await limiter.acquire()
+        cancelled = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        behind = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # Hand the slot to the first waiter and cancel it before it resumes
+        limiter.release()
+        cancelled.cancel()
+        try:
+            await cancelled
+            # wait_for may return the slot anyway (the cancellation is lost); then the holder releases it
+            limiter.release()
+        except asyncio.CancelledError:
+            pass
+        await asyncio.wait_for(behind, timeout=1)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.active == 1 and not limiter._waiters
+
+
+def test_cancelled_waiter_without_a_slot_leaves_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=1, queue_timeout=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.active == 0 and not limiter._waiters
+
+
+def test_token_bucket_allows_the_burst_then_refills(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(services.admission.time, "monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=3)
+
+    assert [limiter.consume("ip") for _ in range(3)] == [None, None, None]
+    assert limiter.consume("ip") == pytest.approx(1.0)
+    # Other keys have their own bucket
+    assert limiter.consume("other") is None
+
+    now[0] += 0.5
+    assert limiter.consume("ip") == pytest.approx(0.5)
+    now[0] += 0.5
+    assert limiter.consume("ip") is None
+    assert limiter.limited == 2
+
+
+def test_token_bucket_is_disabled_by_a_zero_rate():
+    limiter = TokenBucketLimiter(rate_per_minute=0, burst=1)
+    assert all(limiter.consume("ip") is None for _ in range(10))
+
+
+def test_client_ip_takes_the_entry_our_proxies_appended(monkeypatch):
+    monkeypatch.setattr(services.admission, "ADMISSION_TRUST_FORWARDED_FOR", True)
+    scope = {
+        "client": ("10.0.0.1", 1234),
+        "headers": [(b"x-forwarded-for", b"6.6.6.6, 1.2.3.4"), (b"x-forwarded-for", b"10.0.0.2")],
+    }
+
+    monkeypatch.setattr(services.admission, "ADMISSION_FORWARDED_HOPS", 1)
+    assert client_ip(scope) == "10.0.0.2"
+    monkeypatch.setattr(services.admission, "ADMISSION_FORWARDED_HOPS", 2)
+    assert client_ip(scope) == "1.2.3.4"
+    monkeypatch.setattr(services.admission, "ADMISSION_FORWARDED_HOPS", 10)
+    assert client_ip(scope) == "6.6.6.6"
+
+    monkeypatch.setattr(services.admission, "ADMISSION_TRUST_FORWARDED_FOR", False)
+    assert client_ip(scope) == "10.0.0.1"
@@ -0,0 +1,101 @@
+import asyncio
+import io
+
+import pytest
+from pydantic import TypeAdapter, ValidationError, EmailStr
+
+from services.import_service import AsyncChunkFile, LeadImportError, LeadImportService, csv_rows, fast_email
+
+CSV = '﻿Email,First_Name\r\na@example.com,"Multi\r\nline"\r\nb@example.com,"say ""hi"""\r\n\r\nü@example.com,é\r\n'.encode()
+
+
+def test_csv_rows_numbers_records_by_their_first_line():
+    assert list(csv_rows(io.BytesIO(CSV))) == [
+        (1, ["Email", "First_Name"]),
+        (2, ["a@example.com", "Multi\r\nline"]),
+        (4, ["b@example.com", 'say "hi"']),
+        (6, ["ü@example.com", "é"]),
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 4096])
+def test_csv_rows_from_a_chunked_stream(chunk_size):
+    # Chunk boundaries fall inside the BOM, CRLF pairs, quoted fields and multi-byte characters
+    async def chunks():
+        for start in range(0, len(CSV), chunk_size):
+            await asyncio.sleep(0)
+            yield CSV[start:start + chunk_size]
+
+    async def parse():
+        file = io.BufferedReader(AsyncChunkFile(chunks(), asyncio.get_running_loop()), 4)
+        return await asyncio.to_thread(lambda: list(csv_rows(file)))
+
+    assert asyncio.run(parse()) == list(csv_rows(io.BytesIO(CSV)))
+
+
+@pytest.mark.parametrize("data, message", [
+    (b'email\n"a@example.com\n', "Malformed CSV at line 2"),
+    (b'email\n"a@example.com"x\n', "Malformed CSV at line 2"),
+    (b"email\n\xff\n", "File is not UTF-8 text"),
+])
+def test_csv_rows_rejects_malformed_files(data, message):
+    with pytest.raises(LeadImportError, match=message):
+        list(csv_rows(io.BytesIO(data)))
+
+
+EMAILS = [
+    "a@example.com",
+    "First.Last+tag@Example.COM",
+    "a..b@example.com",
+    ".a@example.com",
+    "a.@example.com",
+    "a@example",
+    "a@localhost",
+    "a@-example.com",
+    "a@example-.com",
+    "a@example..com",
+    "a@example.com.",
+    "a@[192.0.2.1]",
+    "a@192.0.2.1",
+    "a@xn--bcher-kva.de",
+    "a@b_c.com",
+    "a@example.invalid",
+    "a@example.test",
+    "a@example.local",
+    '"quoted"@example.com',
+    "a@@example.com",
+    "a b@example.com",
+    "a@example.com ",
+    "ü@example.com",
+    "a@bücher.de",
+    "x" * 64 + "@example.com",
+    "x" * 65 + "@example.com",
+    "x" * 64 + "@" + "d" * 63 + "." + "e" * 63 + "." + "f" * 63 + ".com",
+    "a@" + "d" * 64 + ".com",
+]
+
+
+@pytest.mark.parametrize("email", EMAILS)
+def test_fast_email_agrees_with_email_str(email):
+    try:
+        expected = TypeAdapter(EmailStr).validate_python(email)
+    except ValidationError:
+        expected = None
+    fast = fast_email(email)
+
+    # None defers to the full check, so only an answer that differs is wrong
+    assert fast is None or fast == expected
+
+
+def test_read_batch_reports_invalid_rows_and_carries_repeated_emails():
+    rows = iter([
+        (2, ["a@Example.com", "Ann"]),
+        (3, ["not-an-email", "Bob"]),
+        (4, ["a@example.com", "Ann again"]),
+    ])
+    result = LeadImportService.read_batch(rows, ["email", "first_name"], "crm", 10, None)
+
+    assert [(line, lead.email, lead.first_name, lead.source) for line, lead in result["batch"]] == [(2, "a@example.com", "Ann", "crm")]
+    assert [(line, email) for line, email, _ in result["invalid"]] == [(3, "not-an-email")]
+    assert result["carry"][0] == 4 and result["carry"][1].first_name == "Ann again"
+    assert result["read"] == 3 and not result["done"]
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import pytest
+
+from services.pagination import build_keyset_query, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    cursor = encode_cursor({"created_at": created_at, "id": "lead-1", "email": "a@example.com"})
+
+    assert decode_cursor(cursor) == (created_at, "lead-1")
+
+
+@pytest.mark.parametrize("doc", [{"id": "legacy"}, {"id": "legacy", "created_at": None}])
+def test_cursor_of_a_document_without_created_at(doc):
+    assert decode_cursor(encode_cursor(doc)) == (None, "legacy")
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bm90IGpzb24=", "WyJub3QgYSBkYXRlIiwgIngiXQ==", "WzFd"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_keyset_query_continues_after_the_cursor():
+    created_at = datetime(2024, 5, 1, 12, 30)
+    query = build_keyset_query({"status": "new", "source": None}, encode_cursor({"created_at": created_at, "id": "b"}))
+
+    assert query["status"] == "new" and "source" not in query
+    assert query["$or"] == [
+        {"created_at": created_at, "id": {"$lt": "b"}},
+        {"created_at": {"$lt": created_at}},
+        # Documents without created_at sort after every dated one
+        {"created_at": None},
+    ]
+
+
+def test_keyset_query_after_a_document_without_created_at():
+    query = build_keyset_query({}, encode_cursor({"id": "b"}))
+
+    assert query["$or"] == [{"created_at": None, "id": {"$lt": "b"}}]
+
+
+def test_keyset_query_range():
+    created_from, created_to = datetime(2024, 1, 1), datetime(2024, 2, 1)
+    query = build_keyset_query({}, None, created_from, created_to)
+
+    assert query == {"created_at": {"$gte": created_from, "$lt": created_to}}
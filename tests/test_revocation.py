@@ -0,0 +1,169 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+import services.revocation
+from services.revocation import BloomFilter, RevocationList
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, field, direction):
+        self._docs = sorted(self._docs, key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._docs:
+            yield doc
+
+    async def to_list(self, length=None):
+        return list(self._docs)
+
+
+class FakeRevokedTokens:
+    """Just the revoked_tokens operations RevocationList performs"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"]})
+        for field, value in update.get("$setOnInsert", {}).items():
+            doc.setdefault(field, value)
+        for field, value in update.get("$max", {}).items():
+            doc[field] = max(doc.get(field, value), value)
+        doc.update(update.get("$set", {}))
+
+    def find(self, query):
+        since = query.get("revoked_at", {}).get("$gte")
+        return FakeCursor([dict(doc) for doc in self.docs.values() if since is None or doc["revoked_at"] >= since])
+
+
+@pytest.fixture
+def revoked_tokens(monkeypatch):
+    collection = FakeRevokedTokens()
+    monkeypatch.setattr(services.revocation, "get_database", lambda workload=None: {"revoked_tokens": collection})
+    return collection
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"jti-{i}")
+
+    assert all(f"jti-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_bloom_positive_is_confirmed_by_the_exact_set():
+    revocations = RevocationList(capacity=10, error_rate=0.01)
+    # A filter with every bit set answers yes for any key, like a false positive
+    revocations._bloom._bits = bytearray(b"\xff" * len(revocations._bloom._bits))
+
+    assert not revocations.is_revoked("not-revoked", {"sub": "u1", "iat": 0})
+    assert revocations.false_positives == 1
+
+
+def test_token_and_user_revocations(revoked_tokens):
+    revocations = RevocationList(capacity=10, error_rate=0.01)
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    async def revoke():
+        await revocations.revoke_token("jti-1", "u1", expires_at)
+        await revocations.revoke_user("u2", 1000, timedelta(hours=1))
+
+    asyncio.run(revoke())
+
+    assert revocations.is_revoked("jti-1", {"sub": "u1", "iat": 2000})
+    assert not revocations.is_revoked("jti-2", {"sub": "u1", "iat": 2000})
+    # The user cut-off covers tokens issued before it, whatever their jti
+    assert revocations.is_revoked("jti-3", {"sub": "u2", "iat": 999})
+    assert not revocations.is_revoked("jti-4", {"sub": "u2", "iat": 1000})
+
+
+def test_bloom_filter_grows_past_its_capacity(revoked_tokens):
+    revocations = RevocationList(capacity=4, error_rate=0.01)
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    async def revoke():
+        for i in range(20):
+            await revocations.revoke_token(f"jti-{i}", "u1", expires_at)
+
+    asyncio.run(revoke())
+
+    assert revocations._bloom.capacity >= 20
+    assert all(revocations.is_revoked(f"jti-{i}", {"sub": "u1"}) for i in range(20))
+
+
+def test_refresh_pulls_revocations_written_by_other_workers(revoked_tokens):
+    here, other = RevocationList(capacity=10, error_rate=0.01), RevocationList(capacity=10, error_rate=0.01)
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    async def scenario():
+        await here.rebuild()
+        await other.revoke_token("jti-1", "u1", expires_at)
+        await here.refresh()
+        await other.revoke_token("jti-2", "u1", expires_at)
+        await other.revoke_user("u2", 1000, timedelta(hours=1))
+        await here.refresh()
+
+    asyncio.run(scenario())
+
+    assert here.is_revoked("jti-1", {"sub": "u1"})
+    assert here.is_revoked("jti-2", {"sub": "u1"})
+    assert here.is_revoked("jti-3", {"sub": "u2", "iat": 999})
+    assert here.refreshes == 2
+
+
+def test_rebuild_drops_revocations_pruned_from_the_collection(revoked_tokens):
+    revocations = RevocationList(capacity=10, error_rate=0.01)
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+
+    async def scenario():
+        await revocations.revoke_token("jti-1", "u1", expires_at)
+        # The TTL index removed it once the token expired
+        del revoked_tokens.docs["jti-1"]
+        await revocations.rebuild()
+
+    asyncio.run(scenario())
+
+    assert not revocations.is_revoked("jti-1", {"sub": "u1"})
+
+
+def test_verify_token_rejects_revoked_tokens(revoked_tokens, monkeypatch):
+    monkeypatch.setattr(auth, "revocation_list", RevocationList(capacity=10, error_rate=0.01))
+    token = auth.create_access_token({"sub": "u1", "email": "u1@example.com"})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    payload = auth.verify_token(credentials)
+
+    asyncio.run(auth.revocation_list.revoke_token(auth.token_key(token, payload), "u1", datetime.utcnow() + timedelta(hours=1)))
+
+    with pytest.raises(HTTPException) as rejected:
+        auth.verify_token(credentials)
+    assert rejected.value.status_code == 401
+
+
+def test_revoke_user_tokens_spares_tokens_issued_afterwards(revoked_tokens, monkeypatch):
+    monkeypatch.setattr(auth, "revocation_list", RevocationList(capacity=10, error_rate=0.01))
+    issued_before = {"sub": "u1", "iat": int(time.time()) - 10, "exp": int(time.time()) + 3600, "jti": "old"}
+    old = HTTPAuthorizationCredentials(scheme="Bearer", credentials=jwt.encode(issued_before, auth.JWT_SECRET, algorithm=auth.JWT_ALGORITHM))
+
+    asyncio.run(auth.revoke_user_tokens("u1"))
+    # Issued in the same second as the revocation at the latest, like the token handed out after a password change
+    new = HTTPAuthorizationCredentials(scheme="Bearer", credentials=auth.create_access_token({"sub": "u1"}))
+
+    with pytest.raises(HTTPException):
+        auth.verify_token(old)
+    assert auth.verify_token(new)["sub"] == "u1"